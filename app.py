@@ -4,10 +4,18 @@ import sys
 import os
 from dotenv import load_dotenv
 from src.processing.query_processor import process_query
-from src.retrieval.vector_store import build_faiss_index, search_index
-from src.generation.answer_generator import generate_answer
+from src.retrieval.vector_store import (
+    SEARCH_MODE, delete_documents, embed_query, embedding_model_id, get_embedding_function, index_sources,
+    search_index, source_document_ids, warm_up_embedding_model
+)
+from src.generation.answer_generator import GENERATION_ERROR_ANSWER, stream_answer
+from src.generation.answer_cache import document_set_fingerprint, get_answer_cache
 from src.config.logging_config import setup_logging
-from src.processing.pdf_processor import process_pdfs_to_documents
+from src.config.metrics import get_metrics
+from src.processing.ingest_jobs import COMPLETED, FAILED, FINISHED_STATES, QUEUED, get_ingest_job_manager
+from src.processing.pdf_processor import file_content_hash
+from src.retrieval.index_collections import list_collections, load_collection, read_manifest, save_collection
+from src.retrieval.reranker import rerank_documents, rerank_fetch_k, rerank_settings
 
 # --- Setup Logging --- 
 setup_logging()
@@ -15,10 +23,15 @@ setup_logging()
 # Get a logger for this module
 logger = logging.getLogger(__name__)
 
+# Start loading the shared embedding model in the background on server start
+# (no-op once it is loaded or loading)
+warm_up_embedding_model()
+
 MAX_FILES = 3
 MAX_FILE_SIZE_MB = 50
 ALLOWED_MIME_TYPES = ['application/pdf']
 MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
+TOP_K = 3
 
 # Load environment variables from .env file
 load_dotenv()
@@ -33,12 +46,28 @@ if not LANGCHAIN_API_KEY:
 if 'faiss_index' not in st.session_state:
     st.session_state.faiss_index = None
     logger.debug("Initialized 'faiss_index' in session state to None.")
-if 'processed_docs' not in st.session_state:
-    st.session_state.processed_docs = []
-    logger.debug("Initialized 'processed_docs' in session state to empty list.")
+if 'indexed_chunk_count' not in st.session_state:
+    st.session_state.indexed_chunk_count = 0
+    logger.debug("Initialized 'indexed_chunk_count' in session state to 0.")
 if 'uploaded_file_names' not in st.session_state:
     st.session_state.uploaded_file_names = [] # Store names to detect changes
     logger.debug("Initialized 'uploaded_file_names' in session state to empty list.")
+if 'ingest_job_id' not in st.session_state:
+    # Background ingest job building the index; it keeps running across reruns
+    st.session_state.ingest_job_id = None
+    logger.debug("Initialized 'ingest_job_id' in session state to None.")
+if 'source_hashes' not in st.session_state:
+    st.session_state.source_hashes = {} # File name -> content hash of the indexed PDFs
+if 'pending_source_hashes' not in st.session_state:
+    st.session_state.pending_source_hashes = {} # The same, for the index the running ingest job builds
+if 'uploaded_hashes' not in st.session_state:
+    st.session_state.uploaded_hashes = {} # File name -> content hash of the current uploads, to detect changes
+if 'upload_hashes_by_id' not in st.session_state:
+    st.session_state.upload_hashes_by_id = {} # Uploader file ID -> content hash, so reruns do not re-hash
+if 'loaded_collection' not in st.session_state:
+    st.session_state.loaded_collection = None # Name of the collection the index was loaded from
+if 'pending_collection_save' not in st.session_state:
+    st.session_state.pending_collection_save = None # Collection to save once the running ingest finishes
 
 # --- Helper Functions ---
 def validate_uploaded_files(uploaded_files_list):
@@ -71,9 +100,177 @@ def validate_uploaded_files(uploaded_files_list):
             valid_files.append(file)
     return valid_files, error_messages
 
+def show_sources(sources):
+    """Renders the source attributions of an answer."""
+    if sources:
+        st.caption("Sources: " + "; ".join(sources))
+
+def cancel_ingest():
+    """Cancels this session's background ingest job, if any."""
+    if st.session_state.ingest_job_id is not None:
+        get_ingest_job_manager().forget(st.session_state.ingest_job_id)
+        st.session_state.ingest_job_id = None
+
+def reset_index_state():
+    """Clears the index, any running ingest and the related session state."""
+    cancel_ingest()
+    st.session_state.uploaded_file_names = []
+    st.session_state.faiss_index = None
+    st.session_state.indexed_chunk_count = 0
+    st.session_state.source_hashes = {}
+    st.session_state.pending_source_hashes = {}
+    st.session_state.uploaded_hashes = {}
+    st.session_state.loaded_collection = None
+    st.session_state.pending_collection_save = None
+
+def uploaded_content_hashes(files):
+    """Returns file name -> content hash of the uploads (hashed once per upload)."""
+    known = st.session_state.upload_hashes_by_id
+    hashes, by_id = {}, {}
+    for f in files:
+        file_id = getattr(f, "file_id", None)
+        content_hash = known.get(file_id) if file_id else None
+        if content_hash is None:
+            content_hash = file_content_hash(f)
+        if file_id:
+            by_id[file_id] = content_hash
+        hashes[f.name] = content_hash
+    st.session_state.upload_hashes_by_id = by_id
+    return hashes
+
+def start_ingest(files, index=None, target_hashes=None):
+    """Queues a background ingest job adding the given files to (a copy of) an index, or to a new one.
+
+    Args:
+        files: The PDFs to ingest.
+        index: The index to extend; None builds a new index.
+        target_hashes: File name -> content hash of everything in the resulting
+            index; defaults to the given files.
+    """
+    cancel_ingest()
+    st.session_state.pending_source_hashes = (
+        target_hashes if target_hashes is not None else {f.name: file_content_hash(f) for f in files}
+    )
+    st.session_state.loaded_collection = None
+    job_id = get_ingest_job_manager().submit(files, index=index, description=", ".join(sorted(f.name for f in files)))
+    if job_id is None:
+        st.warning("The server is busy indexing other uploads. Please re-upload your PDFs in a moment.")
+    st.session_state.ingest_job_id = job_id
+
+def update_index(valid_files, uploaded_hashes):
+    """Brings the index in line with a changed set of uploads, by file content.
+
+    Chunks of files removed from the uploader are deleted, new files are added
+    by a background job, and unchanged files are not touched. Files of a
+    loaded collection that were never uploaded are kept.
+
+    Args:
+        valid_files: The current valid uploads.
+        uploaded_hashes: File name -> content hash of valid_files.
+    """
+    cancel_ingest()
+    index = st.session_state.faiss_index
+    source_hashes = dict(st.session_state.source_hashes)
+    previous_uploads = set(st.session_state.uploaded_hashes.values())
+    wanted = set(uploaded_hashes.values())
+    removed = {
+        name: content_hash for name, content_hash in source_hashes.items()
+        if content_hash in previous_uploads and content_hash not in wanted
+    }
+    if removed and index is not None:
+        index = delete_documents(index, source_document_ids(index, removed))
+        source_hashes = {name: content_hash for name, content_hash in source_hashes.items() if name not in removed}
+        st.session_state.faiss_index = index
+        st.session_state.indexed_chunk_count = index.index.ntotal if index is not None else 0
+        st.session_state.source_hashes = source_hashes
+        st.session_state.loaded_collection = None
+        logger.info(f"Removed {len(removed)} file(s) from the index: {sorted(removed)}")
+
+    indexed = set(source_hashes.values())
+    new_files = []
+    for f in valid_files:
+        if uploaded_hashes[f.name] not in indexed:
+            new_files.append(f)
+            indexed.add(uploaded_hashes[f.name]) # The same content under two names is ingested once
+    st.session_state.uploaded_hashes = uploaded_hashes
+    if new_files:
+        logger.info(f"Queuing background ingest of {len(new_files)} new file(s); {len(source_hashes)} indexed file(s) kept.")
+        start_ingest(new_files, index, {**source_hashes, **{f.name: uploaded_hashes[f.name] for f in new_files}})
+
+def current_index():
+    """Returns the index to answer from: the ingest job's partial index while it runs, else the session's index."""
+    if st.session_state.ingest_job_id is not None:
+        partial = get_ingest_job_manager().partial_index(st.session_state.ingest_job_id)
+        if partial is not None:
+            return partial
+    return st.session_state.get('faiss_index')
+
+def collect_ingest_result():
+    """Hands the index of a finished ingest job to the session."""
+    manager = get_ingest_job_manager()
+    job_id = st.session_state.ingest_job_id
+    job = manager.get(job_id)
+    if job is not None and job["status"] not in FINISHED_STATES:
+        return
+    st.session_state.ingest_job_id = None
+    if job is None:
+        logger.warning(f"Ingest job {job_id} is no longer known (expired).")
+        st.warning("The indexing job expired. Please upload the PDFs again.")
+        return
+
+    index = manager.result(job_id) if job["status"] == COMPLETED else None
+    manager.forget(job_id)
+    if job["status"] == COMPLETED and index is not None:
+        st.session_state.faiss_index = index
+        st.session_state.source_hashes = st.session_state.pending_source_hashes
+        st.session_state.indexed_chunk_count = index.index.ntotal
+        logger.info(f"FAISS index built and stored in session state successfully ({st.session_state.indexed_chunk_count} chunks).")
+        st.success("Vector index ready.")
+        collection_name = st.session_state.pending_collection_save
+        if collection_name:
+            st.session_state.pending_collection_save = None
+            if save_collection(collection_name, index, st.session_state.source_hashes):
+                st.session_state.loaded_collection = collection_name
+                st.success(f"Rebuilt and saved collection '{collection_name}'.")
+            else:
+                st.error(f"Failed to save collection '{collection_name}'.")
+    elif job["status"] == COMPLETED:
+        logger.warning("PDF processing returned no documents.")
+        st.warning("Could not extract text from the provided PDF(s). Index not built.")
+        st.session_state.indexed_chunk_count = 0
+    elif job["status"] == FAILED:
+        # The session's index (if any) is kept; the new files are not in it
+        st.error(f"An error occurred during PDF processing: {job['error']}")
+    else:
+        st.info("Indexing was cancelled.")
+
+@st.fragment(run_every=1)
+def show_ingest_progress():
+    """Polls the background ingest job; reruns the app once it has finished."""
+    job = get_ingest_job_manager().get(st.session_state.ingest_job_id)
+    if job is None or job["status"] in FINISHED_STATES:
+        st.rerun() # The full run collects the result
+    if job["status"] == QUEUED:
+        st.info(f"Waiting for a free indexing worker ({job['queue_position']} job(s) ahead)...")
+    elif job["stage"] == "optimizing":
+        st.progress(1.0, text=f"Optimizing the index ({job['chunks_indexed']} chunks)...")
+    else:
+        fraction = job["pages_extracted"] / max(job["pages_total"], 1)
+        st.progress(
+            min(fraction, 1.0),
+            text=f"Indexed {job['pages_extracted']}/{job['pages_total']} pages "
+                 f"({job['chunks_indexed']} chunks) from {job['current_source'] or '...'}"
+        )
+    if st.button("Cancel indexing"):
+        cancel_ingest()
+        st.rerun()
+
 # --- UI Layout --- 
 st.title("PDF RAG Chat")
 
+if st.session_state.ingest_job_id is not None:
+    collect_ingest_result()
+
 # --- File Upload Section ---
 uploaded_files = st.file_uploader(
     "Upload your PDF documents (max 3 files, 50MB each)",
@@ -81,13 +278,12 @@ uploaded_files = st.file_uploader(
 )
 
 files_changed = False
+valid_files = []
 if uploaded_files:
     if len(uploaded_files) > MAX_FILES:
         st.error(f"Error: You can only upload a maximum of {MAX_FILES} files at a time.")
         # Clear relevant session state on error
-        st.session_state.uploaded_file_names = []
-        st.session_state.faiss_index = None
-        st.session_state.processed_docs = []
+        reset_index_state()
     else:
         # Validate uploaded files
         valid_files, error_messages = validate_uploaded_files(uploaded_files)
@@ -97,19 +293,15 @@ if uploaded_files:
             for error in error_messages:
                 st.error(error)
             # Clear state if errors occurred
-            st.session_state.uploaded_file_names = []
-            st.session_state.faiss_index = None
-            st.session_state.processed_docs = []
+            reset_index_state()
         
-        # Check if the set of valid files has changed
+        # Check if the set of valid files has changed (by content, not by name)
         current_file_names = sorted([f.name for f in valid_files])
-        if current_file_names != st.session_state.get('uploaded_file_names', []):
+        uploaded_hashes = uploaded_content_hashes(valid_files)
+        if set(uploaded_hashes.values()) != set(st.session_state.uploaded_hashes.values()):
             files_changed = True
             st.session_state.uploaded_file_names = current_file_names
             logger.info(f"Detected change in uploaded files: {current_file_names}")
-            # Reset index and docs when files change
-            st.session_state.faiss_index = None
-            st.session_state.processed_docs = []
 
         # Display success/warning for valid files 
         if valid_files:
@@ -117,85 +309,151 @@ if uploaded_files:
                 st.success(f"Successfully validated {len(valid_files)} PDF file(s): {', '.join(current_file_names)}")
         elif not error_messages: # Handle case where <= MAX_FILES are uploaded, but none are valid
              st.warning("No valid PDF files were uploaded. Please ensure files are PDFs and under 50MB.")
-             st.session_state.uploaded_file_names = [] # Clear state here too
-             st.session_state.faiss_index = None
-             st.session_state.processed_docs = []
+             reset_index_state() # Clear state here too
              
-        # --- Index Building Logic (if valid files exist and changed or index missing) ---
-        if valid_files and (files_changed or st.session_state.faiss_index is None):
-            logger.info("Valid files uploaded or changed, proceeding to process and build index...")
-            with st.spinner("Processing PDFs and building vector index..."):
-                try:
-                    # Pass the list of valid UploadedFile objects
-                    processed_docs = process_pdfs_to_documents(valid_files)
-                    if processed_docs:
-                        st.session_state.processed_docs = processed_docs
-                        logger.info(f"Successfully processed {len(processed_docs)} documents from {len(valid_files)} files.")
-                        
-                        # Build the FAISS index in memory
-                        st.session_state.faiss_index = build_faiss_index(processed_docs)
-                        
-                        if st.session_state.faiss_index:
-                            logger.info("FAISS index built and stored in session state successfully.")
-                            st.success("Vector index ready.")
-                        else:
-                            logger.error("Failed to build FAISS index after processing documents.")
-                            st.error("Failed to build the vector index from the documents.")
-                    else:
-                        logger.warning("PDF processing returned no documents.")
-                        st.warning("Could not extract text from the provided PDF(s). Index not built.")
-                        st.session_state.faiss_index = None # Ensure index is None
-                        st.session_state.processed_docs = []
-
-                except Exception as e:
-                    logger.exception("An error occurred during PDF processing or index building.")
-                    st.error(f"An error occurred during PDF processing: {e}")
-                    st.session_state.faiss_index = None # Ensure index is None on error
-                    st.session_state.processed_docs = []
+        # --- Index Update Logic (only new files are ingested, removed ones are deleted) ---
+        if valid_files and files_changed:
+            update_index(valid_files, uploaded_hashes)
 
 elif not uploaded_files and st.session_state.get('uploaded_file_names', []):
     # If files are removed via the UI, clear the state
     logger.info("Files removed from uploader. Clearing index and docs from session state.")
-    st.session_state.uploaded_file_names = []
-    st.session_state.faiss_index = None
-    st.session_state.processed_docs = []
+    reset_index_state()
     st.info("PDFs removed. Upload new files to chat.") # Inform user
 
+# Progress of the background ingest; questions can be asked against the partial index meanwhile
+if st.session_state.ingest_job_id is not None:
+    show_ingest_progress()
+
+# --- Saved Index Collections ---
+with st.sidebar:
+    st.header("Index Collections")
+    index_idle = st.session_state.get('faiss_index') is not None and st.session_state.ingest_job_id is None
+    save_name = st.text_input("Collection name", value=st.session_state.loaded_collection or "")
+    if st.button("Save current index", disabled=not (index_idle and save_name)):
+        if save_collection(save_name, st.session_state.faiss_index, st.session_state.source_hashes):
+            st.session_state.loaded_collection = save_name
+            st.success(f"Saved collection '{save_name}'.")
+        else:
+            st.error(f"Could not save collection '{save_name}'. Check the name and the logs.")
+
+    collections = list_collections()
+    selected_collection = st.selectbox("Saved collections", collections, index=None, placeholder="Choose a collection")
+    if st.button("Load collection", disabled=selected_collection is None):
+        loaded_index = load_collection(selected_collection)
+        if loaded_index is not None:
+            cancel_ingest()
+            st.session_state.faiss_index = loaded_index
+            st.session_state.indexed_chunk_count = loaded_index.index.ntotal
+            st.session_state.source_hashes = read_manifest(selected_collection).get("content_hashes", {})
+            st.session_state.loaded_collection = selected_collection
+            logger.info(f"Loaded collection '{selected_collection}' into session state.")
+            st.success(f"Loaded collection '{selected_collection}'.")
+        elif read_manifest(selected_collection) is not None and valid_files:
+            # Built with another model or chunking setup: rebuild from the uploaded PDFs
+            logger.info(f"Collection '{selected_collection}' is stale; rebuilding it from the uploaded files.")
+            start_ingest(valid_files)
+            st.session_state.pending_collection_save = selected_collection if st.session_state.ingest_job_id else None
+            st.info(f"Collection '{selected_collection}' was built with different settings. Rebuilding it from the uploaded PDFs...")
+        else:
+            st.warning(f"Could not load collection '{selected_collection}'. "
+                       "If it was built with different settings, upload its PDFs to rebuild it.")
+
+    answer_cache = get_answer_cache()
+    if answer_cache is not None:
+        cache_stats = answer_cache.stats()
+        if cache_stats["hit_rate"] is not None:
+            st.caption(f"Answer cache: {cache_stats['hit_rate']:.0%} hit rate "
+                       f"({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']}), "
+                       f"{cache_stats['entries']} cached answers")
+
+    stage_latencies = get_metrics().snapshot()["histograms"].get("stage_duration_seconds", [])
+    if stage_latencies:
+        with st.expander("Stage latency"):
+            st.json({
+                series["labels"]["stage"]: {
+                    "count": series["count"],
+                    "p50_ms": round(series["p50"] * 1000, 1),
+                    "p95_ms": round(series["p95"] * 1000, 1),
+                }
+                for series in stage_latencies
+            })
+
 # --- Display Current State --- 
 st.divider()
-if st.session_state.get('faiss_index'):
-    st.subheader(f"Index Ready for {len(st.session_state.get('uploaded_file_names',[]))} PDFs")
-    st.caption(f"({len(st.session_state.get('processed_docs',[]))} document chunks indexed)")
+if st.session_state.ingest_job_id is not None:
+    st.subheader(f"Indexing {len(st.session_state.get('uploaded_file_names',[]))} PDFs in the background")
+    st.caption("Questions are answered from the pages indexed so far.")
+elif st.session_state.get('faiss_index'):
+    if st.session_state.loaded_collection:
+        st.subheader(f"Collection '{st.session_state.loaded_collection}' Ready ({len(st.session_state.source_hashes)} PDFs)")
+    else:
+        st.subheader(f"Index Ready for {len(st.session_state.get('uploaded_file_names',[]))} PDFs")
+    st.caption(f"({st.session_state.get('indexed_chunk_count', 0)} document chunks indexed)")
 else:
     st.caption("No vector index ready. Upload valid PDF files.")
 
 st.divider()
 
+# --- Search Scope ---
+# Restricts retrieval to some files and/or pages (numbered like the sources shown with answers)
+search_sources, page_range = None, None
+# The finished index, or the partial one while ingestion runs in the background (looked up once per rerun)
+index = current_index()
+if index is not None:
+    with st.expander("Search scope"):
+        search_sources = st.multiselect("Only search these files", index_sources(index), key="search_sources") or None
+        first_column, last_column = st.columns(2)
+        first_page = first_column.number_input("From page", min_value=0, value=None, step=1, key="search_first_page")
+        last_page = last_column.number_input("To page", min_value=0, value=None, step=1, key="search_last_page")
+        if first_page is not None or last_page is not None:
+            page_range = (int(first_page or 0), int(last_page) if last_page is not None else sys.maxsize)
+            if page_range[0] > page_range[1]:
+                st.warning("'From page' is after 'To page': no pages match.")
+
 # --- Query Input and Processing ---
 user_query = st.text_input("Ask a question about your documents:", key="query_input")
 
 if user_query:
-    # Check if index is ready in session state
-    if st.session_state.get('faiss_index') is None:
+    if index is None:
         logger.warning("Query attempt failed: FAISS index not found in session state.")
         st.warning("Please upload valid PDF documents and wait for processing before asking a question.")
     else:
         logger.info(f"Processing query: '{user_query[:50]}...' using in-memory index.")
         try:
-            # Retrieve index from session state
-            index = st.session_state.faiss_index
-            
             logger.debug("Calling query processor...")
-            # Note: process_query might not be needed if it only formats text.
-            # If the RAG chain handles formatting, you could pass user_query directly.
-            formatted_query_or_original = process_query(user_query) # Assuming this returns the string to search with
-            logger.debug(f"Query for search: {formatted_query_or_original}")
+            # Validates the input (raises ValueError if empty). Its chat-formatted output is
+            # not used for search: the raw question embeds closer to the document text.
+            process_query(user_query)
+            search_query = user_query.strip()
+            logger.debug(f"Query for search: {search_query}")
 
             st.divider()
             logger.info("Attempting document retrieval from session state index...")
             try:
-                # Use the index directly from session state
-                results = search_index(formatted_query_or_original, index, top_k=3)
+                # Embedded once: used for the answer cache lookup and the search
+                query_vector = embed_query(search_query)
+
+                # Answers are only cached against a complete, known document set
+                cache_fingerprint = None
+                cached = None
+                if (answer_cache is not None and query_vector is not None
+                        and st.session_state.ingest_job_id is None and st.session_state.source_hashes):
+                    cache_fingerprint = document_set_fingerprint(
+                        st.session_state.source_hashes.values(), embedding_model_id(get_embedding_function()), TOP_K, SEARCH_MODE,
+                        sorted(search_sources or []), page_range, rerank_settings()
+                    )
+                    cached = answer_cache.get(cache_fingerprint, query_vector)
+
+                # Single retrieval pass: these chunks are shown and passed to the LLM as its context
+                if cached:
+                    results = cached["documents"]
+                else:
+                    results = search_index(
+                        search_query, index, top_k=rerank_fetch_k(TOP_K), query_vector=query_vector, mode=SEARCH_MODE,
+                        sources=search_sources, page_range=page_range
+                    )
+                    results = rerank_documents(search_query, results, TOP_K)
                 
                 if results:
                     logger.info(f"Retrieved {len(results)} relevant chunks from in-memory index.")
@@ -209,20 +467,29 @@ if user_query:
                             st.info(f"**Chunk {i+1} (Source: {source}, Page: {page})**\n{doc.page_content[:300]}...")
                     
                     # --- Answer Generation --- 
-                    if LANGCHAIN_API_KEY:
+                    if cached:
+                        st.divider()
+                        logger.info("Serving answer from the semantic answer cache.")
+                        st.subheader("Generated Answer:")
+                        st.caption(f"From cache: similar to \"{cached['query']}\" (similarity {cached['similarity']:.2f})")
+                        show_sources(cached["result"]["sources"])
+                        st.write(cached["result"]["answer"])
+                    elif LANGCHAIN_API_KEY:
                         st.divider()
                         logger.info("Generating answer using retrieved chunks...")
-                        with st.spinner("Generating answer..."):
-                             # Create retriever from the session state index
-                            retriever = index.as_retriever(search_kwargs={"k": 3})
-                            try:
-                                final_answer = generate_answer(user_query, retriever)
-                                logger.info("Answer generated successfully.")
-                                st.subheader("Generated Answer:")
-                                st.write(final_answer)
-                            except Exception as e:
-                                logger.exception("An error occurred during answer generation.")
-                                st.error("An error occurred while generating the answer.")
+                        try:
+                            # Sources are known up front; the answer is rendered token by token
+                            answer_stream = stream_answer(user_query, documents=results)
+                            st.subheader("Generated Answer:")
+                            show_sources(answer_stream["sources"])
+                            answer_text = st.write_stream(answer_stream["tokens"])
+                            logger.info("Answer generated successfully.")
+                            final_answer = {"answer": answer_text, "sources": answer_stream["sources"]}
+                            if cache_fingerprint and GENERATION_ERROR_ANSWER not in answer_text:
+                                answer_cache.put(cache_fingerprint, search_query, query_vector, final_answer, results)
+                        except Exception as e:
+                            logger.exception("An error occurred during answer generation.")
+                            st.error("An error occurred while generating the answer.")
                     else:
                         logger.error("Cannot generate answer: LangChain API Key is missing.")
                         st.error("Cannot generate answer: LangChain API Key is missing.")
@@ -240,4 +507,4 @@ if user_query:
             st.error(f"Error processing query input: {e}")
         except Exception as e:
             logger.exception("An unexpected error occurred during query handling.")
-            st.error(f"An unexpected error occurred: {e}") 
\ No newline at end of file
+            st.error(f"An unexpected error occurred: {e}") 
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Batch question answering for RAG Chat.
+
+Answers a question set (e.g. a compliance checklist) against one corpus: a
+saved index collection or a set of PDFs indexed on the fly. All questions are
+embedded in one batch and searched with one FAISS call; the LLM calls then run
+concurrently under a rate limit. Results are written to JSONL, one line per
+question with its answer, sources and latency.
+
+Usage:
+    python batch_qa.py QUESTIONS (--collection NAME | --pdf PDF [PDF ...]) [--output FILE]
+                       [--top-k K] [--concurrency N] [--rpm N]
+
+Options:
+    QUESTIONS: Text file with one question per line, or JSONL with a 'question' field
+    --collection: Saved index collection to answer from
+    --pdf: PDFs to index and answer from
+    --output: JSONL file for the results (default: batch_results.jsonl)
+    --top-k: Chunks retrieved per question (default: 3)
+    --concurrency: LLM calls in flight at once (default: LLM_MAX_CONCURRENCY)
+    --rpm: Maximum LLM calls started per minute (default: BATCH_REQUESTS_PER_MINUTE, 0 = no limit)
+"""
+
+import argparse
+import io
+import os
+import sys
+
+from dotenv import load_dotenv
+
+from src.config.logging_config import setup_logging
+from src.generation.batch_answers import load_questions, run_batch, write_results_jsonl
+from src.processing.ingest_pipeline import stream_ingest
+from src.retrieval.index_collections import load_collection
+
+def build_index(paths):
+    uploads = []
+    for path in paths:
+        with open(path, "rb") as f:
+            upload = io.BytesIO(f.read())
+        upload.name = os.path.basename(path)
+        uploads.append(upload)
+    index = None
+    for progress in stream_ingest(uploads):
+        index = progress["index"]
+    return index
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a set of questions against one corpus")
+    parser.add_argument("questions", help="Text file (one question per line) or JSONL with a 'question' field")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--collection", help="Saved index collection to answer from")
+    source.add_argument("--pdf", nargs="+", help="PDFs to index and answer from")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSONL file for the results")
+    parser.add_argument("--top-k", type=int, default=3, help="Chunks retrieved per question")
+    parser.add_argument("--concurrency", type=int, help="LLM calls in flight at once")
+    parser.add_argument("--rpm", type=float, help="Maximum LLM calls started per minute (0 = no limit)")
+    args = parser.parse_args()
+    load_dotenv()
+    setup_logging()
+
+    questions = load_questions(args.questions)
+    if not questions:
+        print(f"No questions found in '{args.questions}'.")
+        return 1
+    index = load_collection(args.collection) if args.collection else build_index(args.pdf)
+    if index is None:
+        print("Could not load or build the index (see the log for details).")
+        return 1
+
+    print(f"Answering {len(questions)} questions against {index.index.ntotal} chunks...")
+    results = run_batch(questions, index, top_k=args.top_k, max_concurrency=args.concurrency, requests_per_minute=args.rpm)
+    if not write_results_jsonl(results, args.output):
+        return 1
+
+    failed = sum(result["error"] for result in results)
+    latencies = sorted(result["latency_seconds"] for result in results)
+    print(
+        f"Wrote {len(results)} results to '{args.output}' ({failed} failed); "
+        f"median latency {latencies[len(latencies) // 2]:.2f}s, max {latencies[-1]:.2f}s."
+    )
+    return 0 if not failed else 2
+
+if __name__ == "__main__":
+    sys.exit(main())
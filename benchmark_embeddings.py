@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Embedding backend benchmark for RAG Chat.
+
+Embeds the chunks of one or more PDFs with the sentence-transformers (PyTorch)
+backend and the ONNX Runtime int8 backend, then reports throughput, query
+latency and how closely the ONNX results agree with PyTorch: cosine similarity
+of the chunk vectors and overlap of the top-k retrieved chunks.
+
+Usage:
+    python benchmark_embeddings.py [PDF ...] [--top-k K] [--queries FILE] [--model NAME]
+
+Options:
+    PDF: PDFs to chunk and embed (default: tests/fixtures/multipage.pdf)
+    --top-k: Number of results compared per query (default: 5)
+    --queries: Text file with one query per line (default: first sentence of sampled chunks)
+    --model: Sentence-transformers model name (default: all-MiniLM-L6-v2)
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+from src.processing.pdf_processor import process_pdfs_to_documents
+from src.retrieval.onnx_embeddings import OnnxEmbeddings
+from src.retrieval.vector_store import DEFAULT_EMBEDDING_MODEL
+
+DEFAULT_PDF = os.path.join("tests", "fixtures", "multipage.pdf")
+
+def load_chunks(paths):
+    uploads = []
+    for path in paths:
+        with open(path, "rb") as f:
+            upload = io.BytesIO(f.read())
+        upload.name = os.path.basename(path)
+        uploads.append(upload)
+    return [doc.page_content for doc in process_pdfs_to_documents(uploads)]
+
+def load_queries(path, chunks, count=20):
+    if path:
+        with open(path) as f:
+            return [line.strip() for line in f if line.strip()]
+    step = max(1, len(chunks) // count)
+    return [chunk.split(".")[0][:200] for chunk in chunks[::step][:count]]
+
+def run_backend(name, embeddings, chunks, queries):
+    embeddings.embed_documents(chunks[:2]) # Warm-up, excluded from timing
+    start = time.perf_counter()
+    doc_vectors = np.asarray(embeddings.embed_documents(chunks), dtype=np.float32)
+    doc_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    query_vectors = np.asarray([embeddings.embed_query(q) for q in queries], dtype=np.float32)
+    query_seconds = time.perf_counter() - start
+    print(
+        f"{name:<8} {len(chunks) / doc_seconds:>10.1f} chunks/sec"
+        f" {1000 * query_seconds / len(queries):>8.1f} ms/query"
+    )
+    return doc_vectors, query_vectors
+
+def normalize(vectors):
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+def top_k(doc_vectors, query_vectors, k):
+    # Same ranking as the FAISS L2 index for normalized vectors
+    scores = normalize(query_vectors) @ normalize(doc_vectors).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PyTorch and ONNX int8 embedding backends")
+    parser.add_argument("pdfs", nargs="*", default=[DEFAULT_PDF], help="PDFs to chunk and embed")
+    parser.add_argument("--top-k", type=int, default=5, help="Results compared per query")
+    parser.add_argument("--queries", help="Text file with one query per line")
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL, help="Sentence-transformers model name")
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.pdfs)
+    if not chunks:
+        print("No text chunks extracted from the given PDFs.")
+        return 1
+    queries = load_queries(args.queries, chunks)
+    k = min(args.top_k, len(chunks))
+    print(f"Benchmarking '{args.model}' on {len(chunks)} chunks and {len(queries)} queries (top-{k}).\n")
+
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    torch_docs, torch_queries = run_backend("torch", HuggingFaceEmbeddings(model_name=args.model), chunks, queries)
+    onnx_docs, onnx_queries = run_backend("onnx", OnnxEmbeddings(args.model), chunks, queries)
+
+    cosines = np.sum(normalize(torch_docs) * normalize(onnx_docs), axis=1)
+    torch_hits = top_k(torch_docs, torch_queries, k)
+    onnx_hits = top_k(onnx_docs, onnx_queries, k)
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(torch_hits, onnx_hits)])
+    top1 = np.mean(torch_hits[:, 0] == onnx_hits[:, 0])
+
+    print(f"\nChunk vector cosine (onnx vs torch): mean {cosines.mean():.4f}, min {cosines.min():.4f}")
+    print(f"Top-{k} overlap: {overlap:.1%}, top-1 agreement: {top1:.1%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
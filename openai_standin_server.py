@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+OpenAI-compatible stand-in server for RAG Chat load tests.
+
+Answers POST /v1/chat/completions (streaming and non-streaming) with a canned
+reply after a configurable delay, so the app and the answer generator can be
+load-tested without calling (or paying for) the real API. Point the app at it
+with OPENAI_BASE_URL.
+
+Usage:
+    python openai_standin_server.py [--port PORT] [--latency SECONDS] [--token-delay SECONDS]
+
+    OPENAI_BASE_URL="http://127.0.0.1:8001/v1" OPENAI_API_KEY="test" streamlit run app.py
+
+Options:
+    --port: Port to listen on (default: 8001)
+    --latency: Delay before the first token (default: 0.2)
+    --token-delay: Delay between streamed tokens (default: 0.01)
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def _reply_text(request):
+    question = next((m.get("content", "") for m in reversed(request.get("messages", [])) if m.get("role") == "user"), "")
+    return f"Stand-in answer ({len(question)} prompt characters received)."
+
+def make_handler(latency, token_delay):
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1" # Keep-alive, like the real API
+
+        def log_message(self, format, *args):
+            pass # Keep load test output clean
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self.send_error(404)
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            model = request.get("model", "stand-in")
+            text = _reply_text(request)
+            time.sleep(latency)
+
+            if not request.get("stream"):
+                body = json.dumps({
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": len(text.split()), "total_tokens": len(text.split())},
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            words = text.split(" ")
+            for i, word in enumerate(words):
+                delta = {"role": "assistant", "content": word if i == 0 else f" {word}"}
+                self._send_event({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+                })
+                time.sleep(token_delay)
+            self._send_event({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            })
+            self._send_chunk(b"data: [DONE]\n\n")
+            self._send_chunk(b"")
+
+        def _send_event(self, payload):
+            self._send_chunk(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+
+        def _send_chunk(self, data):
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+    return StandInHandler
+
+def start_server(port=0, latency=0.0, token_delay=0.0):
+    """Starts the stand-in server in a background thread and returns it (server.server_port is the port)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency, token_delay))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="openai-standin", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stand-in server for load tests")
+    parser.add_argument("--port", type=int, default=8001, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.2, help="Delay before the first token (seconds)")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Delay between streamed tokens (seconds)")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(args.latency, args.token_delay))
+    print(f"Stand-in OpenAI server listening on http://127.0.0.1:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,329 @@
+# src/api/server.py
+"""
+Headless HTTP API for RAG Chat.
+
+Exposes ingest, index status, search and answer endpoints over the same
+processing, retrieval and generation functions the Streamlit app uses, so
+other services can call them and several instances can be load-balanced.
+
+Usage:
+    python -m src.api.server [--host HOST] [--port PORT]
+    uvicorn src.api.server:app --host 0.0.0.0 --port 8000
+"""
+
+import argparse
+import asyncio
+import io
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Literal, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, File, HTTPException, Query, UploadFile
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+
+from src.config.logging_config import setup_logging
+from src.config.metrics import get_metrics
+from src.generation.answer_cache import document_set_fingerprint, get_answer_cache
+from src.generation.answer_generator import GENERATION_ERROR_ANSWER, agenerate_answer
+from src.processing.ingest_pipeline import stream_ingest
+from src.processing.pdf_processor import file_content_hash
+from src.retrieval.index_collections import collection_path, save_collection
+from src.retrieval.index_registry import get_index_registry
+from src.retrieval.reranker import arerank_documents, rerank_fetch_k, rerank_settings
+from src.retrieval.vector_store import (
+    SEARCH_MODE, aembed_query, asearch_index, copy_index, embedding_model_id, get_embedding_function, get_retrieval_executor,
+    warm_up_embedding_model
+)
+
+# Get logger instance using standard practice
+logger = logging.getLogger(__name__)
+
+# Concurrent ingest jobs; further uploads wait for a free worker
+API_INGEST_WORKERS = int(os.getenv("API_INGEST_WORKERS", "2"))
+# Time limits for search/answer requests and for ingest requests
+API_REQUEST_TIMEOUT_SECONDS = float(os.getenv("API_REQUEST_TIMEOUT_SECONDS", "60"))
+API_INGEST_TIMEOUT_SECONDS = float(os.getenv("API_INGEST_TIMEOUT_SECONDS", "900"))
+MAX_FILE_SIZE_MB = 50
+MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
+MAX_TOP_K = 50
+
+_ingest_pool: Optional[ThreadPoolExecutor] = None
+_ingest_pool_lock = threading.Lock()
+
+def get_ingest_pool() -> ThreadPoolExecutor:
+    """Returns the process-wide ingest worker pool (API_INGEST_WORKERS threads)."""
+    global _ingest_pool
+    with _ingest_pool_lock:
+        if _ingest_pool is None:
+            _ingest_pool = ThreadPoolExecutor(max_workers=max(1, API_INGEST_WORKERS), thread_name_prefix="ingest")
+        return _ingest_pool
+
+def shutdown_ingest_pool() -> None:
+    """Shuts down the ingest worker pool, dropping queued jobs; it is recreated on next use."""
+    global _ingest_pool
+    with _ingest_pool_lock:
+        if _ingest_pool is not None:
+            _ingest_pool.shutdown(wait=False, cancel_futures=True)
+            _ingest_pool = None
+
+class QueryRequest(BaseModel):
+    query: str
+    top_k: int = Field(3, ge=1, le=MAX_TOP_K)
+    mode: Literal["dense", "hybrid", "mmr"] = SEARCH_MODE
+    sources: Optional[List[str]] = None # Only search chunks from these files
+    page_range: Optional[Tuple[int, int]] = None # Only search pages first..last (inclusive, 0-based like 'page')
+
+def _document_to_dict(doc) -> Dict[str, Any]:
+    return {
+        "content": doc.page_content,
+        "source": doc.metadata.get("source"),
+        "page": doc.metadata.get("page"),
+    }
+
+def _validate_name(name: str) -> None:
+    try:
+        collection_path(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _validate_query(request: QueryRequest) -> str:
+    query = request.query.strip()
+    if not query:
+        raise HTTPException(status_code=422, detail="Query cannot be empty.")
+    if request.page_range is not None and request.page_range[0] > request.page_range[1]:
+        raise HTTPException(status_code=422, detail="page_range must be [first, last] with first <= last.")
+    return query
+
+async def _retrieve(query: str, index, request: QueryRequest, query_vector: Optional[List[float]] = None):
+    """Searches the index (over-fetching when reranking is on) and reranks to request.top_k."""
+    documents = await asearch_index(
+        query, index, top_k=rerank_fetch_k(request.top_k), query_vector=query_vector, mode=request.mode,
+        sources=request.sources, page_range=request.page_range
+    )
+    return await arerank_documents(query, documents, request.top_k)
+
+async def _get_index_or_404(name: str):
+    _validate_name(name)
+    # May load a saved collection from disk, so keep it off the event loop
+    index = await asyncio.get_running_loop().run_in_executor(get_retrieval_executor(), get_index_registry().get, name)
+    if index is None:
+        raise HTTPException(status_code=404, detail=f"Index '{name}' not found.")
+    return index
+
+async def _with_timeout(awaitable, seconds: float, what: str, cancel_event: Optional[threading.Event] = None):
+    """Awaits with a time limit, raising 504 when it is exceeded.
+
+    Timing out only stops waiting: work running on a worker thread carries on
+    unless it watches cancel_event, which is set on timeout.
+    """
+    try:
+        return await asyncio.wait_for(awaitable, timeout=seconds)
+    except asyncio.TimeoutError:
+        if cancel_event is not None:
+            cancel_event.set()
+        logger.error(f"{what} timed out after {seconds:.0f}s.")
+        raise HTTPException(status_code=504, detail=f"{what} timed out after {seconds:.0f}s.")
+
+def ingest_files(
+    name: str, uploads: List[io.BytesIO], save: bool = False, cancel_event: Optional[threading.Event] = None
+) -> Optional[Dict[str, Any]]:
+    """Adds PDFs to a named index (creating it if needed); runs on an ingest worker.
+
+    Files whose content is already in the index are skipped. The new files are
+    ingested into a copy of the current index, which then replaces it, so
+    searches keep using the previous version until the ingest is complete.
+
+    Args:
+        name: The index name.
+        uploads: The PDFs, as BytesIO objects with a 'name' attribute.
+        save: Whether to save the result as an index collection.
+        cancel_event: Checked between page windows and before the index is
+            replaced; once set, the ingest stops and the index is left unchanged.
+
+    Returns:
+        The index status plus 'added' and 'skipped' file names, or None if cancelled.
+
+    Raises:
+        RuntimeError: If the embedding model cannot be loaded or the files contain no text.
+    """
+    def cancelled() -> bool:
+        if cancel_event is None or not cancel_event.is_set():
+            return False
+        logger.warning(f"Ingest into '{name}' cancelled; the index was left unchanged.")
+        return True
+
+    registry = get_index_registry()
+    with registry.writer_lock(name):
+        if cancelled(): # Timed out while queued or waiting for the writer lock
+            return None
+        current = registry.get(name)
+        content_hashes = registry.content_hashes(name)
+        known = set(content_hashes.values())
+        new_files, new_hashes, skipped = [], {}, []
+        for upload in uploads:
+            content_hash = file_content_hash(upload)
+            if content_hash in known or content_hash in new_hashes.values():
+                skipped.append(upload.name)
+            else:
+                new_files.append(upload)
+                new_hashes[upload.name] = content_hash
+
+        if new_files:
+            index = copy_index(current) if current is not None else None
+            stream = stream_ingest(new_files, index=index)
+            for progress in stream:
+                if cancelled():
+                    stream.close()
+                    return None
+                index = progress["index"]
+            if index is None:
+                raise RuntimeError("No text could be extracted from the uploaded files.")
+            if cancelled():
+                return None
+            content_hashes.update(new_hashes)
+            registry.put(name, index, content_hashes)
+            if save and not save_collection(name, index, content_hashes):
+                logger.error(f"Index '{name}' was updated but could not be saved as a collection.")
+        elif current is None:
+            raise RuntimeError("No files to ingest.")
+
+    logger.info(f"Ingest into '{name}' finished: {len(new_files)} added, {len(skipped)} skipped.")
+    return {**registry.status(name), "added": sorted(new_hashes), "skipped": skipped}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    load_dotenv()
+    warm_up_embedding_model() # Load the shared model while the server starts
+    yield
+    shutdown_ingest_pool()
+
+app = FastAPI(title="RAG Chat API", lifespan=lifespan)
+
+@app.get("/health")
+async def health() -> Dict[str, Any]:
+    return {"status": "ok"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Stage latencies and counters in the Prometheus text format."""
+    return PlainTextResponse(get_metrics().prometheus_text(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics.json")
+async def metrics_json() -> Dict[str, Any]:
+    """Stage latencies (with p50/p95/p99 estimates) and counters as JSON."""
+    return get_metrics().snapshot()
+
+@app.get("/indexes")
+async def list_indexes() -> Dict[str, Any]:
+    registry = get_index_registry()
+    names = registry.names()
+    return {"indexes": [registry.status(name) or {"name": name, "loaded": False} for name in names]}
+
+@app.get("/indexes/{name}")
+async def index_status(name: str) -> Dict[str, Any]:
+    await _get_index_or_404(name)
+    return get_index_registry().status(name)
+
+@app.delete("/indexes/{name}")
+async def unload_index(name: str) -> Dict[str, Any]:
+    _validate_name(name)
+    if not get_index_registry().remove(name):
+        raise HTTPException(status_code=404, detail=f"Index '{name}' is not loaded.")
+    return {"name": name, "unloaded": True}
+
+@app.post("/indexes/{name}/documents")
+async def ingest(
+    name: str,
+    files: List[UploadFile] = File(...),
+    save: bool = Query(False, description="Also save the index as a collection")
+) -> Dict[str, Any]:
+    _validate_name(name)
+    uploads = []
+    for file in files:
+        if file.content_type != "application/pdf":
+            raise HTTPException(status_code=415, detail=f"'{file.filename}': Only PDF files are allowed.")
+        content = await file.read()
+        if len(content) > MAX_FILE_SIZE_BYTES:
+            raise HTTPException(status_code=413, detail=f"'{file.filename}': File exceeds the {MAX_FILE_SIZE_MB} MB limit.")
+        upload = io.BytesIO(content)
+        upload.name = os.path.basename(file.filename or "upload.pdf")
+        uploads.append(upload)
+
+    loop = asyncio.get_running_loop()
+    cancel_event = threading.Event()
+    future = loop.run_in_executor(get_ingest_pool(), ingest_files, name, uploads, save, cancel_event)
+    try:
+        return await _with_timeout(future, API_INGEST_TIMEOUT_SECONDS, f"Ingest into '{name}'", cancel_event)
+    except RuntimeError as e:
+        logger.exception(f"Ingest into '{name}' failed.")
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.post("/indexes/{name}/search")
+async def search(name: str, request: QueryRequest) -> Dict[str, Any]:
+    index = await _get_index_or_404(name)
+    query = _validate_query(request)
+    documents = await _with_timeout(
+        _retrieve(query, index, request), API_REQUEST_TIMEOUT_SECONDS, "Search"
+    )
+    return {"query": query, "results": [_document_to_dict(doc) for doc in documents]}
+
+@app.post("/indexes/{name}/answer")
+async def answer(name: str, request: QueryRequest) -> Dict[str, Any]:
+    index = await _get_index_or_404(name)
+    query = _validate_query(request)
+
+    async def run() -> Dict[str, Any]:
+        query_vector = await aembed_query(query)
+        answer_cache = get_answer_cache()
+        fingerprint = None
+        if answer_cache is not None and query_vector is not None:
+            fingerprint = document_set_fingerprint(
+                get_index_registry().content_hashes(name).values(),
+                embedding_model_id(get_embedding_function()),
+                request.top_k,
+                request.mode,
+                sorted(request.sources or []),
+                request.page_range,
+                rerank_settings(),
+            )
+            cached = answer_cache.get(fingerprint, query_vector)
+            if cached is not None:
+                return {**cached["result"], "documents": cached["documents"], "cached": True}
+
+        documents = await _retrieve(query, index, request, query_vector)
+        result = await agenerate_answer(query, documents=documents)
+        if result["answer"] == GENERATION_ERROR_ANSWER:
+            raise HTTPException(status_code=502, detail=GENERATION_ERROR_ANSWER)
+        if fingerprint is not None:
+            answer_cache.put(fingerprint, query, query_vector, result, documents)
+        return {**result, "documents": documents, "cached": False}
+
+    result = await _with_timeout(run(), API_REQUEST_TIMEOUT_SECONDS, "Answer")
+    return {
+        "query": query,
+        "answer": result["answer"],
+        "sources": result["sources"],
+        "documents": [_document_to_dict(doc) for doc in result["documents"]],
+        "cached": result["cached"],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the RAG Chat HTTP API")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    setup_logging()
+    uvicorn.run(app, host=args.host, port=args.port)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+# src/config/metrics.py
+
+import bisect
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+# Get logger instance using standard practice
+logger = logging.getLogger(__name__)
+
+# Metrics can be switched off entirely (observations become no-ops)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() not in ("0", "false", "no", "off")
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRIC_PREFIX = "rag_"
+
+# Help texts for the Prometheus output
+METRIC_HELP = {
+    "stage_duration_seconds": "Time spent in each pipeline stage.",
+    "stage_errors_total": "Pipeline stage executions that raised an exception.",
+    "items_total": "Items processed by pipeline stages (pages, chunks, queries).",
+    "answer_cache_lookups_total": "Semantic answer cache lookups by result.",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # Last slot: above the largest bound
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimates a quantile by linear interpolation within its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i == len(self.buckets):
+                    return lower # Above the largest bound
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+class MetricsRegistry:
+    """Thread-safe counters and latency histograms for the RAG pipeline.
+
+    An observation is a lock, a bisect over ~15 bucket bounds and three
+    additions, cheap enough to stay enabled in production. Metrics are
+    identified by name plus labels (e.g. stage="search").
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Adds a value (usually seconds) to a histogram."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    def increment(self, name: str, amount: float = 1, **labels: Any) -> None:
+        """Adds to a counter."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Returns all metrics as a JSON-serializable dictionary.
+
+        Histograms report count, sum, mean, estimated p50/p95/p99 and the
+        per-bucket (non-cumulative) counts; counters report their value.
+        """
+        with self._lock:
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(key),
+                        "count": h.count,
+                        "sum": h.sum,
+                        "mean": h.sum / h.count if h.count else None,
+                        "p50": h.quantile(0.5),
+                        "p95": h.quantile(0.95),
+                        "p99": h.quantile(0.99),
+                        "buckets": dict(zip([str(b) for b in h.buckets] + ["+Inf"], h.counts)),
+                    }
+                    for key, h in sorted(series.items())
+                ]
+                for name, series in sorted(self._histograms.items())
+            }
+            counters = {
+                name: [{"labels": dict(key), "value": value} for key, value in sorted(series.items())]
+                for name, series in sorted(self._counters.items())
+            }
+        return {"histograms": histograms, "counters": counters, "timestamp": time.time()}
+
+    def prometheus_text(self) -> str:
+        """Renders all metrics in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                full_name = METRIC_PREFIX + name
+                lines.append(f"# HELP {full_name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {full_name} histogram")
+                for key, h in sorted(series.items()):
+                    cumulative = 0
+                    for bound, bucket_count in zip(h.buckets, h.counts):
+                        cumulative += bucket_count
+                        lines.append(f"{full_name}_bucket{_format_labels(key, ('le', repr(bound)))} {cumulative}")
+                    lines.append(f"{full_name}_bucket{_format_labels(key, ('le', '+Inf'))} {h.count}")
+                    lines.append(f"{full_name}_sum{_format_labels(key)} {h.sum}")
+                    lines.append(f"{full_name}_count{_format_labels(key)} {h.count}")
+            for name, series in sorted(self._counters.items()):
+                full_name = METRIC_PREFIX + name
+                lines.append(f"# HELP {full_name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {full_name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full_name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Drops all recorded values."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+_metrics = MetricsRegistry()
+
+def get_metrics() -> MetricsRegistry:
+    """Returns the process-wide metrics registry."""
+    return _metrics
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Records the duration of one execution of a pipeline stage."""
+    if METRICS_ENABLED:
+        _metrics.observe("stage_duration_seconds", seconds, stage=stage)
+
+def count(name: str, amount: float = 1, **labels: Any) -> None:
+    """Adds to a counter (e.g. count("items_total", 12, kind="chunks_embedded"))."""
+    if METRICS_ENABLED:
+        _metrics.increment(name, amount, **labels)
+
+@contextmanager
+def stage_timer(stage: str) -> Iterator[None]:
+    """Times the enclosed block as one execution of a pipeline stage.
+
+    Exceptions are counted in stage_errors_total and re-raised; the duration
+    is recorded either way.
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+    start_time = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        _metrics.increment("stage_errors_total", stage=stage)
+        logger.debug(f"Stage '{stage}' raised; counted in stage_errors_total.")
+        raise
+    finally:
+        _metrics.observe("stage_duration_seconds", time.perf_counter() - start_time, stage=stage)
+
+def timed(stage: str):
+    """Decorator timing every call of a function (sync or async) as a pipeline stage."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with stage_timer(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
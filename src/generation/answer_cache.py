@@ -0,0 +1,180 @@
+# src/generation/answer_cache.py
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from src.config.metrics import count
+
+# Get logger instance using standard practice
+logger = logging.getLogger(__name__)
+
+DEFAULT_ANSWER_CACHE_THRESHOLD = 0.92
+DEFAULT_ANSWER_CACHE_TTL_SECONDS = 3600
+DEFAULT_ANSWER_CACHE_MAX_ENTRIES = 1000
+
+def document_set_fingerprint(content_hashes: Iterable[str], *settings: Any) -> str:
+    """Fingerprints a document set (by content) plus any settings that change answers.
+
+    Args:
+        content_hashes: Content hashes of the indexed files; order and file names do not matter.
+        *settings: Further values the answer depends on (embedding model, top_k, ...).
+
+    Returns:
+        A hex SHA-256 digest.
+    """
+    parts = sorted(content_hashes) + [repr(setting) for setting in settings]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+class SemanticAnswerCache:
+    """In-memory cache of generated answers, matched by query similarity.
+
+    Entries are grouped by document-set fingerprint. A query is a hit if the
+    cosine similarity between its embedding and a cached query's embedding
+    (for the same fingerprint) is at least the threshold, so paraphrases of a
+    question share one LLM round trip. Entries expire after ttl_seconds, and
+    the least recently used entries are evicted beyond max_entries.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_ANSWER_CACHE_THRESHOLD,
+        ttl_seconds: float = DEFAULT_ANSWER_CACHE_TTL_SECONDS,
+        max_entries: int = DEFAULT_ANSWER_CACHE_MAX_ENTRIES
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # (fingerprint, sequence number) -> entry, in least to most recently used order
+        self._entries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm > 0 else array
+
+    def _expire(self, now: float) -> None:
+        expired = [key for key, entry in self._entries.items() if now - entry["created_at"] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        self.expirations += len(expired)
+
+    def get(self, fingerprint: str, query_vector: List[float]) -> Optional[Dict[str, Any]]:
+        """Returns the cached entry closest to the query, if it is similar enough.
+
+        Args:
+            fingerprint: The document-set fingerprint.
+            query_vector: Embedding of the new query.
+
+        Returns:
+            A copy of the cached entry ('query', 'result', 'documents',
+            'similarity') or None on a miss.
+        """
+        query = self._normalize(query_vector)
+        with self._lock:
+            self._expire(time.time())
+            keys = [key for key in self._entries if key[0] == fingerprint]
+            if keys:
+                matrix = np.stack([self._entries[key]["vector"] for key in keys])
+                similarities = matrix @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._entries.move_to_end(keys[best])
+                    self.hits += 1
+                    count("answer_cache_lookups_total", result="hit")
+                    entry = self._entries[keys[best]]
+                    logger.info(f"Answer cache hit (similarity {similarities[best]:.3f}) for cached query '{entry['query'][:50]}...'")
+                    return {
+                        "query": entry["query"],
+                        "result": dict(entry["result"]),
+                        "documents": list(entry["documents"]),
+                        "similarity": float(similarities[best]),
+                    }
+            self.misses += 1
+            count("answer_cache_lookups_total", result="miss")
+            return None
+
+    def put(
+        self,
+        fingerprint: str,
+        query: str,
+        query_vector: List[float],
+        result: Dict[str, Any],
+        documents: Optional[List[Any]] = None
+    ) -> None:
+        """Caches an answer for a query against a document set.
+
+        Args:
+            fingerprint: The document-set fingerprint.
+            query: The query text (kept for logging and display).
+            query_vector: Embedding of the query.
+            result: The generate_answer result ('answer' and 'sources').
+            documents: The documents the answer was generated from.
+        """
+        with self._lock:
+            self._entries[(fingerprint, self._next_id)] = {
+                "query": query,
+                "vector": self._normalize(query_vector),
+                "result": dict(result),
+                "documents": list(documents or []),
+                "created_at": time.time(),
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drops all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters, hit rate and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "entries": len(self._entries),
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+            }
+
+_answer_cache: Optional[SemanticAnswerCache] = None
+_answer_cache_lock = threading.Lock()
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Returns the process-wide answer cache, or None if it is disabled.
+
+    Configured via ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL_SECONDS and
+    ANSWER_CACHE_MAX_ENTRIES; ANSWER_CACHE_MAX_ENTRIES=0 disables the cache.
+    """
+    global _answer_cache
+    with _answer_cache_lock:
+        if _answer_cache is None:
+            max_entries = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", str(DEFAULT_ANSWER_CACHE_MAX_ENTRIES)))
+            if max_entries <= 0:
+                return None
+            _answer_cache = SemanticAnswerCache(
+                threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", str(DEFAULT_ANSWER_CACHE_THRESHOLD))),
+                ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", str(DEFAULT_ANSWER_CACHE_TTL_SECONDS))),
+                max_entries=max_entries,
+            )
+        return _answer_cache
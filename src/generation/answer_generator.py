@@ -1,15 +1,28 @@
 # This module will contain the RAG chain logic.
 
+import asyncio
 import logging # Added import
 import os
-from typing import List, Dict, Union
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+from uuid import UUID
+
+import httpx
 
 from langchain_community.vectorstores import VectorStore # Keep specific type hint
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.documents import Document
 from langchain_core.language_models import BaseLanguageModel
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough, RunnableLambda, RunnableParallel
 from langchain_openai import ChatOpenAI
+
+from src.config.metrics import count, observe_stage, timed
+from src.generation.context_builder import build_context
+from src.retrieval.reranker import arerank_documents, rerank_fetch_k
+from src.retrieval.vector_store import SEARCH_MODE, asearch_index
 # from dotenv import load_dotenv # Removed dotenv import
 
 # load_dotenv() # Removed call - handled centrally
@@ -29,20 +42,117 @@ QUESTION:
 Answer the QUESTION based *only* on the provided CONTEXT. If the context doesn't contain the answer, state that you cannot answer based on the provided information.
 """
 
+# Answer returned when generation fails (callers must not cache it)
+GENERATION_ERROR_ANSWER = "An error occurred while generating the answer."
+
+# LLM client settings
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-3.5-turbo")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+# Size of the shared HTTP connection pool (kept alive between questions)
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+# Questions answered at the same time by agenerate_answers
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# Process-wide LLM clients and compiled answer chains, shared by all sessions
+_llm_registry: Dict[Tuple[str, Optional[str], str], BaseLanguageModel] = {}
+_answer_chain_registry: Dict[Tuple[str, Optional[str], str], Any] = {}
+_llm_registry_lock = threading.Lock()
+
+class LLMTimingHandler(BaseCallbackHandler):
+    """Records LLM call duration and time to first token in the stage metrics."""
+
+    run_inline = True # Cheap; no need to hop to an executor in async chains
+
+    def __init__(self):
+        self._runs: Dict[UUID, List[Any]] = {} # run_id -> [start time, first token seen]
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._runs[run_id] = [time.perf_counter(), False]
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._runs[run_id] = [time.perf_counter(), False]
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.get(run_id)
+        if run is not None and not run[1]:
+            run[1] = True
+            observe_stage("llm_first_token", time.perf_counter() - run[0])
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            observe_stage("llm", time.perf_counter() - run[0])
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            observe_stage("llm", time.perf_counter() - run[0])
+            count("stage_errors_total", stage="llm")
+
+_llm_timing_handler = LLMTimingHandler()
+
 def format_docs(docs):
     # Adding a simple log here, might be verbose if called often
     logger.debug(f"Formatting {len(docs)} documents for context.")
     return "\n\n".join(doc.page_content for doc in docs)
 
+def format_sources(docs: List[Document]) -> List[str]:
+    """Formats the unique, sorted source attributions ("Source: file, Page n") for documents."""
+    formatted_sources = set() # Use a set to store unique sources
+    for i, doc in enumerate(docs):
+        metadata = doc.metadata
+        source_path = metadata.get("source")
+        page = metadata.get("page")
+        logger.debug(f"Processing source doc {i+1}: Path='{source_path}', Page={page}")
+
+        if source_path:
+            source_name = os.path.basename(source_path)
+            if page is not None: # Check if page number exists
+                source_str = f"Source: {source_name}, Page {page}"
+            else:
+                source_str = f"Source: {source_name}" # Format without page if missing
+            formatted_sources.add(source_str)
+            logger.debug(f"Added source: {source_str}")
+        else:
+            logger.warning(f"Source document {i+1} missing 'source' metadata.")
+    return sorted(formatted_sources)
+
+def _packed_context(chain_input: Dict[str, Any]) -> str:
+    """Context text for the answer chain: the caller's build_context result if given, else built here."""
+    packed = chain_input.get("packed") or build_context(chain_input["documents"])
+    return packed["context"]
+
+def create_answer_chain(llm: BaseLanguageModel):
+    """Creates the chain that answers a question from already retrieved documents.
+
+    The documents are packed into the prompt by build_context (overlapping
+    chunks merged, CONTEXT_TOKEN_BUDGET enforced).
+
+    Returns a chain that expects {'documents': List[Document], 'question': str}
+    (plus optionally 'packed', a build_context result for those documents, so
+    the context is not built twice) and returns the answer string.
+    """
+    prompt = ChatPromptTemplate.from_template(RAG_PROMPT_TEMPLATE)
+    return (
+        {
+            "context": _packed_context,
+            "question": lambda x: x["question"],
+        }
+        | prompt
+        | llm
+        | StrOutputParser() # Ensure the answer is a string
+    )
+
 def create_rag_chain(retriever: VectorStore, llm: BaseLanguageModel):
     """Creates the RAG chain using LangChain Expression Language (LCEL).
 
     Returns a chain that expects a query string and returns a dictionary
-    containing 'context', 'question', and 'answer'.
+    containing 'documents', 'packed' (the build_context result), 'question'
+    and 'answer'.
     """
     logger.info("Creating RAG chain...")
-    # Use ChatPromptTemplate for chat models
-    prompt = ChatPromptTemplate.from_template(RAG_PROMPT_TEMPLATE)
 
     # Sub-chain to retrieve documents and format them
     # retriever argument here is the retriever interface (e.g., obtained via .as_retriever())
@@ -50,17 +160,7 @@ def create_rag_chain(retriever: VectorStore, llm: BaseLanguageModel):
     logger.debug("RAG chain: Defined document retrieval sub-chain.")
 
     # Chain to process the retrieved documents and generate the answer
-    rag_chain_from_docs = (
-        {
-            "context": lambda x: format_docs(x["documents"]),
-            "question": lambda x: x["question"],
-        }
-        | prompt
-        | llm
-        # No StrOutputParser here, as we want the AIMessage or dict from the LLM potentially
-        # But for now, assuming llm directly gives string or AIMessage convertible by StrOutputParser
-        | StrOutputParser() # Keep StrOutputParser for now to ensure answer is string
-    )
+    rag_chain_from_docs = create_answer_chain(llm)
     logger.debug("RAG chain: Defined core doc processing and LLM call sub-chain.")
 
     # Final chain using RunnableParallel and assign
@@ -72,24 +172,103 @@ def create_rag_chain(retriever: VectorStore, llm: BaseLanguageModel):
             "documents": retrieve_docs_chain,
             "question": RunnablePassthrough()
         }
+    ).assign(
+        packed=RunnableLambda(lambda x: build_context(x["documents"]))
     ).assign(answer=rag_chain_from_docs)
     logger.debug("RAG chain: Defined final parallel execution structure.")
 
-    # The final chain now returns {'documents': List[Document], 'question': str, 'answer': str}
+    # The final chain now returns {'documents': List[Document], 'packed': dict, 'question': str, 'answer': str}
     logger.info("RAG chain created successfully.")
     return final_chain
 
-def generate_answer(query: str, retriever: VectorStore) -> Dict[str, Union[str, List[str], None]]:
+def _llm_key(api_key: str) -> Tuple[str, Optional[str], str]:
+    # OPENAI_BASE_URL is read per call so a load test can point at a stand-in server
+    return (api_key, os.getenv("OPENAI_BASE_URL") or None, LLM_MODEL)
+
+def get_llm(api_key: str) -> BaseLanguageModel:
+    """Returns the shared ChatOpenAI client for an API key, creating it on first use.
+
+    The client is reused across questions and sessions. Its HTTP transports
+    (one for sync calls, one for ainvoke/astream) each keep a pool of up to
+    LLM_MAX_CONNECTIONS keep-alive connections, and requests
+    time out after LLM_TIMEOUT_SECONDS (LLM_CONNECT_TIMEOUT_SECONDS to connect).
+    Set OPENAI_BASE_URL to use an OpenAI-compatible server instead of the
+    OpenAI API.
+
+    Args:
+        api_key: The OpenAI API key.
+
+    Returns:
+        The LLM client.
+    """
+    key = _llm_key(api_key)
+    llm = _llm_registry.get(key)
+    if llm is not None:
+        return llm
+    with _llm_registry_lock:
+        llm = _llm_registry.get(key)
+        if llm is None:
+            base_url = key[1]
+            logger.info(f"Initializing ChatOpenAI LLM ({LLM_MODEL}) with pooled HTTP client (base_url={base_url or 'default'})...")
+            timeout = httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+            limits = httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+            http_client = httpx.Client(timeout=timeout, limits=limits)
+            # Async callers (agenerate_answer, batch QA, the API) go through this one
+            http_async_client = httpx.AsyncClient(timeout=timeout, limits=limits)
+            llm = ChatOpenAI(
+                model_name=LLM_MODEL,
+                temperature=0,
+                api_key=api_key,
+                base_url=base_url,
+                timeout=timeout,
+                max_retries=LLM_MAX_RETRIES,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                callbacks=[_llm_timing_handler], # Records LLM latency and time to first token
+            )
+            _llm_registry[key] = llm
+            logger.debug("LLM initialized.")
+    return llm
+
+def get_answer_chain(api_key: str):
+    """Returns the shared, compiled answer chain (see create_answer_chain) for an API key."""
+    key = _llm_key(api_key)
+    chain = _answer_chain_registry.get(key)
+    if chain is None:
+        llm = get_llm(api_key)
+        with _llm_registry_lock:
+            chain = _answer_chain_registry.setdefault(key, create_answer_chain(llm))
+    return chain
+
+def clear_llm_registry() -> None:
+    """Drops all shared LLM clients and chains (mainly for tests)."""
+    with _llm_registry_lock:
+        _llm_registry.clear()
+        _answer_chain_registry.clear()
+
+@timed("generate_answer")
+def generate_answer(
+    query: str,
+    retriever: Optional[VectorStore] = None,
+    documents: Optional[List[Document]] = None
+) -> Dict[str, Union[str, List[str], int, None]]:
     """Generates an answer using the RAG chain and includes source attribution.
 
+    Pass either a retriever (the chain retrieves for the query) or the
+    documents already retrieved for it, in which case no second retrieval is
+    done and the answer is based on exactly those documents.
+
     Args:
         query: The user's query string.
         retriever: The vector store retriever interface.
+        documents: Documents already retrieved for the query.
 
     Returns:
         A dictionary containing:
         - "answer" (str | None): The generated answer string, or None if an error occurred.
-        - "sources" (List[str]): A list of formatted source attribution strings.
+        - "sources" (List[str]): A list of formatted source attribution strings,
+          for the passages that made it into the LLM context.
+        - "tokens_saved" (int): Context tokens saved by merging and packing (see build_context).
     """
     logger.info(f"Generating answer for query: '{query[:100]}...'") # Use logger
     try:
@@ -101,56 +280,185 @@ def generate_answer(query: str, retriever: VectorStore) -> Dict[str, Union[str,
             # Optionally check for LANGCHAIN_API_KEY for LangSmith tracing here if needed
             raise ValueError("Missing OPENAI_API_KEY for LLM initialization.") # Corrected error message
 
-        logger.debug("Initializing ChatOpenAI LLM (gpt-3.5-turbo)...")
-        # Explicitly pass the OPENAI key 
-        llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0, api_key=api_key) 
-        logger.debug("LLM initialized.")
-
-        # Get the retriever interface from the vector store
-        # Note: The `create_rag_chain` function now expects the retriever interface directly
-        retriever_interface = retriever # Assuming the passed retriever IS the interface
-        logger.debug("Retriever interface confirmed.")
+        if documents is not None:
+            # Answer from the documents the caller already retrieved (and displayed)
+            logger.info(f"Invoking answer chain on {len(documents)} pre-retrieved documents...")
+            packed = build_context(documents)
+            answer_str = get_answer_chain(api_key).invoke({"documents": documents, "packed": packed, "question": query})
+            retrieved_docs = documents
+        else:
+            if retriever is None:
+                raise ValueError("generate_answer needs either a retriever or pre-retrieved documents.")
+            # The retrieval step is specific to this retriever; the LLM client is shared
+            rag_chain = create_rag_chain(retriever, get_llm(api_key))
 
-        # Create the RAG chain using the interface
-        rag_chain = create_rag_chain(retriever_interface, llm)
+            # Invoke the chain to get the result dictionary
+            logger.info(f"Invoking RAG chain...") # Use logger
+            result_dict = rag_chain.invoke(query)
+            logger.debug(f"RAG chain result keys: {result_dict.keys()}")
 
-        # Invoke the chain to get the result dictionary
-        logger.info(f"Invoking RAG chain...") # Use logger
-        result_dict = rag_chain.invoke(query)
+            answer_str = result_dict.get("answer")
+            retrieved_docs = result_dict.get("documents", [])
+            packed = result_dict.get("packed") or build_context(retrieved_docs)
         logger.info("RAG chain invocation successful.") # Use logger
-        logger.debug(f"RAG chain result keys: {result_dict.keys()}")
-
-        answer_str = result_dict.get("answer")
-        retrieved_docs = result_dict.get("documents", [])
         logger.debug(f"Answer generated (snippet): '{answer_str[:100]}...'")
         logger.debug(f"Retrieved {len(retrieved_docs)} documents for context.")
 
-        # Format sources
-        formatted_sources = set() # Use a set to store unique sources
-        for i, doc in enumerate(retrieved_docs):
-            metadata = doc.metadata
-            source_path = metadata.get("source")
-            page = metadata.get("page")
-            logger.debug(f"Processing source doc {i+1}: Path='{source_path}', Page={page}")
-
-            if source_path:
-                source_name = os.path.basename(source_path)
-                if page is not None: # Check if page number exists
-                    source_str = f"Source: {source_name}, Page {page}"
-                    formatted_sources.add(source_str)
-                    logger.debug(f"Added source: {source_str}")
-                else:
-                    source_str = f"Source: {source_name}"
-                    formatted_sources.add(source_str) # Format without page if missing
-                    logger.debug(f"Added source (no page): {source_str}")
-            else:
-                logger.warning(f"Source document {i+1} missing 'source' metadata.")
-            # Optionally handle cases where source_path is missing
-
-        final_sources = sorted(list(formatted_sources))
+        # Only passages the LLM actually saw are cited
+        final_sources = format_sources(packed["documents"])
         logger.info(f"Formatted {len(final_sources)} unique sources.")
-        return {"answer": answer_str, "sources": final_sources}
+        return {"answer": answer_str, "sources": final_sources, "tokens_saved": packed["tokens_saved"]}
 
     except Exception:
         logger.exception(f"Error generating answer for query: '{query[:100]}...'") # Use logger
-        return {"answer": "An error occurred while generating the answer.", "sources": []} # Provide error message in answer
\ No newline at end of file
+        return {"answer": GENERATION_ERROR_ANSWER, "sources": [], "tokens_saved": 0} # Provide error message in answer
+
+@timed("generate_answer")
+async def agenerate_answer(
+    query: str,
+    retriever: Optional[VectorStore] = None,
+    documents: Optional[List[Document]] = None
+) -> Dict[str, Union[str, List[str], int, None]]:
+    """Async variant of generate_answer, built on the chain's ainvoke.
+
+    The LLM call does not block the event loop; retrieval through a retriever
+    uses its async interface (which runs the search on a worker thread).
+
+    Args:
+        query: The user's query string.
+        retriever: The vector store retriever interface.
+        documents: Documents already retrieved for the query.
+
+    Returns:
+        A dictionary containing "answer", "sources" and "tokens_saved", as generate_answer.
+    """
+    logger.info(f"Generating answer (async) for query: '{query[:100]}...'")
+    try:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            logger.error("OPENAI_API_KEY not found in environment variables.")
+            raise ValueError("Missing OPENAI_API_KEY for LLM initialization.")
+
+        if documents is not None:
+            packed = build_context(documents)
+            answer_str = await get_answer_chain(api_key).ainvoke({"documents": documents, "packed": packed, "question": query})
+        else:
+            if retriever is None:
+                raise ValueError("agenerate_answer needs either a retriever or pre-retrieved documents.")
+            result_dict = await create_rag_chain(retriever, get_llm(api_key)).ainvoke(query)
+            answer_str = result_dict.get("answer")
+            packed = result_dict.get("packed") or build_context(result_dict.get("documents", []))
+        logger.info("Async RAG chain invocation successful.")
+        return {"answer": answer_str, "sources": format_sources(packed["documents"]), "tokens_saved": packed["tokens_saved"]}
+
+    except Exception:
+        logger.exception(f"Error generating answer (async) for query: '{query[:100]}...'")
+        return {"answer": GENERATION_ERROR_ANSWER, "sources": [], "tokens_saved": 0}
+
+async def agenerate_answers(
+    queries: Sequence[str],
+    index: VectorStore,
+    top_k: int = 3,
+    max_concurrency: Optional[int] = None
+) -> List[Dict[str, Union[str, List[str], int, None]]]:
+    """Answers many questions against an index concurrently.
+
+    Each question is retrieved (asearch_index, on the retrieval thread pool),
+    reranked if enabled (arerank_documents) and answered (agenerate_answer); at most max_concurrency questions are in
+    flight at once, so the LLM endpoint and the connection pool are not
+    flooded. A failing question yields GENERATION_ERROR_ANSWER and does not
+    affect the others.
+
+    Args:
+        queries: The questions.
+        index: The FAISS index to retrieve from.
+        top_k: Documents retrieved per question.
+        max_concurrency: Questions in flight at once; defaults to LLM_MAX_CONCURRENCY.
+
+    Returns:
+        One generate_answer-style result per question, in input order.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency or LLM_MAX_CONCURRENCY))
+
+    async def answer_one(query: str) -> Dict[str, Union[str, List[str], int, None]]:
+        async with semaphore:
+            documents = await asearch_index(query, index, top_k=rerank_fetch_k(top_k), mode=SEARCH_MODE)
+            documents = await arerank_documents(query, documents, top_k)
+            return await agenerate_answer(query, documents=documents)
+
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*(answer_one(query) for query in queries))
+    logger.info(f"Answered {len(results)} questions in {time.perf_counter() - start_time:.2f}s.")
+    return list(results)
+
+def _timed_token_stream(chain, chain_input: Dict[str, Any], query: str) -> Iterator[str]:
+    """Yields the chain's answer tokens, logging time to first token and total time."""
+    start_time = time.perf_counter()
+    first_token_seconds = None
+    token_count = 0
+    try:
+        for token in chain.stream(chain_input):
+            if not token:
+                continue
+            if first_token_seconds is None:
+                first_token_seconds = time.perf_counter() - start_time
+                logger.info(f"Time to first token: {first_token_seconds:.3f}s for query: '{query[:50]}...'")
+            token_count += 1
+            yield token
+    except Exception:
+        logger.exception(f"Error streaming answer for query: '{query[:100]}...'")
+        yield GENERATION_ERROR_ANSWER if token_count == 0 else f"\n\n{GENERATION_ERROR_ANSWER}"
+    finally:
+        observe_stage("answer_stream", time.perf_counter() - start_time)
+        logger.info(
+            f"Answer stream finished: {token_count} tokens in {time.perf_counter() - start_time:.2f}s "
+            f"(TTFT {first_token_seconds if first_token_seconds is not None else float('nan'):.3f}s)."
+        )
+
+def stream_answer(
+    query: str,
+    retriever: Optional[VectorStore] = None,
+    documents: Optional[List[Document]] = None
+) -> Dict[str, Any]:
+    """Streaming variant of generate_answer.
+
+    Retrieval (if needed) and source formatting happen before this returns, so
+    the sources can be shown before the first token; the answer itself is
+    produced lazily by the returned token iterator. Time to first token is
+    logged when the iterator is consumed.
+
+    Args:
+        query: The user's query string.
+        retriever: The vector store retriever interface.
+        documents: Documents already retrieved for the query.
+
+    Returns:
+        A dictionary containing:
+        - "sources" (List[str]): Formatted source attribution strings for the
+          passages that made it into the LLM context.
+        - "documents" (List[Document]): The retrieved documents.
+        - "tokens_saved" (int): Context tokens saved by merging and packing (see build_context).
+        - "tokens" (Iterator[str]): The answer, chunk by chunk. On error it yields
+          GENERATION_ERROR_ANSWER.
+    """
+    logger.info(f"Streaming answer for query: '{query[:100]}...'")
+    try:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            logger.error("OPENAI_API_KEY not found in environment variables.")
+            raise ValueError("Missing OPENAI_API_KEY for LLM initialization.")
+        if documents is None:
+            if retriever is None:
+                raise ValueError("stream_answer needs either a retriever or pre-retrieved documents.")
+            documents = retriever.invoke(query)
+        packed = build_context(documents)
+        chain_input = {"documents": documents, "packed": packed, "question": query}
+        return {
+            "sources": format_sources(packed["documents"]),
+            "documents": documents,
+            "tokens_saved": packed["tokens_saved"],
+            "tokens": _timed_token_stream(get_answer_chain(api_key), chain_input, query),
+        }
+    except Exception:
+        logger.exception(f"Error preparing answer stream for query: '{query[:100]}...'")
+        return {"sources": [], "documents": [], "tokens_saved": 0, "tokens": iter([GENERATION_ERROR_ANSWER])}
@@ -0,0 +1,174 @@
+# src/generation/batch_answers.py
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from src.config.metrics import count
+from src.generation.answer_generator import GENERATION_ERROR_ANSWER, LLM_MAX_CONCURRENCY, agenerate_answer
+from src.retrieval.reranker import rerank_documents, rerank_fetch_k
+from src.retrieval.vector_store import (
+    SEARCH_MODE, get_embedding_function, get_retrieval_executor, search_index_batch
+)
+
+# Get logger instance using standard practice
+logger = logging.getLogger(__name__)
+
+# Upper bound on LLM requests started per minute in a batch (0 = no limit)
+BATCH_REQUESTS_PER_MINUTE = float(os.getenv("BATCH_REQUESTS_PER_MINUTE", "0"))
+
+class RateLimiter:
+    """Spaces out request starts so at most requests_per_minute begin per minute."""
+
+    def __init__(self, requests_per_minute: Optional[float]):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute and requests_per_minute > 0 else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Waits until the next request may start."""
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+def load_questions(path: str) -> List[str]:
+    """Reads questions from a text file (one per line) or a JSONL file ('question' field).
+
+    Blank lines are skipped.
+    """
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            questions.append(json.loads(line)["question"] if path.endswith(".jsonl") else line)
+    return questions
+
+def retrieve_batch(questions: Sequence[str], index: FAISS, top_k: int = 3) -> Tuple[List[List[Document]], float]:
+    """Embeds all questions in one model call and searches them with one FAISS call.
+
+    With reranking on, rerank_fetch_k(top_k) chunks are retrieved per question
+    and reranked down to top_k.
+
+    Args:
+        questions: The questions.
+        index: The FAISS index to search.
+        top_k: Documents retrieved per question.
+
+    Returns:
+        The documents per question and the seconds spent embedding and searching.
+
+    Raises:
+        RuntimeError: If the embedding model cannot be loaded.
+    """
+    start_time = time.perf_counter()
+    embeddings = get_embedding_function()
+    if not embeddings:
+        raise RuntimeError("Failed to get embedding function.")
+    # One model call, outside embed_texts: questions stay out of the chunk embedding cache and stats
+    query_vectors = embeddings.embed_documents(list(questions))
+    count("items_total", len(questions), kind="queries_embedded")
+    documents = search_index_batch(
+        index, query_vectors, top_k=rerank_fetch_k(top_k), queries=list(questions), mode=SEARCH_MODE
+    )
+    documents = [rerank_documents(question, docs, top_k) for question, docs in zip(questions, documents)]
+    seconds = time.perf_counter() - start_time
+    logger.info(f"Retrieved context for {len(questions)} questions in {seconds:.2f}s.")
+    return documents, seconds
+
+async def arun_batch(
+    questions: Sequence[str],
+    index: FAISS,
+    top_k: int = 3,
+    max_concurrency: Optional[int] = None,
+    requests_per_minute: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """Answers a question set against one index.
+
+    Retrieval is done for all questions at once (see retrieve_batch); the LLM
+    calls are then dispatched concurrently, with at most max_concurrency in
+    flight and at most requests_per_minute started per minute.
+
+    Args:
+        questions: The questions.
+        index: The FAISS index to answer from.
+        top_k: Documents retrieved per question.
+        max_concurrency: LLM calls in flight at once; defaults to LLM_MAX_CONCURRENCY.
+        requests_per_minute: Rate limit for LLM calls; defaults to BATCH_REQUESTS_PER_MINUTE.
+
+    Returns:
+        One result per question, in input order:
+        - "question" (str), "answer" (str), "sources" (List[str])
+        - "latency_seconds" (float): Time spent generating the answer.
+        - "wait_seconds" (float): Time spent waiting for a concurrency slot or the rate limit.
+        - "error" (bool): Whether generation failed.
+    """
+    loop = asyncio.get_running_loop()
+    documents, retrieval_seconds = await loop.run_in_executor(
+        get_retrieval_executor(), retrieve_batch, list(questions), index, top_k
+    )
+    semaphore = asyncio.Semaphore(max(1, max_concurrency or LLM_MAX_CONCURRENCY))
+    limiter = RateLimiter(BATCH_REQUESTS_PER_MINUTE if requests_per_minute is None else requests_per_minute)
+
+    async def answer_one(question: str, question_documents: List[Document]) -> Dict[str, Any]:
+        queued_at = time.perf_counter()
+        async with semaphore:
+            await limiter.acquire()
+            started_at = time.perf_counter()
+            result = await agenerate_answer(question, documents=question_documents)
+        return {
+            "question": question,
+            "answer": result["answer"],
+            "sources": result["sources"],
+            "latency_seconds": round(time.perf_counter() - started_at, 3),
+            "wait_seconds": round(started_at - queued_at, 3),
+            "error": result["answer"] == GENERATION_ERROR_ANSWER,
+        }
+
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*(answer_one(q, docs) for q, docs in zip(questions, documents)))
+    failed = sum(result["error"] for result in results)
+    logger.info(
+        f"Batch of {len(results)} questions answered in {time.perf_counter() - start_time:.2f}s "
+        f"after {retrieval_seconds:.2f}s retrieval ({failed} failed)."
+    )
+    return list(results)
+
+def run_batch(
+    questions: Sequence[str],
+    index: FAISS,
+    top_k: int = 3,
+    max_concurrency: Optional[int] = None,
+    requests_per_minute: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """Synchronous wrapper around arun_batch (for scripts and the CLI)."""
+    return asyncio.run(arun_batch(questions, index, top_k, max_concurrency, requests_per_minute))
+
+def write_results_jsonl(results: List[Dict[str, Any]], path: str) -> bool:
+    """Writes batch results to a JSONL file, one result per line.
+
+    Returns:
+        True if the file was written, False otherwise.
+    """
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        logger.info(f"Wrote {len(results)} batch results to '{path}'.")
+        return True
+    except Exception:
+        logger.exception(f"Failed to write batch results to '{path}'.")
+        return False
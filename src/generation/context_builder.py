@@ -0,0 +1,177 @@
+# src/generation/context_builder.py
+
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from src.config.metrics import count, timed
+
+# Get logger instance using standard practice
+logger = logging.getLogger(__name__)
+
+# Maximum prompt tokens spent on retrieved context
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+# tiktoken encoding used to count tokens (cl100k_base matches gpt-3.5-turbo / gpt-4)
+CONTEXT_TOKEN_ENCODING = os.getenv("CONTEXT_TOKEN_ENCODING", "cl100k_base")
+# Chunks without a start_index are merged if one's tail repeats the other's head for at least this many characters
+MIN_OVERLAP_CHARS = 20
+# Budget remainders smaller than this are not worth a truncated chunk
+MIN_PARTIAL_TOKENS = 50
+CONTEXT_SEPARATOR = "\n\n"
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+def _get_encoding():
+    """Returns the tiktoken encoding, or None if it cannot be loaded (e.g. offline)."""
+    global _encoding, _encoding_loaded
+    with _encoding_lock:
+        if not _encoding_loaded:
+            _encoding_loaded = True
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(CONTEXT_TOKEN_ENCODING)
+            except Exception:
+                logger.exception(f"Could not load tiktoken encoding '{CONTEXT_TOKEN_ENCODING}'; estimating tokens from characters.")
+                _encoding = None
+        return _encoding
+
+def count_tokens(text: str) -> int:
+    """Counts tokens with the configured tokenizer (about 4 characters per token without one)."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    return encoding.decode(encoding.encode(text)[:max_tokens])
+
+def _suffix_prefix_overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is also a prefix of right."""
+    for length in range(min(len(left), len(right)), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:length]):
+            return length
+    return 0
+
+def _merge_pair(left: Document, right: Document) -> Optional[Document]:
+    """Merges right into left if they are adjacent or overlapping; None otherwise."""
+    left_start = left.metadata.get("start_index")
+    right_start = right.metadata.get("start_index")
+    if left_start is not None and right_start is not None:
+        left_end = left_start + len(left.page_content)
+        if right_start > left_end:
+            return None # Gap between the chunks
+        overlap = left_end - right_start
+        if overlap >= len(right.page_content):
+            text = left.page_content # Right is contained in left
+        else:
+            text = left.page_content + right.page_content[overlap:]
+    else:
+        overlap = _suffix_prefix_overlap(left.page_content, right.page_content)
+        if not overlap:
+            return None
+        text = left.page_content + right.page_content[overlap:]
+    metadata = dict(left.metadata)
+    metadata["merged_chunks"] = left.metadata.get("merged_chunks", 1) + right.metadata.get("merged_chunks", 1)
+    return Document(page_content=text, metadata=metadata)
+
+def merge_chunks(docs: List[Document]) -> List[Document]:
+    """Merges retrieved chunks that overlap or touch within the same source page.
+
+    Chunks are split with CHUNK_OVERLAP characters of overlap, so neighbouring
+    hits repeat text. Chunks carrying a 'start_index' are merged by offset;
+    otherwise a repeated suffix/prefix of at least MIN_OVERLAP_CHARS is used.
+    The merged passages keep the retrieval order of their best-ranked chunk.
+
+    Args:
+        docs: Retrieved chunks, most relevant first.
+
+    Returns:
+        The merged passages, most relevant first.
+    """
+    groups: Dict[Tuple[Any, Any], List[Tuple[int, Document]]] = {}
+    for rank, doc in enumerate(docs):
+        key = (doc.metadata.get("source"), doc.metadata.get("page"))
+        groups.setdefault(key, []).append((rank, doc))
+
+    merged: List[Tuple[int, Document]] = []
+    for members in groups.values():
+        # Page order where offsets are known, retrieval order otherwise
+        members.sort(key=lambda item: (item[1].metadata.get("start_index") is None, item[1].metadata.get("start_index") or 0, item[0]))
+        current_rank, current = members[0]
+        for rank, doc in members[1:]:
+            combined = _merge_pair(current, doc)
+            if combined is None and doc.metadata.get("start_index") is None:
+                combined = _merge_pair(doc, current) # Without offsets either chunk may come first
+            if combined is not None:
+                current, current_rank = combined, min(current_rank, rank)
+            else:
+                merged.append((current_rank, current))
+                current_rank, current = rank, doc
+        merged.append((current_rank, current))
+    return [doc for _, doc in sorted(merged, key=lambda item: item[0])]
+
+@timed("context_build")
+def build_context(docs: List[Document], token_budget: Optional[int] = None) -> Dict[str, Any]:
+    """Assembles the LLM context from retrieved chunks within a token budget.
+
+    Overlapping chunks are merged (see merge_chunks), then passages are packed
+    in relevance order until the budget is reached; a passage that does not fit
+    is truncated if enough budget remains, otherwise dropped.
+
+    Args:
+        docs: Retrieved chunks, most relevant first.
+        token_budget: Maximum context tokens; defaults to CONTEXT_TOKEN_BUDGET.
+
+    Returns:
+        A dictionary containing:
+        - "context" (str): The packed context text.
+        - "documents" (List[Document]): The passages included (possibly truncated).
+        - "tokens_used" (int): Tokens in the packed context.
+        - "tokens_naive" (int): Tokens the plain join of all chunks would have used.
+        - "tokens_saved" (int): tokens_naive - tokens_used.
+        - "dropped" (int): Passages left out for lack of budget.
+    """
+    budget = token_budget if token_budget is not None else CONTEXT_TOKEN_BUDGET
+    separator_tokens = count_tokens(CONTEXT_SEPARATOR)
+    tokens_naive = sum(count_tokens(doc.page_content) for doc in docs) + separator_tokens * max(len(docs) - 1, 0)
+
+    packed: List[Document] = []
+    tokens_used = 0
+    dropped = 0
+    for passage in merge_chunks(docs):
+        cost = count_tokens(passage.page_content) + (separator_tokens if packed else 0)
+        remaining = budget - tokens_used
+        if cost <= remaining:
+            packed.append(passage)
+            tokens_used += cost
+        elif remaining - separator_tokens >= MIN_PARTIAL_TOKENS:
+            text = _truncate_to_tokens(passage.page_content, remaining - separator_tokens)
+            packed.append(Document(page_content=text, metadata={**passage.metadata, "truncated": True}))
+            tokens_used += count_tokens(text) + (separator_tokens if len(packed) > 1 else 0)
+        else:
+            dropped += 1
+
+    context = CONTEXT_SEPARATOR.join(doc.page_content for doc in packed)
+    tokens_saved = max(tokens_naive - tokens_used, 0)
+    count("items_total", tokens_used, kind="context_tokens")
+    count("items_total", tokens_saved, kind="context_tokens_saved")
+    logger.info(
+        f"Built context from {len(docs)} chunks: {len(packed)} passages, {tokens_used} tokens "
+        f"({tokens_saved} saved vs. {tokens_naive}, {dropped} dropped, budget {budget})."
+    )
+    return {
+        "context": context,
+        "documents": packed,
+        "tokens_used": tokens_used,
+        "tokens_naive": tokens_naive,
+        "tokens_saved": tokens_saved,
+        "dropped": dropped,
+    }
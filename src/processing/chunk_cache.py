@@ -0,0 +1,211 @@
+# src/processing/chunk_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from src.processing.pdf_processor import CHUNK_OVERLAP, CHUNK_SIZE
+
+# Get logger instance using standard practice
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_CACHE_DIR = "./cache/chunks"
+DEFAULT_CHUNK_CACHE_MAX_MB = 512
+# Bump when the stored chunk format or extraction logic changes
+CHUNK_CACHE_VERSION = 2
+
+class ChunkCache:
+    """Persistent, content-addressed cache of extracted chunks and their embeddings.
+
+    Entries are keyed by the SHA-256 of the PDF bytes plus everything that affects
+    the output (chunking parameters, embedding model), so the same file uploaded
+    again, in any session, skips extraction, splitting and embedding. Each entry
+    is a single .npz file; the cache is capped in size and evicts the least
+    recently used entries (tracked via file modification time).
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CHUNK_CACHE_DIR, max_bytes: int = DEFAULT_CHUNK_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(file_hash: str, model_name: str) -> str:
+        """Builds the cache key for a file's content hash and the current settings."""
+        params = f"v{CHUNK_CACHE_VERSION}|{file_hash}|{CHUNK_SIZE}|{CHUNK_OVERLAP}|{model_name}"
+        return hashlib.sha256(params.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, key: str) -> Optional[Tuple[List[Document], np.ndarray]]:
+        """Returns the cached (chunks, vectors) for a key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                chunks = [
+                    Document(page_content=item["page_content"], metadata=item["metadata"])
+                    for item in json.loads(str(data["chunks"]))
+                ]
+                vectors = data["vectors"]
+            os.utime(path) # Mark as recently used
+            logger.info(f"Chunk cache hit for key {key[:12]}... ({len(chunks)} chunks).")
+            return chunks, vectors
+        except FileNotFoundError:
+            logger.debug(f"Chunk cache miss for key {key[:12]}...")
+            return None
+        except Exception:
+            logger.exception(f"Failed to read chunk cache entry '{path}'. Ignoring it.")
+            return None
+
+    def put(self, key: str, chunks: List[Document], vectors: List[List[float]]) -> None:
+        """Stores the chunks and vectors for a key, then enforces the size cap."""
+        writer = self.open_entry(key)
+        if writer is not None:
+            writer.append(chunks, vectors)
+            writer.commit()
+
+    def open_entry(self, key: str) -> Optional["ChunkCacheWriter"]:
+        """Starts an entry for a key that is written window by window, or None if it cannot be created."""
+        try:
+            return ChunkCacheWriter(self, key)
+        except OSError:
+            logger.exception(f"Failed to start chunk cache entry for key {key[:12]}...")
+            return None
+
+    def _evict(self) -> None:
+        """Deletes least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".npz"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    continue # Removed by another process
+                entries.append((stat.st_mtime, stat.st_size, name))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, name in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                    logger.info(f"Evicted chunk cache entry {name[:12]}... ({size} bytes).")
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+class ChunkCacheWriter:
+    """Writes one chunk cache entry incrementally.
+
+    Each appended window of chunks and vectors goes straight to temporary
+    files, so a large PDF does not have to be held in memory until it is
+    complete. commit() assembles the .npz entry from them; discard() drops
+    them. Write errors are logged and turn the writer into a no-op, the same
+    as a failed put().
+    """
+
+    def __init__(self, cache: ChunkCache, key: str):
+        self.cache = cache
+        self.key = key
+        self.rows = 0
+        self._dim: Optional[int] = None
+        base = f"{cache._path(key)}.{uuid.uuid4().hex}"
+        self._chunks_path = f"{base}.chunks.tmp"
+        self._vectors_path = f"{base}.vectors.tmp"
+        self._chunks_file = open(self._chunks_path, "w", encoding="utf-8")
+        try:
+            self._vectors_file = open(self._vectors_path, "wb")
+        except OSError:
+            self._chunks_file.close()
+            os.remove(self._chunks_path)
+            raise
+        self._closed = False
+
+    def append(self, chunks: List[Document], vectors: List[List[float]]) -> None:
+        """Appends chunks and their vectors (one per chunk, in order) to the entry."""
+        if self._closed or not chunks:
+            return
+        try:
+            array = np.asarray(vectors, dtype=np.float32)
+            for chunk in chunks:
+                self._chunks_file.write(json.dumps({"page_content": chunk.page_content, "metadata": chunk.metadata}))
+                self._chunks_file.write("\n")
+            self._vectors_file.write(array.tobytes())
+            self.rows += len(chunks)
+            self._dim = array.shape[1]
+        except Exception:
+            logger.exception(f"Failed to write chunk cache entry for key {self.key[:12]}...")
+            self.discard()
+
+    def commit(self) -> None:
+        """Assembles the appended windows into the cache entry, then enforces the size cap."""
+        if self._closed:
+            return
+        path = self.cache._path(self.key)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            self._chunks_file.close()
+            self._vectors_file.close()
+            with open(self._chunks_path, encoding="utf-8") as f:
+                payload = "[" + ",".join(line.rstrip("\n") for line in f) + "]"
+            if self.rows:
+                # Memory-mapped, so the vectors are copied into the archive without loading them whole
+                vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(self.rows, self._dim))
+            else:
+                vectors = np.zeros((0,), dtype=np.float32)
+            with open(temp_path, "wb") as f:
+                np.savez(f, chunks=np.array(payload), vectors=vectors)
+            del vectors
+            # Atomic rename so concurrent sessions never read a half-written entry
+            os.replace(temp_path, path)
+            logger.info(f"Stored {self.rows} chunks in chunk cache under key {self.key[:12]}...")
+        except Exception:
+            logger.exception(f"Failed to write chunk cache entry '{path}'.")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            self.discard()
+            return
+        self.discard()
+        self.cache._evict()
+
+    def discard(self) -> None:
+        """Closes and removes the temporary files; the entry is not stored. Safe to call twice."""
+        if self._closed:
+            return
+        self._closed = True
+        for f, temp_path in ((self._chunks_file, self._chunks_path), (self._vectors_file, self._vectors_path)):
+            f.close()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+_chunk_cache: Optional[ChunkCache] = None
+_chunk_cache_lock = threading.Lock()
+
+def get_chunk_cache() -> Optional[ChunkCache]:
+    """Returns the process-wide chunk cache, or None if it is disabled or unavailable.
+
+    Configured via CHUNK_CACHE_DIR and CHUNK_CACHE_MAX_MB; CHUNK_CACHE_MAX_MB=0 disables it.
+    """
+    global _chunk_cache
+    with _chunk_cache_lock:
+        if _chunk_cache is None:
+            max_mb = int(os.getenv("CHUNK_CACHE_MAX_MB", str(DEFAULT_CHUNK_CACHE_MAX_MB)))
+            if max_mb <= 0:
+                return None
+            try:
+                _chunk_cache = ChunkCache(os.getenv("CHUNK_CACHE_DIR", DEFAULT_CHUNK_CACHE_DIR), max_mb * 1024 * 1024)
+            except OSError:
+                logger.exception("Failed to initialize chunk cache; continuing without it.")
+                return None
+        return _chunk_cache
@@ -0,0 +1,273 @@
+# src/processing/ingest_jobs.py
+
+import io
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from langchain_community.vectorstores import FAISS
+
+from src.processing.ingest_pipeline import stream_ingest
+from src.processing.pdf_processor import UploadedFile
+from src.retrieval.vector_store import copy_index
+
+# Get logger instance using standard practice
+logger = logging.getLogger(__name__)
+
+# Ingest jobs running at the same time; further jobs wait in the queue
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+# Queued plus running jobs accepted before new submissions are refused
+INGEST_MAX_PENDING_JOBS = int(os.getenv("INGEST_MAX_PENDING_JOBS", "20"))
+# Finished jobs (and their indexes) are dropped after this many seconds
+INGEST_JOB_RETENTION_SECONDS = float(os.getenv("INGEST_JOB_RETENTION_SECONDS", "3600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+# Job fields returned by get(); the index and internals are not included
+_PUBLIC_FIELDS = (
+    "id", "status", "stage", "description", "files", "pages_total", "pages_extracted",
+    "chunks_indexed", "current_source", "error", "created_at", "started_at", "finished_at",
+)
+
+def _snapshot_upload(uploaded_file: UploadedFile) -> io.BytesIO:
+    """Copies an upload into memory, so the job does not depend on the (browser) session."""
+    upload = io.BytesIO(uploaded_file.getvalue())
+    upload.name = uploaded_file.name
+    return upload
+
+class IngestJobManager:
+    """Runs streaming ingests (see stream_ingest) as background jobs.
+
+    Jobs run on a bounded thread pool; when all workers are busy they wait in
+    a FIFO queue, and beyond max_pending queued or running jobs new
+    submissions are refused. Each job reports per-stage progress, can be
+    cancelled between page windows, and keeps its index until it is collected
+    with result() or expires.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = INGEST_JOB_WORKERS,
+        max_pending: int = INGEST_MAX_PENDING_JOBS,
+        retention_seconds: float = INGEST_JOB_RETENTION_SECONDS
+    ):
+        self.max_pending = max_pending
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ingest-job")
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in FINISHED_STATES and now - job["finished_at"] > self.retention_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def submit(
+        self,
+        uploaded_files: List[UploadedFile],
+        index: Optional[FAISS] = None,
+        description: Optional[str] = None
+    ) -> Optional[str]:
+        """Queues an ingest job.
+
+        Args:
+            uploaded_files: The PDFs to ingest (copied into memory).
+            index: An existing index to extend; a copy is extended, the original is untouched.
+            description: Optional label shown with the job.
+
+        Returns:
+            The job ID, or None if too many jobs are pending.
+        """
+        uploads = [_snapshot_upload(f) for f in uploaded_files]
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            pending = sum(job["status"] in (QUEUED, RUNNING) for job in self._jobs.values())
+            if pending >= self.max_pending:
+                logger.warning(f"Ingest queue full ({pending} jobs pending); refusing new job.")
+                return None
+            job_id = uuid.uuid4().hex
+            job = {
+                "id": job_id,
+                "status": QUEUED,
+                "stage": QUEUED,
+                "description": description,
+                "files": [upload.name for upload in uploads],
+                "pages_total": 0,
+                "pages_extracted": 0,
+                "chunks_indexed": 0,
+                "current_source": None,
+                "error": None,
+                "created_at": now,
+                "started_at": None,
+                "finished_at": None,
+                "index": None,
+                "index_version": 0, # Bumped each time a batch of chunks is committed to the index
+                "snapshot": None, # (version, copy) handed out by partial_index
+                "cancel_event": threading.Event(),
+                "index_lock": threading.Lock(), # Held only while vectors are added to the job's index
+            }
+            self._jobs[job_id] = job
+            job["future"] = self._executor.submit(self._run, job, uploads, index)
+        logger.info(f"Queued ingest job {job_id} for {len(uploads)} file(s) ({pending} ahead of it).")
+        return job_id
+
+    def _finish(self, job: Dict[str, Any], status: str, error: Optional[str] = None) -> None:
+        job["status"] = status
+        job["stage"] = status
+        job["error"] = error
+        job["finished_at"] = time.time()
+
+    def _run(self, job: Dict[str, Any], uploads: List[io.BytesIO], index: Optional[FAISS]) -> None:
+        if job["cancel_event"].is_set():
+            self._finish(job, CANCELLED)
+            return
+        job["status"] = RUNNING
+        job["stage"] = "extracting"
+        job["started_at"] = time.time()
+        start_time = time.perf_counter()
+        stream = None
+        try:
+            stream = stream_ingest(
+                uploads, index=copy_index(index) if index is not None else None, index_lock=job["index_lock"]
+            )
+            while True:
+                if job["cancel_event"].is_set():
+                    stream.close()
+                    job["index"] = job["snapshot"] = None
+                    self._finish(job, CANCELLED)
+                    logger.info(f"Ingest job {job['id']} cancelled after {job['pages_extracted']} pages.")
+                    return
+                if job["pages_total"] and job["pages_extracted"] >= job["pages_total"]:
+                    job["stage"] = "optimizing" # Only the final index rebuild is left
+                # Extraction and embedding run unlocked; stream_ingest holds the lock while it adds vectors
+                progress = next(stream, None)
+                if progress is None:
+                    break
+                with job["index_lock"]:
+                    job["index"] = progress["index"]
+                    job["index_version"] += 1
+                job["pages_total"] = progress["pages_total"]
+                job["pages_extracted"] = progress["pages_extracted"]
+                job["chunks_indexed"] = progress["chunks_indexed"]
+                job["current_source"] = progress["current_source"]
+                job["stage"] = "indexing"
+            job["snapshot"] = None # The final index is handed out as is
+            self._finish(job, COMPLETED)
+            logger.info(
+                f"Ingest job {job['id']} completed: {job['pages_extracted']} pages, "
+                f"{job['chunks_indexed']} chunks in {time.perf_counter() - start_time:.2f}s."
+            )
+        except Exception as e:
+            logger.exception(f"Ingest job {job['id']} failed.")
+            job["index"] = job["snapshot"] = None
+            self._finish(job, FAILED, str(e))
+            if stream is not None:
+                stream.close()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Returns a job's status and progress, or None if it is unknown.
+
+        The dictionary holds the fields in _PUBLIC_FIELDS plus 'queue_position'
+        (jobs ahead of a queued job, else None) and 'has_index'.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = {field: job[field] for field in _PUBLIC_FIELDS}
+            snapshot["has_index"] = job["index"] is not None
+            snapshot["queue_position"] = None
+            if job["status"] == QUEUED:
+                snapshot["queue_position"] = sum(
+                    other["status"] == QUEUED and other["created_at"] < job["created_at"]
+                    for other in self._jobs.values()
+                )
+            return snapshot
+
+    def result(self, job_id: str) -> Optional[FAISS]:
+        """Returns the index of a completed job (None if not completed or no text was found)."""
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] != COMPLETED:
+            return None
+        return job["index"]
+
+    def partial_index(self, job_id: str) -> Optional[FAISS]:
+        """Returns a copy of a running job's index so far, safe to search while the job continues.
+
+        The copy is made at most once per committed batch and shared by all
+        callers until the next batch, so frequent UI reruns do not copy the
+        whole index each time. Callers must not modify it.
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if job["status"] == COMPLETED:
+            return job["index"]
+        snapshot = job["snapshot"]
+        if snapshot is not None and snapshot[0] == job["index_version"]:
+            return snapshot[1]
+        with job["index_lock"]:
+            snapshot = job["snapshot"]
+            if snapshot is None or snapshot[0] != job["index_version"]: # Not already made by another caller
+                copy = copy_index(job["index"]) if job["index"] is not None else None
+                snapshot = job["snapshot"] = (job["index_version"], copy)
+            return snapshot[1]
+
+    def cancel(self, job_id: str) -> bool:
+        """Requests cancellation; a running job stops after its current page window.
+
+        Returns:
+            False if the job is unknown or already finished, True otherwise.
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] in FINISHED_STATES:
+            return False
+        job["cancel_event"].set()
+        if job["future"].cancel(): # Still queued: never starts
+            self._finish(job, CANCELLED)
+        logger.info(f"Cancellation requested for ingest job {job_id}.")
+        return True
+
+    def forget(self, job_id: str) -> None:
+        """Drops a job (cancelling it if still pending) and releases its index."""
+        self.cancel(job_id)
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """Returns the status of all known jobs, oldest first."""
+        with self._lock:
+            job_ids = sorted(self._jobs, key=lambda job_id: self._jobs[job_id]["created_at"])
+        return [snapshot for snapshot in (self.get(job_id) for job_id in job_ids) if snapshot is not None]
+
+    def shutdown(self) -> None:
+        """Cancels all pending jobs and stops the workers."""
+        with self._lock:
+            job_ids = list(self._jobs)
+        for job_id in job_ids:
+            self.cancel(job_id)
+        self._executor.shutdown(wait=True)
+
+_ingest_job_manager: Optional[IngestJobManager] = None
+_ingest_job_manager_lock = threading.Lock()
+
+def get_ingest_job_manager() -> IngestJobManager:
+    """Returns the process-wide ingest job manager, shared by all sessions."""
+    global _ingest_job_manager
+    with _ingest_job_manager_lock:
+        if _ingest_job_manager is None:
+            _ingest_job_manager = IngestJobManager()
+        return _ingest_job_manager
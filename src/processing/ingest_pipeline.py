@@ -0,0 +1,167 @@
+# src/processing/ingest_pipeline.py
+
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from src.config.metrics import count, observe_stage, stage_timer
+from src.processing.chunk_cache import ChunkCache, ChunkCacheWriter, get_chunk_cache
+from src.processing.pdf_processor import (
+    UploadedFile, count_pdf_pages, file_content_hash, iter_pdf_pages, split_documents
+)
+from src.retrieval.vector_store import (
+    add_embeddings_to_index, embed_documents, embedding_model_id, get_embedding_function, optimize_index
+)
+
+# Get logger instance using standard practice
+logger = logging.getLogger(__name__)
+
+# Number of pages extracted, split and embedded together. Bounds peak memory
+# to one window of page text and vectors instead of the whole corpus.
+PAGE_WINDOW = int(os.getenv("INGEST_PAGE_WINDOW", "8"))
+
+def stream_ingest(
+    uploaded_files: List[UploadedFile],
+    index: Optional[FAISS] = None,
+    page_window: int = PAGE_WINDOW,
+    index_lock: Optional[threading.Lock] = None
+) -> Iterator[Dict[str, Any]]:
+    """Streams uploaded PDFs through extract -> split -> embed -> index.
+
+    Pages are pulled from the PDFs lazily, split and embedded one window at a
+    time, and the vectors are inserted into the FAISS index incrementally. After
+    every window a progress dictionary is yielded; its 'index' can be queried
+    straight away while the remaining pages are still being ingested. Once all
+    files are in, a large index is rebuilt as HNSW or IVF-PQ (see
+    optimize_index) and yielded one final time.
+
+    Every chunk is tagged with its file's SHA-256 in metadata['content_hash'],
+    so a file's chunks can later be found and deleted (see source_document_ids).
+
+    Files already in the chunk cache (same bytes, chunking settings and model)
+    skip extraction and embedding and go straight to index assembly; freshly
+    processed files are written to the cache window by window and the entry is
+    committed once the file is complete, so only one window of chunks and
+    vectors is held in memory at a time.
+
+    Args:
+        uploaded_files: A list of Streamlit UploadedFile objects.
+        index: An existing index to extend, or None to start a new one.
+        page_window: Number of pages processed per step.
+        index_lock: Held only while vectors are being added to the index, so
+            another thread can copy the index safely while pages are being
+            extracted and embedded (see IngestJobManager.partial_index).
+
+    Yields:
+        A dictionary containing:
+        - "index" (FAISS | None): The index built so far (None until the first chunks arrive).
+        - "pages_total" (int): Pages across all files.
+        - "pages_extracted" (int): Pages processed (or served from cache) so far.
+        - "chunks_indexed" (int): Chunks embedded and inserted so far.
+        - "current_source" (str | None): File the last window came from.
+
+    Raises:
+        RuntimeError: If the embedding model cannot be loaded.
+    """
+    embeddings = get_embedding_function()
+    if not embeddings:
+        raise RuntimeError("Cannot ingest documents: Failed to get embedding function.")
+    chunk_cache = get_chunk_cache()
+    model_id = embedding_model_id(embeddings)
+
+    page_counts = [count_pdf_pages(f) for f in uploaded_files]
+    pages_total = sum(page_counts)
+    logger.info(f"Starting streaming ingest of {len(uploaded_files)} file(s), {pages_total} page(s), window={page_window}.")
+    progress: Dict[str, Any] = {
+        "index": index,
+        "pages_total": pages_total,
+        "pages_extracted": 0,
+        "chunks_indexed": 0,
+        "current_source": None,
+    }
+
+    for uploaded_file, page_count in zip(uploaded_files, page_counts):
+        content_hash = file_content_hash(uploaded_file)
+        cache_key = None
+        if chunk_cache is not None:
+            cache_key = ChunkCache.make_key(content_hash, model_id)
+            cached = chunk_cache.get(cache_key)
+            if cached is not None:
+                chunks, vectors = cached
+                source = os.path.basename(uploaded_file.name)
+                for chunk in chunks:
+                    chunk.metadata["source"] = source # Same bytes may arrive under another name
+                    chunk.metadata["content_hash"] = content_hash
+                if chunks:
+                    with index_lock or nullcontext():
+                        progress["index"] = add_embeddings_to_index(chunks, vectors.tolist(), embeddings, progress["index"])
+                progress["pages_extracted"] += page_count
+                progress["chunks_indexed"] += len(chunks)
+                progress["current_source"] = source
+                yield dict(progress)
+                continue
+
+        # Windows are written to the cache entry as they are indexed, then dropped
+        cache_writer = chunk_cache.open_entry(cache_key) if cache_key is not None else None
+        try:
+            pages_seen = 0
+            window: List[Document] = []
+            window_start = time.perf_counter()
+            for page in iter_pdf_pages([uploaded_file]):
+                page.metadata["content_hash"] = content_hash # Inherited by the page's chunks
+                window.append(page)
+                if len(window) >= max(1, page_window):
+                    observe_stage("extract_window", time.perf_counter() - window_start)
+                    pages_seen += len(window)
+                    _ingest_window(window, embeddings, progress, cache_writer, index_lock)
+                    window = []
+                    yield dict(progress)
+                    window_start = time.perf_counter()
+            if window:
+                observe_stage("extract_window", time.perf_counter() - window_start)
+                pages_seen += len(window)
+                _ingest_window(window, embeddings, progress, cache_writer, index_lock)
+                yield dict(progress)
+
+            # Only cache files that were extracted completely
+            if cache_writer is not None and page_count and pages_seen == page_count:
+                cache_writer.commit()
+        finally:
+            if cache_writer is not None:
+                cache_writer.discard() # No-op after commit; drops partial entries on failure or cancel
+
+    # Large corpora move from the incrementally grown flat index to HNSW / IVF-PQ
+    if progress["index"] is not None:
+        optimized = optimize_index(progress["index"])
+        if optimized is not progress["index"]:
+            progress["index"] = optimized
+            yield dict(progress)
+
+    logger.info(f"Streaming ingest finished: {progress['pages_extracted']} pages, {progress['chunks_indexed']} chunks indexed.")
+
+def _ingest_window(
+    pages: List[Document],
+    embeddings,
+    progress: Dict[str, Any],
+    cache_writer: Optional[ChunkCacheWriter],
+    index_lock: Optional[threading.Lock] = None
+) -> None:
+    with stage_timer("split"):
+        chunks = split_documents(pages)
+    count("items_total", len(pages), kind="pages_extracted")
+    if chunks:
+        vectors = embed_documents(chunks, embeddings)
+        with index_lock or nullcontext():
+            progress["index"] = add_embeddings_to_index(chunks, vectors, embeddings, progress["index"])
+        if cache_writer is not None:
+            cache_writer.append(chunks, vectors)
+    progress["pages_extracted"] += len(pages)
+    progress["chunks_indexed"] += len(chunks)
+    progress["current_source"] = pages[-1].metadata.get("source")
+    logger.debug(f"Ingested window of {len(pages)} pages ({len(chunks)} chunks).")
@@ -1,9 +1,15 @@
 # src/processing/pdf_processor.py
 
+import hashlib
+import io
 import logging
 import tempfile
 import os
-from typing import List
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, Optional, Tuple
 # Use try-except for Streamlit import for compatibility if run outside Streamlit context
 try:
     import streamlit as st
@@ -12,12 +18,14 @@ try:
 except ImportError:
     # Define a placeholder if Streamlit is not installed (e.g., for basic testing)
     # In a real scenario, this module is expected to run within a Streamlit app
-    UploadedFile = object # type: ignore 
+    UploadedFile = object # type: ignore
 
-from langchain_community.document_loaders import PyPDFLoader
+from pypdf import PdfReader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
+from src.config.metrics import timed
+
 # Initialize logger
 logger = logging.getLogger(__name__)
 
@@ -25,63 +33,287 @@ logger = logging.getLogger(__name__)
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 
-def process_pdfs_to_documents(uploaded_files: List[UploadedFile]) -> List[Document]:
+# Parallel ingestion settings. With a single worker everything runs in-process.
+DEFAULT_MAX_WORKERS = int(os.getenv("PDF_PROCESSING_WORKERS", "1"))
+# Files with more pages than this are split into page ranges of this size,
+# so one very large PDF can be spread across several workers.
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "25"))
+
+# Shared worker pool, created lazily on first parallel run
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_workers = 0
+_process_pool_lock = threading.Lock()
+
+def _get_text_splitter() -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        add_start_index=True # Character offset within the page, used to merge overlapping hits
+    )
+
+def _load_pages(
+    reader: PdfReader,
+    source: str,
+    start_page: int,
+    end_page: int,
+    page_labels: Optional[List[str]] = None
+) -> List[Document]:
+    """Extracts pages [start_page, end_page) of an open PDF as one Document per page.
+
+    page_labels holds the labels of those pages. reader.page_labels costs a
+    pass over the whole file, so callers reading a file in several steps
+    compute it once and pass each step its slice.
+    """
+    total_pages = len(reader.pages)
+    if page_labels is None:
+        page_labels = reader.page_labels[start_page:end_page]
+    pages = []
+    for page_number in range(start_page, end_page):
+        text = reader.pages[page_number].extract_text() or ""
+        pages.append(Document(
+            page_content=text.strip(),
+            metadata={
+                "source": source,
+                "page": page_number,
+                "page_label": page_labels[page_number - start_page],
+                "total_pages": total_pages,
+            }
+        ))
+    return pages
+
+def _open_pdf(uploaded_file: UploadedFile) -> PdfReader:
+    """Opens an uploaded PDF straight from its in-memory buffer, without a temp file.
+
+    Streamlit's UploadedFile is itself a BytesIO, so it is read in place; other
+    upload objects are wrapped in a BytesIO, which shares the bytes without copying.
+    """
+    if isinstance(uploaded_file, io.BufferedIOBase):
+        uploaded_file.seek(0)
+        return PdfReader(uploaded_file)
+    return PdfReader(io.BytesIO(uploaded_file.getvalue()))
+
+def _write_upload(uploaded_file: UploadedFile, target) -> None:
+    """Writes the upload's bytes to a file, via a zero-copy view when it is a BytesIO."""
+    if isinstance(uploaded_file, io.BytesIO):
+        with uploaded_file.getbuffer() as view:
+            target.write(view)
+    else:
+        target.write(uploaded_file.getvalue())
+
+def _source_name(uploaded_file: UploadedFile) -> str:
+    # The original file name is what generate_answer reports as the source
+    return os.path.basename(uploaded_file.name)
+
+def _process_page_range(file_path: str, source: str, start_page: int, page_labels: List[str]) -> List[Document]:
+    """Extracts and splits one page range of a PDF on disk.
+
+    Module-level so it can be pickled and executed inside a worker process.
+    The range starts at start_page and has one page per label in page_labels
+    (computed once per file by the parent).
+    """
+    reader = PdfReader(file_path)
+    pages = _load_pages(reader, source, start_page, start_page + len(page_labels), page_labels)
+    return _get_text_splitter().split_documents(pages)
+
+def _page_ranges(total_pages: int, pages_per_task: int) -> List[Tuple[int, int]]:
+    """Splits a page count into consecutive [start, end) ranges."""
+    step = max(1, pages_per_task)
+    return [(start, min(start + step, total_pages)) for start in range(0, total_pages, step)]
+
+def _get_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Returns the shared process pool, (re)creating it if the worker count changed."""
+    global _process_pool, _process_pool_workers
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool_workers != max_workers:
+            if _process_pool is not None:
+                _process_pool.shutdown(wait=False)
+            # 'spawn' avoids forking the (multi-threaded) Streamlit server process
+            _process_pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            _process_pool_workers = max_workers
+            logger.info(f"Started PDF processing pool with {max_workers} worker(s).")
+        return _process_pool
+
+def _reset_process_pool():
+    """Drops the shared pool so the next parallel run starts fresh workers."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False)
+        _process_pool = None
+
+def _process_files_in_memory(uploaded_files: List[UploadedFile]) -> List[List[Document]]:
+    results = []
+    text_splitter = _get_text_splitter()
+    for uploaded_file in uploaded_files:
+        try:
+            logger.info(f"Processing '{uploaded_file.name}' from memory...")
+            reader = _open_pdf(uploaded_file)
+            pages = _load_pages(reader, _source_name(uploaded_file), 0, len(reader.pages))
+            chunks = text_splitter.split_documents(pages)
+            logger.info(f"Successfully processed '{uploaded_file.name}', generated {len(chunks)} chunks.")
+            results.append(chunks)
+        except Exception as e:
+            logger.exception(f"Failed to process PDF file '{uploaded_file.name}'. Error: {e}")
+            # For now, just log and continue with other files
+            results.append([])
+    return results
+
+def _process_files_in_pool(uploaded_files: List[UploadedFile], max_workers: int) -> List[List[Document]]:
+    # Worker processes cannot share the upload buffers, so each file is handed over
+    # once through a temporary file instead of pickling its bytes into every task.
+    temp_file_paths: List[Optional[str]] = []
+    file_futures = []
+    try:
+        pool = _get_process_pool(max_workers)
+        for uploaded_file in uploaded_files:
+            temp_file_path = None
+            try:
+                # Labels for the whole file are computed once here; each task gets its slice
+                page_labels = _open_pdf(uploaded_file).page_labels
+                with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
+                    _write_upload(uploaded_file, temp_file)
+                    temp_file_path = temp_file.name
+                temp_file_paths.append(temp_file_path)
+                logger.info(f"Processing '{uploaded_file.name}' in worker pool (Temp path: {temp_file_path})...")
+
+                # Submit every page range up front; results are collected in submission order
+                futures = [
+                    pool.submit(
+                        _process_page_range, temp_file_path, _source_name(uploaded_file), start, page_labels[start:end]
+                    )
+                    for start, end in _page_ranges(len(page_labels), PAGES_PER_TASK)
+                ]
+                logger.debug(f"Submitted {len(futures)} page range task(s) for '{uploaded_file.name}'.")
+                file_futures.append((uploaded_file.name, futures))
+            except Exception as e:
+                logger.exception(f"Failed to process PDF file '{uploaded_file.name}'. Error: {e}")
+                file_futures.append((uploaded_file.name, None))
+
+        results = []
+        for file_name, futures in file_futures:
+            if futures is None:
+                results.append([])
+                continue
+            chunks: List[Document] = []
+            try:
+                for future in futures:
+                    chunks.extend(future.result())
+                logger.info(f"Successfully processed '{file_name}', generated {len(chunks)} chunks.")
+                results.append(chunks)
+            except BrokenProcessPool:
+                logger.exception(f"PDF processing pool crashed while processing '{file_name}'.")
+                _reset_process_pool()
+                results.append([])
+            except Exception as e:
+                # A failed page range invalidates the whole file, mirroring the in-memory path
+                logger.exception(f"Failed to process PDF file '{file_name}'. Error: {e}")
+                results.append([])
+        return results
+    finally:
+        # Ensure temporary files are deleted even if an error occurs
+        for temp_file_path in temp_file_paths:
+            _remove_temp_file(temp_file_path)
+
+@timed("extract")
+def process_pdfs_to_documents(uploaded_files: List[UploadedFile], max_workers: Optional[int] = None) -> List[Document]:
     """
     Processes uploaded PDF files into LangChain Document objects suitable for RAG.
 
-    Uses PyPDFLoader to load documents and RecursiveCharacterTextSplitter to chunk them.
-    Handles temporary file creation for PyPDFLoader and ensures cleanup.
+    Extracts page text with pypdf directly from the upload buffers and uses
+    RecursiveCharacterTextSplitter to chunk it. With more than one worker and
+    more than one page range in total, files (and page ranges of large files)
+    are extracted and split in parallel in a process pool; the output order is
+    the same either way.
 
     Args:
         uploaded_files: A list of Streamlit UploadedFile objects.
+        max_workers: Number of worker processes. Defaults to DEFAULT_MAX_WORKERS
+            (env PDF_PROCESSING_WORKERS); 1 processes the files in-process.
 
     Returns:
         A list of LangChain Document objects (chunks), or an empty list if processing fails.
+        Each chunk carries 'source' (the uploaded file name), 'page' (0-based)
+        and 'content_hash' (see file_content_hash) metadata.
     """
     all_split_docs: List[Document] = []
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE, 
-        chunk_overlap=CHUNK_OVERLAP
-    )
-    
+
     if not uploaded_files:
         logger.warning("No uploaded files provided to process_pdfs_to_documents.")
         return []
 
-    logger.info(f"Starting processing for {len(uploaded_files)} PDF file(s).")
+    workers = max_workers if max_workers is not None else DEFAULT_MAX_WORKERS
+    logger.info(f"Starting processing for {len(uploaded_files)} PDF file(s) with {workers} worker(s).")
 
-    for uploaded_file in uploaded_files:
-        temp_file_path = None # Initialize path
+    # A pool (spawned workers, temp files) only pays off with more than one page range to spread
+    total_tasks = sum(len(_page_ranges(count_pdf_pages(f), PAGES_PER_TASK)) for f in uploaded_files) if workers > 1 else 0
+    if workers > 1 and total_tasks > 1:
+        per_file_chunks = _process_files_in_pool(uploaded_files, workers)
+    else:
+        per_file_chunks = _process_files_in_memory(uploaded_files)
+
+    for uploaded_file, chunks in zip(uploaded_files, per_file_chunks):
+        content_hash = file_content_hash(uploaded_file)
+        for chunk in chunks:
+            chunk.metadata["content_hash"] = content_hash
+        all_split_docs.extend(chunks)
+
+    logger.info(f"Finished processing. Total chunks generated: {len(all_split_docs)}.")
+    return all_split_docs
+
+def file_content_hash(uploaded_file: UploadedFile) -> str:
+    """Returns the SHA-256 hex digest of an uploaded file's bytes."""
+    if isinstance(uploaded_file, io.BytesIO):
+        with uploaded_file.getbuffer() as view:
+            return hashlib.sha256(view).hexdigest()
+    return hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+
+def count_pdf_pages(uploaded_file: UploadedFile) -> int:
+    """Returns the page count of an uploaded PDF, or 0 if it cannot be opened.
+
+    Reads the page tree's /Count entry rather than len(reader.pages), which
+    loads every page object; falls back to the latter if the entry is unusable.
+    """
+    try:
+        reader = _open_pdf(uploaded_file)
         try:
-            # Create a temporary file to store the uploaded PDF content
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                temp_file.write(uploaded_file.getvalue())
-                temp_file_path = temp_file.name # Get the path
-            
-            logger.info(f"Processing '{uploaded_file.name}' (Temp path: {temp_file_path})...")
-
-            # Use PyPDFLoader with the temporary file path
-            loader = PyPDFLoader(temp_file_path)
-            # Load and split the document into pages/chunks
-            # load_and_split is efficient as it processes pages iteratively
-            pages = loader.load_and_split(text_splitter=text_splitter) 
-            
-            logger.info(f"Successfully processed '{uploaded_file.name}', generated {len(pages)} chunks.")
-            all_split_docs.extend(pages)
+            page_count = reader.root_object["/Pages"]["/Count"]
+            if isinstance(page_count, int) and page_count >= 0:
+                return int(page_count)
+        except Exception:
+            logger.debug(f"No usable page count in '{uploaded_file.name}'; counting pages.")
+        return len(reader.pages)
+    except Exception:
+        logger.exception(f"Failed to open PDF file '{uploaded_file.name}'.")
+        return 0
+
+def iter_pdf_pages(uploaded_files: List[UploadedFile]) -> Iterator[Document]:
+    """Lazily yields one Document per PDF page, in file and page order.
 
+    Pages are extracted from the upload buffers one at a time, so callers can
+    process them as they arrive. A file that fails is logged and skipped.
+    """
+    for uploaded_file in uploaded_files:
+        try:
+            reader = _open_pdf(uploaded_file)
+            source = _source_name(uploaded_file)
+            page_labels = reader.page_labels # Once per file, not once per page
+            for page_number in range(len(reader.pages)):
+                yield from _load_pages(reader, source, page_number, page_number + 1, page_labels[page_number:page_number + 1])
         except Exception as e:
             logger.exception(f"Failed to process PDF file '{uploaded_file.name}'. Error: {e}")
-            # Optionally, you could surface this error to the Streamlit UI
-            # For now, just log and continue with other files
-            continue 
-        finally:
-            # Ensure temporary file is deleted even if an error occurs
-            if temp_file_path and os.path.exists(temp_file_path):
-                try:
-                    os.remove(temp_file_path)
-                    logger.debug(f"Successfully removed temporary file: {temp_file_path}")
-                except Exception as e:
-                    logger.error(f"Error removing temporary file '{temp_file_path}': {e}")
+            continue
 
-    logger.info(f"Finished processing. Total chunks generated: {len(all_split_docs)}.")
-    return all_split_docs 
\ No newline at end of file
+def split_documents(pages: List[Document]) -> List[Document]:
+    """Splits page Documents into chunks using the standard chunking settings."""
+    return _get_text_splitter().split_documents(pages)
+
+def _remove_temp_file(temp_file_path: Optional[str]):
+    if temp_file_path and os.path.exists(temp_file_path):
+        try:
+            os.remove(temp_file_path)
+            logger.debug(f"Successfully removed temporary file: {temp_file_path}")
+        except Exception as e:
+            logger.error(f"Error removing temporary file '{temp_file_path}': {e}")
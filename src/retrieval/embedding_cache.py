@@ -0,0 +1,201 @@
+# src/retrieval/embedding_cache.py
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Get logger instance using standard practice
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_CACHE_DIR = "./cache/embeddings"
+DEFAULT_EMBEDDING_CACHE_MAX_ENTRIES = 200_000
+# Rows the vector file grows by when it runs out of space
+_GROWTH_ROWS = 4096
+
+def normalize_text(text: str) -> str:
+    """Collapses whitespace so trivially different copies of a chunk share one entry."""
+    return " ".join(text.split())
+
+def text_key(text: str) -> str:
+    """Returns the cache key (SHA-256 of the normalized text) for a chunk."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """Persistent embedding cache for one model.
+
+    Vectors live in a memory-mapped float32 matrix (vectors.f32); an SQLite
+    database maps each normalized chunk hash to its row and last-use time.
+    Only cache misses need to be sent to the model. When the cache holds more
+    than max_entries vectors, the least recently used ones are evicted and
+    their rows are reused.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str, max_entries: int = DEFAULT_EMBEDDING_CACHE_MAX_ENTRIES):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.directory = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+        os.makedirs(self.directory, exist_ok=True)
+        self._vectors_path = os.path.join(self.directory, "vectors.f32")
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.memmap] = None
+        self._dim: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._db = sqlite3.connect(os.path.join(self.directory, "index.sqlite"), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, row INTEGER NOT NULL, last_used REAL NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS free_rows (row INTEGER PRIMARY KEY)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._db.commit()
+        row = self._db.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+        if row:
+            self._dim = row[0]
+
+    def _map(self, min_rows: int) -> np.memmap:
+        """Returns a memory map of the vector file holding at least min_rows rows."""
+        if self._dim is None: # Written by another process since we opened the cache
+            self._dim = self._db.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()[0]
+        row_bytes = self._dim * 4
+        current_rows = os.path.getsize(self._vectors_path) // row_bytes if os.path.exists(self._vectors_path) else 0
+        if current_rows < min_rows:
+            new_rows = max(min_rows, current_rows + _GROWTH_ROWS)
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(new_rows * row_bytes) # Sparse extension, no data written
+            current_rows = new_rows
+        if self._matrix is None or self._matrix.shape[0] < current_rows:
+            self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(current_rows, self._dim))
+        return self._matrix
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Looks up vectors for texts; None marks a miss."""
+        keys = [text_key(text) for text in texts]
+        with self._lock:
+            rows: Dict[str, int] = {}
+            unique_keys = list(set(keys))
+            for start in range(0, len(unique_keys), 500): # Stay under SQLite's variable limit
+                batch = unique_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows.update(self._db.execute(f"SELECT key, row FROM entries WHERE key IN ({placeholders})", batch).fetchall())
+
+            results: List[Optional[np.ndarray]] = [None] * len(texts)
+            if rows:
+                matrix = self._map(max(rows.values()) + 1)
+                for i, key in enumerate(keys):
+                    if key in rows:
+                        results[i] = np.array(matrix[rows[key]])
+                now = time.time()
+                self._db.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key in rows])
+                self._db.commit()
+
+            hits = sum(1 for result in results if result is not None)
+            self.hits += hits
+            self.misses += len(texts) - hits
+        return results
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]) -> None:
+        """Stores vectors for texts, then evicts least recently used entries over the limit."""
+        if not texts:
+            return
+        array = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            # Take the write lock up front so row allocation is safe across processes
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._insert(texts, array)
+                self._evict()
+                self._db.commit()
+            except Exception:
+                self._db.rollback()
+                raise
+
+    def _insert(self, texts: List[str], array: np.ndarray) -> None:
+        if self._dim is None:
+            self._dim = array.shape[1]
+            self._db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (self._dim,))
+        elif array.shape[1] != self._dim:
+            raise ValueError(f"Embedding cache for '{self.model_name}' expects dim {self._dim}, got {array.shape[1]}.")
+
+        now = time.time()
+        # New rows start above every used or freed row
+        next_row = self._db.execute(
+            "SELECT COALESCE(MAX(row), -1) + 1 FROM (SELECT row FROM entries UNION ALL SELECT row FROM free_rows)"
+        ).fetchone()[0]
+        new_entries = []
+        for text, vector in zip(texts, array):
+            key = text_key(text)
+            if self._db.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone():
+                continue
+            free = self._db.execute("SELECT row FROM free_rows LIMIT 1").fetchone()
+            if free:
+                row = free[0]
+                self._db.execute("DELETE FROM free_rows WHERE row = ?", (row,))
+            else:
+                row = next_row
+                next_row += 1
+            self._db.execute("INSERT INTO entries (key, row, last_used) VALUES (?, ?, ?)", (key, row, now))
+            new_entries.append((row, vector))
+
+        if new_entries:
+            matrix = self._map(max(row for row, _ in new_entries) + 1)
+            for row, vector in new_entries:
+                matrix[row] = vector
+            matrix.flush()
+
+    def _evict(self) -> None:
+        count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        victims = self._db.execute("SELECT key, row FROM entries ORDER BY last_used LIMIT ?", (excess,)).fetchall()
+        self._db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in victims])
+        self._db.executemany("INSERT OR IGNORE INTO free_rows (row) VALUES (?)", [(row,) for _, row in victims])
+        self.evictions += len(victims)
+        logger.info(f"Evicted {len(victims)} entries from embedding cache for '{self.model_name}'.")
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters, hit rate and current size."""
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "model_name": self.model_name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "entries": entries,
+                "max_entries": self.max_entries,
+            }
+
+_embedding_caches: Dict[str, EmbeddingCache] = {}
+_embedding_caches_lock = threading.Lock()
+
+def get_embedding_cache(model_name: str) -> Optional[EmbeddingCache]:
+    """Returns the process-wide embedding cache for a model, or None if disabled.
+
+    Configured via EMBEDDING_CACHE_DIR and EMBEDDING_CACHE_MAX_ENTRIES;
+    EMBEDDING_CACHE_MAX_ENTRIES=0 disables the cache.
+    """
+    max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", str(DEFAULT_EMBEDDING_CACHE_MAX_ENTRIES)))
+    if max_entries <= 0:
+        return None
+    with _embedding_caches_lock:
+        cache = _embedding_caches.get(model_name)
+        if cache is None:
+            try:
+                cache = EmbeddingCache(os.getenv("EMBEDDING_CACHE_DIR", DEFAULT_EMBEDDING_CACHE_DIR), model_name, max_entries)
+            except (OSError, sqlite3.Error):
+                logger.exception(f"Failed to open embedding cache for '{model_name}'; continuing without it.")
+                return None
+            _embedding_caches[model_name] = cache
+        return cache
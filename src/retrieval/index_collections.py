@@ -0,0 +1,203 @@
+# src/retrieval/index_collections.py
+
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from src.processing.chunk_cache import CHUNK_CACHE_VERSION
+from src.processing.pdf_processor import CHUNK_OVERLAP, CHUNK_SIZE
+from src.retrieval.vector_store import (
+    embedding_model_id, get_embedding_function, index_type_of, load_faiss_index, save_faiss_index
+)
+
+# Get logger instance using standard practice
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLLECTIONS_DIR = "./indexes"
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+_COLLECTION_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+def _collections_dir() -> str:
+    return os.getenv("INDEX_COLLECTIONS_DIR", DEFAULT_COLLECTIONS_DIR)
+
+def collection_path(name: str) -> str:
+    """Returns the directory of a named collection.
+
+    Raises:
+        ValueError: If the name is empty or contains unsupported characters.
+    """
+    if not _COLLECTION_NAME_PATTERN.match(name or ""):
+        raise ValueError(f"Invalid collection name '{name}'. Use letters, digits, '_', '-' and '.'.")
+    return os.path.join(_collections_dir(), name)
+
+def index_settings(embeddings: Embeddings) -> Dict[str, Any]:
+    """Settings that determine the vectors of an index; a mismatch requires a rebuild."""
+    return {
+        "model_name": embedding_model_id(embeddings),
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "extraction_version": CHUNK_CACHE_VERSION,
+    }
+
+def build_manifest(index: FAISS, embeddings: Embeddings, content_hashes: Dict[str, str]) -> Dict[str, Any]:
+    """Builds the manifest stored next to a saved collection.
+
+    Args:
+        index: The index being saved.
+        embeddings: The embedding function the index was built with.
+        content_hashes: SHA-256 of each source file's bytes, keyed by file name.
+
+    Returns:
+        The manifest dictionary.
+    """
+    return {
+        "manifest_version": MANIFEST_VERSION,
+        **index_settings(embeddings),
+        "content_hashes": dict(sorted(content_hashes.items())),
+        "vector_count": index.index.ntotal,
+        "dimension": index.index.d,
+        "index_type": index_type_of(index.index),
+        "created_at": time.time(),
+    }
+
+def manifest_mismatches(
+    manifest: Dict[str, Any],
+    embeddings: Embeddings,
+    content_hashes: Optional[Dict[str, str]] = None
+) -> List[str]:
+    """Lists why a saved collection cannot be reused with the current settings.
+
+    Args:
+        manifest: The collection's manifest.
+        embeddings: The current embedding function.
+        content_hashes: If given, the file contents the collection must contain
+            (file names are ignored, only content counts).
+
+    Returns:
+        Human-readable reasons; empty if the collection is up to date.
+    """
+    reasons = []
+    if manifest.get("manifest_version") != MANIFEST_VERSION:
+        reasons.append(f"manifest version {manifest.get('manifest_version')} != {MANIFEST_VERSION}")
+    for key, expected in index_settings(embeddings).items():
+        if manifest.get(key) != expected:
+            reasons.append(f"{key} {manifest.get(key)!r} != {expected!r}")
+    if content_hashes is not None and set(manifest.get("content_hashes", {}).values()) != set(content_hashes.values()):
+        reasons.append("source documents differ")
+    return reasons
+
+def read_manifest(name: str) -> Optional[Dict[str, Any]]:
+    """Returns a collection's manifest, or None if it does not exist or is unreadable."""
+    path = os.path.join(collection_path(name), MANIFEST_FILE)
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.exception(f"Failed to read manifest '{path}'.")
+        return None
+
+def list_collections() -> List[str]:
+    """Returns the names of all saved collections."""
+    root = _collections_dir()
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root)
+        if _COLLECTION_NAME_PATTERN.match(name) and os.path.exists(os.path.join(root, name, MANIFEST_FILE))
+    )
+
+def save_collection(name: str, index: FAISS, content_hashes: Dict[str, str]) -> bool:
+    """Saves an index as a named collection (index.faiss + index.pkl + lexical.npz + manifest.json).
+
+    The collection is written to a temporary directory and swapped into place,
+    so readers never see a partially written collection.
+
+    Args:
+        name: The collection name.
+        index: The index to save.
+        content_hashes: SHA-256 of each source file's bytes, keyed by file name.
+
+    Returns:
+        True if the collection was saved, False otherwise.
+    """
+    try:
+        path = collection_path(name)
+    except ValueError:
+        logger.exception("Cannot save collection.")
+        return False
+    embeddings = get_embedding_function()
+    if not embeddings:
+        logger.error("Cannot save collection: Failed to get embedding function.")
+        return False
+
+    temp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+    old_path = f"{path}.old-{uuid.uuid4().hex}"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if not save_faiss_index(index, temp_path):
+            raise RuntimeError("Saving the FAISS index failed.")
+        with open(os.path.join(temp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(build_manifest(index, embeddings, content_hashes), f, indent=2)
+        if os.path.exists(path):
+            os.rename(path, old_path)
+        os.rename(temp_path, path)
+        logger.info(f"Saved collection '{name}' ({index.index.ntotal} vectors) to '{path}'.")
+        return True
+    except Exception:
+        logger.exception(f"Failed to save collection '{name}'.")
+        if os.path.exists(old_path) and not os.path.exists(path):
+            os.rename(old_path, path) # Restore the previous version
+        return False
+    finally:
+        shutil.rmtree(temp_path, ignore_errors=True)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+def load_collection(
+    name: str,
+    content_hashes: Optional[Dict[str, str]] = None,
+    mmap: bool = True
+) -> Optional[FAISS]:
+    """Loads a named collection if its manifest matches the current settings.
+
+    A collection built with another embedding model, backend, token limit or
+    chunking configuration (or, if content_hashes is given, from other documents) is not
+    loaded; the caller is expected to rebuild it.
+
+    Args:
+        name: The collection name.
+        content_hashes: Optional file contents the collection must contain.
+        mmap: Whether to memory-map the vectors instead of reading them into memory.
+
+    Returns:
+        The loaded FAISS index, or None if it is missing, stale or cannot be loaded.
+    """
+    try:
+        path = collection_path(name)
+    except ValueError:
+        logger.exception("Cannot load collection.")
+        return None
+    manifest = read_manifest(name)
+    if manifest is None:
+        logger.warning(f"Collection '{name}' not found in '{_collections_dir()}'.")
+        return None
+    embeddings = get_embedding_function()
+    if not embeddings:
+        logger.error("Cannot load collection: Failed to get embedding function.")
+        return None
+
+    reasons = manifest_mismatches(manifest, embeddings, content_hashes)
+    if reasons:
+        logger.warning(f"Collection '{name}' is stale and needs a rebuild: {'; '.join(reasons)}.")
+        return None
+    return load_faiss_index(path, mmap=mmap)
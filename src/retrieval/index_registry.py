@@ -0,0 +1,113 @@
+# src/retrieval/index_registry.py
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_community.vectorstores import FAISS
+
+from src.retrieval.index_collections import list_collections, load_collection, read_manifest
+from src.retrieval.vector_store import index_type_of
+
+# Get logger instance using standard practice
+logger = logging.getLogger(__name__)
+
+class IndexRegistry:
+    """Process-wide registry of named, in-memory FAISS indexes.
+
+    Indexes are shared by all request threads. Searches use whatever index is
+    registered at the time; writers build a new version (see copy_index) and
+    swap it in with put(), so readers never see a half-updated index. Writers
+    to the same name are serialized with writer_lock(). Names that are not in
+    memory are loaded from saved index collections on first use.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._writer_locks: Dict[str, threading.RLock] = {}
+        self._lock = threading.Lock()
+
+    def writer_lock(self, name: str) -> threading.RLock:
+        """Returns the (reentrant) lock serializing updates of one index."""
+        with self._lock:
+            return self._writer_locks.setdefault(name, threading.RLock())
+
+    def get(self, name: str) -> Optional[FAISS]:
+        """Returns the named index, loading the saved collection if needed; None if unknown."""
+        entry = self._entries.get(name)
+        if entry is not None:
+            return entry["index"]
+        with self.writer_lock(name):
+            entry = self._entries.get(name)
+            if entry is None:
+                manifest = read_manifest(name)
+                index = load_collection(name) if manifest is not None else None
+                if index is None:
+                    return None
+                self.put(name, index, manifest.get("content_hashes", {}))
+                logger.info(f"Loaded index '{name}' from its saved collection.")
+                entry = self._entries[name]
+        return entry["index"]
+
+    def put(self, name: str, index: FAISS, content_hashes: Dict[str, str]) -> None:
+        """Registers (or replaces) an index and the content hashes of its source files."""
+        with self._lock:
+            self._entries[name] = {
+                "index": index,
+                "content_hashes": dict(content_hashes),
+                "updated_at": time.time(),
+            }
+
+    def remove(self, name: str) -> bool:
+        """Drops an index from memory (a saved collection is kept). Returns whether it was registered."""
+        with self._lock:
+            return self._entries.pop(name, None) is not None
+
+    def content_hashes(self, name: str) -> Dict[str, str]:
+        """Returns the content hashes of the files in an index, keyed by file name."""
+        entry = self._entries.get(name)
+        return dict(entry["content_hashes"]) if entry else {}
+
+    def status(self, name: str) -> Optional[Dict[str, Any]]:
+        """Returns size and source information for a registered index, or None."""
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        vector_index = entry["index"].index
+        return {
+            "name": name,
+            "loaded": True,
+            "vector_count": vector_index.ntotal,
+            "dimension": vector_index.d,
+            "index_type": index_type_of(vector_index),
+            "sources": sorted(entry["content_hashes"]),
+            "updated_at": entry["updated_at"],
+        }
+
+    def names(self) -> List[str]:
+        """Returns the names of indexes in memory and of saved collections."""
+        with self._lock:
+            loaded = set(self._entries)
+        return sorted(loaded | set(list_collections()))
+
+    def clear(self) -> None:
+        """Drops all in-memory indexes."""
+        with self._lock:
+            self._entries.clear()
+            self._writer_locks.clear()
+
+_index_registry: Optional[IndexRegistry] = None
+_index_registry_lock = threading.Lock()
+
+def get_index_registry() -> IndexRegistry:
+    """Returns the process-wide index registry."""
+    global _index_registry
+    with _index_registry_lock:
+        if _index_registry is None:
+            _index_registry = IndexRegistry()
+        return _index_registry
+
+def clear_index_registry() -> None:
+    """Drops all in-memory indexes (mainly for tests)."""
+    get_index_registry().clear()
@@ -0,0 +1,236 @@
+# src/retrieval/lexical_index.py
+
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Get logger instance using standard practice
+logger = logging.getLogger(__name__)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+LEXICAL_INDEX_FILE = "lexical.npz"
+
+# Words, numbers and identifiers such as "PX-1003", "ISO/IEC" or "4.2.1"
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./:][a-z0-9]+)*")
+_TOKEN_SEPARATORS = re.compile(r"[-_./:]")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+_MAX_TERM_FREQUENCY = np.iinfo(np.uint16).max
+
+def tokenize(text: str) -> List[str]:
+    """Splits text into lowercase terms for BM25.
+
+    Identifiers joined by '-', '_', '.', '/' or ':' are kept whole (so an exact
+    part number or clause reference matches strongly) and also split into their
+    parts (so "1003" still finds "PX-1003"). Common English stopwords are dropped.
+    """
+    terms = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        terms.append(token)
+        if _TOKEN_SEPARATORS.search(token):
+            terms.extend(part for part in _TOKEN_SEPARATORS.split(token) if part and part not in _STOPWORDS)
+    return terms
+
+class BM25Index:
+    """Compact, array-backed BM25 inverted index over document chunks.
+
+    Chunks are identified by the same docstore IDs as the FAISS index they sit
+    next to. Postings are stored CSR-style: for term t, positions
+    offsets[t]:offsets[t + 1] of doc_positions / term_frequencies hold the
+    chunks containing t (int32) and how often (uint16), sorted by chunk. Chunks
+    added since the last search are kept as small pending batches and merged
+    into the arrays on the next search, so growing the index window by window
+    does not rebuild it every time.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[str] = [] # Position -> docstore ID
+        self._vocabulary: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._doc_positions = np.zeros(0, dtype=np.int32)
+        self._term_frequencies = np.zeros(0, dtype=np.uint16)
+        self._doc_lengths = np.zeros(0, dtype=np.int32)
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def add(self, doc_ids: List[str], texts: Iterable[str]) -> None:
+        """Adds chunks (docstore ID and text, in the same order)."""
+        term_ids, positions, frequencies, lengths = [], [], [], []
+        with self._lock:
+            first_position = len(self.doc_ids)
+            vocabulary = self._vocabulary
+            for offset, text in enumerate(texts):
+                terms = tokenize(text)
+                counts = Counter(terms)
+                term_ids.extend(vocabulary.setdefault(term, len(vocabulary)) for term in counts)
+                frequencies.extend(counts.values())
+                positions.extend([first_position + offset] * len(counts))
+                lengths.append(len(terms))
+            if len(lengths) != len(doc_ids):
+                raise ValueError(f"Got {len(doc_ids)} IDs for {len(lengths)} texts.")
+            self.doc_ids.extend(doc_ids)
+            self._pending.append((
+                np.asarray(term_ids, dtype=np.int32),
+                np.asarray(positions, dtype=np.int32),
+                np.minimum(np.asarray(frequencies, dtype=np.int64), _MAX_TERM_FREQUENCY).astype(np.uint16),
+                np.asarray(lengths, dtype=np.int32),
+            ))
+
+    def _compact(self) -> None:
+        """Merges pending batches into the postings arrays (caller holds the lock)."""
+        if not self._pending:
+            return
+        term_counts = np.diff(self._offsets)
+        term_ids = np.concatenate(
+            [np.repeat(np.arange(len(term_counts), dtype=np.int32), term_counts)] + [batch[0] for batch in self._pending]
+        )
+        positions = np.concatenate([self._doc_positions] + [batch[1] for batch in self._pending])
+        frequencies = np.concatenate([self._term_frequencies] + [batch[2] for batch in self._pending])
+        # Existing postings come first and new chunks have higher positions, so a
+        # stable sort by term keeps every postings list sorted by chunk
+        order = np.argsort(term_ids, kind="stable")
+        self._doc_positions = positions[order]
+        self._term_frequencies = frequencies[order]
+        self._offsets = np.zeros(len(self._vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(self._vocabulary)), out=self._offsets[1:])
+        self._doc_lengths = np.concatenate([self._doc_lengths] + [batch[3] for batch in self._pending])
+        self._pending = []
+
+    def remove(self, doc_ids: Iterable[str]) -> int:
+        """Removes chunks by docstore ID; returns how many were found."""
+        removed_ids = set(doc_ids)
+        with self._lock:
+            self._compact()
+            keep = np.fromiter((doc_id not in removed_ids for doc_id in self.doc_ids), dtype=bool, count=len(self.doc_ids))
+            removed = len(keep) - int(keep.sum())
+            if not removed:
+                return 0
+            new_positions = np.cumsum(keep) - 1
+            keep_postings = keep[self._doc_positions]
+            term_ids = np.repeat(np.arange(len(self._offsets) - 1, dtype=np.int32), np.diff(self._offsets))[keep_postings]
+            self._doc_positions = new_positions[self._doc_positions[keep_postings]].astype(np.int32)
+            self._term_frequencies = self._term_frequencies[keep_postings]
+            self._offsets = np.zeros(len(self._vocabulary) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(term_ids, minlength=len(self._vocabulary)), out=self._offsets[1:])
+            self._doc_lengths = self._doc_lengths[keep]
+            self.doc_ids = [doc_id for doc_id, kept in zip(self.doc_ids, keep) if kept]
+        return removed
+
+    def search(self, query: str, top_k: int, allowed: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """Returns up to top_k (docstore ID, BM25 score) pairs, best first; only chunks sharing a term with the query.
+
+        Args:
+            query: The query text.
+            top_k: Maximum number of results.
+            allowed: Optional boolean mask over chunk positions (insertion
+                order); chunks outside it are never returned.
+        """
+        query_terms = set(tokenize(query))
+        with self._lock:
+            self._compact()
+            n_docs = len(self.doc_ids)
+            term_ids = [self._vocabulary[term] for term in query_terms if term in self._vocabulary]
+            if not n_docs or not term_ids or top_k <= 0:
+                return []
+            lengths = self._doc_lengths
+            average_length = max(float(lengths.mean()), 1.0)
+            scores = np.zeros(n_docs, dtype=np.float32)
+            for term_id in term_ids:
+                start, end = self._offsets[term_id], self._offsets[term_id + 1]
+                positions = self._doc_positions[start:end]
+                frequencies = self._term_frequencies[start:end].astype(np.float32)
+                idf = math.log(1.0 + (n_docs - len(positions) + 0.5) / (len(positions) + 0.5))
+                norm = self.k1 * (1.0 - self.b + self.b * lengths[positions] / average_length)
+                scores[positions] += idf * frequencies * (self.k1 + 1.0) / (frequencies + norm)
+            if allowed is not None:
+                scores[~allowed] = 0.0
+            matched = np.flatnonzero(scores)
+            if len(matched) > top_k:
+                matched = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+            matched = matched[np.argsort(-scores[matched], kind="stable")]
+            return [(self.doc_ids[position], float(scores[position])) for position in matched]
+
+    def copy(self) -> "BM25Index":
+        """Returns an independent copy (the postings arrays are never modified in place, so they are shared)."""
+        with self._lock:
+            self._compact()
+            clone = BM25Index(self.k1, self.b)
+            clone.doc_ids = list(self.doc_ids)
+            clone._vocabulary = dict(self._vocabulary)
+            clone._offsets = self._offsets
+            clone._doc_positions = self._doc_positions
+            clone._term_frequencies = self._term_frequencies
+            clone._doc_lengths = self._doc_lengths
+        return clone
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the postings arrays (vocabulary and IDs not included)."""
+        with self._lock:
+            self._compact()
+            return sum(a.nbytes for a in (self._offsets, self._doc_positions, self._term_frequencies, self._doc_lengths))
+
+    def save(self, path: str) -> None:
+        """Writes the index to an .npz file."""
+        with self._lock:
+            self._compact()
+            terms = sorted(self._vocabulary, key=self._vocabulary.get)
+            np.savez(
+                path,
+                params=np.array([self.k1, self.b], dtype=np.float64),
+                terms=np.array(terms, dtype=str),
+                doc_ids=np.array(self.doc_ids, dtype=str),
+                offsets=self._offsets,
+                doc_positions=self._doc_positions,
+                term_frequencies=self._term_frequencies,
+                doc_lengths=self._doc_lengths,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Reads an index written by save()."""
+        with np.load(path, allow_pickle=False) as data:
+            k1, b = data["params"].tolist()
+            index = cls(k1, b)
+            index._vocabulary = {term: term_id for term_id, term in enumerate(data["terms"].tolist())}
+            index.doc_ids = data["doc_ids"].tolist()
+            index._offsets = data["offsets"]
+            index._doc_positions = data["doc_positions"]
+            index._term_frequencies = data["term_frequencies"]
+            index._doc_lengths = data["doc_lengths"]
+        return index
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60, top_k: Optional[int] = None) -> List[str]:
+    """Fuses ranked ID lists with reciprocal rank fusion.
+
+    Each ID scores sum(1 / (k + rank)) over the rankings it appears in (rank
+    starting at 1), so items ranked well by several retrievers rise to the top
+    without having to calibrate their scores against each other.
+
+    Args:
+        rankings: ID lists, best first.
+        k: Damping constant; larger values flatten the rank differences.
+        top_k: Number of IDs to return (all by default).
+
+    Returns:
+        The fused IDs, best first (ties keep first-seen order).
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    fused = sorted(scores, key=scores.get, reverse=True) # sorted() is stable
+    return fused[:top_k] if top_k is not None else fused
@@ -0,0 +1,138 @@
+# src/retrieval/onnx_embeddings.py
+
+import logging
+import os
+import re
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Optional dependencies: only needed when EMBEDDING_BACKEND=onnx
+try:
+    import onnxruntime as ort
+except ImportError: # pragma: no cover - depends on the environment
+    ort = None
+
+# Get logger instance using standard practice
+logger = logging.getLogger(__name__)
+
+DEFAULT_ONNX_MODEL_DIR = "./cache/onnx"
+# Token limit used when no EMBEDDING_MAX_SEQ_LENGTH is configured (all-MiniLM-L6-v2 default)
+DEFAULT_MAX_SEQ_LENGTH = 256
+# Intra-op threads for ONNX Runtime; 0 lets it use all physical cores
+ONNX_NUM_THREADS = int(os.getenv("ONNX_NUM_THREADS", "0"))
+
+def _hub_model_id(model_name: str) -> str:
+    """Expands short sentence-transformers names the way HuggingFaceEmbeddings does."""
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray, normalize: bool = True) -> np.ndarray:
+    """Averages token embeddings over the attention mask (sentence-transformers pooling).
+
+    Args:
+        token_embeddings: Array of shape (batch, tokens, dim).
+        attention_mask: Array of shape (batch, tokens); 1 for real tokens.
+        normalize: Whether to L2-normalize the pooled vectors.
+
+    Returns:
+        Array of shape (batch, dim).
+    """
+    mask = attention_mask[..., np.newaxis].astype(np.float32)
+    summed = (token_embeddings * mask).sum(axis=1)
+    pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+    if normalize:
+        pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+    return pooled.astype(np.float32)
+
+def export_onnx_model(model_name: str, output_dir: str, quantize: bool = True) -> str:
+    """Exports a sentence-transformers model to ONNX, optionally int8-quantized.
+
+    The export is done once and reused on later runs. Requires the 'optimum'
+    package (with its ONNX exporter) in addition to onnxruntime.
+
+    Args:
+        model_name: Short or full HuggingFace name of the model.
+        output_dir: Directory receiving model.onnx, the tokenizer files and,
+            if quantize is set, model_int8.onnx.
+        quantize: Whether to apply dynamic int8 weight quantization.
+
+    Returns:
+        Path to the ONNX file to load.
+    """
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    int8_path = os.path.join(output_dir, "model_int8.onnx")
+    if not os.path.exists(fp32_path):
+        from optimum.exporters.onnx import main_export
+
+        logger.info(f"Exporting '{model_name}' to ONNX in '{output_dir}'...")
+        main_export(_hub_model_id(model_name), output=output_dir, task="feature-extraction")
+    if not quantize:
+        return fp32_path
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info(f"Quantizing '{fp32_path}' to int8...")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+def _load_tokenizer(model_dir: str):
+    """Loads the tokenizer saved alongside the exported model."""
+    from transformers import AutoTokenizer
+
+    return AutoTokenizer.from_pretrained(model_dir)
+
+class OnnxEmbeddings(Embeddings):
+    """Sentence-transformers embeddings computed with ONNX Runtime on CPU.
+
+    Runs the exported (and by default dynamically int8-quantized) transformer
+    graph, then applies the same mean pooling and normalization as the
+    sentence-transformers pipeline, so it can replace HuggingFaceEmbeddings.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        model_dir: Optional[str] = None,
+        quantize: bool = True,
+        max_seq_length: int = DEFAULT_MAX_SEQ_LENGTH,
+        batch_size: int = 32
+    ):
+        if ort is None:
+            raise ImportError("The ONNX embedding backend requires the 'onnxruntime' package.")
+
+        self.base_model_name = model_name
+        # Vectors differ slightly from the PyTorch model, so caches must keep them apart
+        self.model_name = f"{model_name}-onnx-int8" if quantize else f"{model_name}-onnx"
+        self.max_seq_length = max_seq_length
+        self.batch_size = max(1, batch_size)
+
+        model_dir = model_dir or os.path.join(
+            os.getenv("ONNX_MODEL_DIR", DEFAULT_ONNX_MODEL_DIR), re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+        )
+        onnx_path = export_onnx_model(model_name, model_dir, quantize=quantize)
+        self.tokenizer = _load_tokenizer(model_dir)
+
+        options = ort.SessionOptions()
+        if ONNX_NUM_THREADS > 0:
+            options.intra_op_num_threads = ONNX_NUM_THREADS
+        self.session = ort.InferenceSession(onnx_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self._input_names = {node.name for node in self.session.get_inputs()}
+        logger.info(f"Loaded ONNX embedding model from '{onnx_path}'.")
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np"
+        )
+        inputs = {name: np.asarray(value, dtype=np.int64) for name, value in encoded.items() if name in self._input_names}
+        token_embeddings = self.session.run(None, inputs)[0]
+        return mean_pool(token_embeddings, inputs["attention_mask"])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embeds texts in batches of batch_size."""
+        vectors = [self._embed(texts[start:start + self.batch_size]) for start in range(0, len(texts), self.batch_size)]
+        return np.concatenate(vectors).tolist() if vectors else []
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embeds a single query."""
+        return self._embed([text])[0].tolist()
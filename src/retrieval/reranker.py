@@ -0,0 +1,276 @@
+# src/retrieval/reranker.py
+
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+from src.config.metrics import count, stage_timer
+from src.retrieval.vector_store import get_retrieval_executor
+
+# Optional dependency: only needed when RERANK_ENABLED is set
+try:
+    from sentence_transformers import CrossEncoder
+except ImportError: # pragma: no cover - depends on the environment
+    CrossEncoder = None
+
+# Get logger instance using standard practice
+logger = logging.getLogger(__name__)
+
+DEFAULT_RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+DEFAULT_RERANK_CACHE_MAX_ENTRIES = 10000
+# Rescore retrieved chunks with a cross-encoder before they reach the LLM
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes", "on")
+RERANK_MODEL = os.getenv("RERANK_MODEL", DEFAULT_RERANK_MODEL)
+# Chunks retrieved per query for reranking (the best top_k of them are kept)
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+# (query, chunk) pairs scored per model call
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+# Scoring time per query; candidates not scored in time keep their retrieval order
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "300"))
+# Token limit per (query, chunk) pair; 0 keeps the model default
+RERANK_MAX_SEQ_LENGTH = int(os.getenv("RERANK_MAX_SEQ_LENGTH", "0"))
+
+# Process-wide registry of loaded cross-encoders, shared by all sessions
+_cross_encoders: Dict[str, Any] = {}
+_cross_encoder_lock = threading.Lock()
+# Measured scoring cost per model (seconds per pair, moving average), used to size batches to the budget
+_seconds_per_pair: Dict[str, float] = {}
+
+_rerank_cache: Optional["RerankScoreCache"] = None
+_rerank_cache_lock = threading.Lock()
+
+class RerankScoreCache:
+    """In-memory LRU cache of cross-encoder scores per (model, query, chunk text).
+
+    Keys are hashes of the three, so a repeated question over the same chunks
+    is not scored again, whichever index or session the chunks come from.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_RERANK_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._scores: "OrderedDict[bytes, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model_name: str, query: str, text: str) -> bytes:
+        return hashlib.sha256("\0".join((model_name, query, text)).encode("utf-8")).digest()
+
+    def get_many(self, model_name: str, query: str, texts: Sequence[str]) -> List[Optional[float]]:
+        """Returns the cached score of each text for the query, or None where there is none."""
+        keys = [self._key(model_name, query, text) for text in texts]
+        scores = []
+        with self._lock:
+            for key in keys:
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                scores.append(score)
+            found = sum(score is not None for score in scores)
+            self.hits += found
+            self.misses += len(scores) - found
+        return scores
+
+    def put_many(self, model_name: str, query: str, texts: Sequence[str], scores: Sequence[float]) -> None:
+        """Stores the scores of texts for the query, evicting the least recently used beyond max_entries."""
+        with self._lock:
+            for text, score in zip(texts, scores):
+                key = self._key(model_name, query, text)
+                self._scores[key] = float(score)
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "entries": len(self._scores),
+                "max_entries": self.max_entries,
+            }
+
+def get_rerank_cache() -> Optional[RerankScoreCache]:
+    """Returns the process-wide rerank score cache, or None if it is disabled.
+
+    Configured via RERANK_CACHE_MAX_ENTRIES; 0 disables the cache.
+    """
+    global _rerank_cache
+    with _rerank_cache_lock:
+        if _rerank_cache is None:
+            max_entries = int(os.getenv("RERANK_CACHE_MAX_ENTRIES", str(DEFAULT_RERANK_CACHE_MAX_ENTRIES)))
+            if max_entries <= 0:
+                return None
+            _rerank_cache = RerankScoreCache(max_entries)
+        return _rerank_cache
+
+def get_cross_encoder(model_name: str = RERANK_MODEL) -> Optional[Any]:
+    """Loads a cross-encoder once per process (sentence-transformers CrossEncoder).
+
+    Args:
+        model_name: HuggingFace name of the cross-encoder.
+
+    Returns:
+        The model, or None if sentence-transformers is missing or loading fails
+        (failed loads are retried on the next call).
+    """
+    model = _cross_encoders.get(model_name)
+    if model is not None:
+        return model
+
+    with _cross_encoder_lock:
+        model = _cross_encoders.get(model_name)
+        if model is not None: # Loaded by another thread while we waited
+            return model
+        if CrossEncoder is None:
+            logger.error("Cannot load cross-encoder: sentence-transformers is not installed.")
+            return None
+        try:
+            start_time = time.perf_counter()
+            kwargs = {"max_length": RERANK_MAX_SEQ_LENGTH} if RERANK_MAX_SEQ_LENGTH > 0 else {}
+            model = CrossEncoder(model_name, device="cpu", **kwargs)
+            _cross_encoders[model_name] = model
+            logger.info(f"Initialized cross-encoder '{model_name}' in {time.perf_counter() - start_time:.2f}s.")
+            return model
+        except Exception:
+            logger.exception(f"Failed to initialize cross-encoder '{model_name}'")
+            return None
+
+def clear_reranker_registry() -> None:
+    """Drops loaded cross-encoders, their measured costs and the score cache (mainly for tests)."""
+    global _rerank_cache
+    with _cross_encoder_lock:
+        _cross_encoders.clear()
+        _seconds_per_pair.clear()
+    with _rerank_cache_lock:
+        _rerank_cache = None
+
+def rerank_fetch_k(top_k: int) -> int:
+    """Number of chunks to retrieve for a query whose top_k chunks are kept after reranking."""
+    return max(top_k, RERANK_CANDIDATES) if RERANK_ENABLED else top_k
+
+def rerank_settings() -> Optional[tuple]:
+    """Reranking settings that change which chunks are kept (for answer cache fingerprints); None if disabled."""
+    return (RERANK_MODEL, RERANK_CANDIDATES) if RERANK_ENABLED else None
+
+def _score_pairs(
+    model: Any,
+    model_name: str,
+    query: str,
+    texts: List[str],
+    batch_size: int,
+    deadline: float
+) -> List[Optional[float]]:
+    """Scores (query, text) pairs in batches until done or the deadline passes; None for unscored texts.
+
+    Batches are shrunk to what the measured per-pair cost says still fits
+    before the deadline, so the budget is only overshot when the model runs
+    slower than measured (or on its first call, before there is a measurement).
+    """
+    scores: List[Optional[float]] = [None] * len(texts)
+    position = 0
+    while position < len(texts):
+        remaining = deadline - time.perf_counter()
+        size = min(batch_size, len(texts) - position)
+        seconds_per_pair = _seconds_per_pair.get(model_name)
+        if seconds_per_pair:
+            size = min(size, int(remaining / seconds_per_pair))
+        if remaining <= 0 or size <= 0:
+            break
+        start_time = time.perf_counter()
+        batch_scores = model.predict(
+            [(query, text) for text in texts[position:position + size]], batch_size=size, show_progress_bar=False
+        )
+        cost = (time.perf_counter() - start_time) / size
+        _seconds_per_pair[model_name] = cost if seconds_per_pair is None else 0.8 * seconds_per_pair + 0.2 * cost
+        scores[position:position + size] = [float(score) for score in batch_scores]
+        position += size
+    return scores
+
+def rerank_documents(
+    query: str,
+    documents: List[Document],
+    top_k: int,
+    model_name: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    budget_ms: Optional[float] = None
+) -> List[Document]:
+    """Reorders retrieved chunks by cross-encoder relevance and keeps the best top_k.
+
+    A cross-encoder reads the query and the chunk together, so it judges
+    relevance much better than the bi-encoder used for retrieval, at a higher
+    cost per chunk. That cost is bounded: pairs are scored in batches within a
+    time budget, and scores are cached per (query, chunk). Chunks not scored
+    in time rank after the scored ones, in retrieval order. Without reranking
+    (RERANK_ENABLED unset, or the model unavailable) the first top_k chunks
+    are returned unchanged.
+
+    Args:
+        query: The query string.
+        documents: Retrieved chunks, best first (typically rerank_fetch_k(top_k) of them).
+        top_k: Number of chunks to keep.
+        model_name: Cross-encoder to use; defaults to RERANK_MODEL. Passing one
+            reranks even if RERANK_ENABLED is unset.
+        batch_size: Pairs per model call; defaults to RERANK_BATCH_SIZE.
+        budget_ms: Scoring time limit; defaults to RERANK_BUDGET_MS.
+
+    Returns:
+        Up to top_k documents, most relevant first.
+    """
+    if len(documents) <= 1 or (model_name is None and not RERANK_ENABLED):
+        return documents[:top_k]
+    model_name = model_name or RERANK_MODEL
+    model = get_cross_encoder(model_name)
+    if model is None:
+        return documents[:top_k]
+
+    try:
+        with stage_timer("rerank"):
+            deadline = time.perf_counter() + (RERANK_BUDGET_MS if budget_ms is None else budget_ms) / 1000
+            query = query.strip()
+            texts = [doc.page_content for doc in documents]
+            cache = get_rerank_cache()
+            scores = cache.get_many(model_name, query, texts) if cache is not None else [None] * len(texts)
+            missing = [i for i, score in enumerate(scores) if score is None]
+            new_scores = _score_pairs(
+                model, model_name, query, [texts[i] for i in missing], max(1, batch_size or RERANK_BATCH_SIZE), deadline
+            )
+            scored = [(i, score) for i, score in zip(missing, new_scores) if score is not None]
+            for i, score in scored:
+                scores[i] = score
+            if cache is not None and scored:
+                cache.put_many(model_name, query, [texts[i] for i, _ in scored], [score for _, score in scored])
+
+            skipped = len(missing) - len(scored)
+            count("items_total", len(scored), kind="rerank_pairs_scored")
+            count("items_total", len(documents) - len(missing), kind="rerank_pairs_cached")
+            if skipped:
+                count("items_total", skipped, kind="rerank_pairs_skipped")
+                logger.warning(f"Rerank budget exhausted: {skipped} of {len(documents)} chunks kept their retrieval rank.")
+            # Scored chunks by score; unscored ones after them in retrieval order (sorted() is stable)
+            order = sorted(range(len(documents)), key=lambda i: (scores[i] is None, -(scores[i] or 0.0)))
+            logger.info(f"Reranked {len(documents)} chunks ({len(scored)} scored, {skipped} over budget).")
+            return [documents[i] for i in order[:top_k]]
+    except Exception:
+        logger.exception(f"Reranking failed for query: '{query[:100]}...'; keeping retrieval order.")
+        return documents[:top_k]
+
+async def arerank_documents(query: str, documents: List[Document], top_k: int, **kwargs: Any) -> List[Document]:
+    """Async variant of rerank_documents; scoring runs on the retrieval thread pool."""
+    if len(documents) <= 1 or (kwargs.get("model_name") is None and not RERANK_ENABLED):
+        return documents[:top_k]
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_retrieval_executor(), lambda: rerank_documents(query, documents, top_k, **kwargs)
+    )
@@ -1,23 +1,136 @@
 # src/retrieval/vector_store.py
 
+import asyncio
+import functools
 import logging
 import os
-from typing import List, Optional
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import HuggingFaceEmbeddings
 # Use the recommended import path for Document
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 
+from src.config.metrics import count, stage_timer, timed
+from src.retrieval.embedding_cache import get_embedding_cache, normalize_text
+from src.retrieval.lexical_index import LEXICAL_INDEX_FILE, BM25Index, reciprocal_rank_fusion
+from src.retrieval.onnx_embeddings import DEFAULT_MAX_SEQ_LENGTH, OnnxEmbeddings
+
 # Get logger instance using standard practice
 logger = logging.getLogger(__name__)
 
 DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
-# DEFAULT_FAISS_INDEX_PATH = "./faiss_index" # Removed: No longer saving to disk
+# Embedding batch settings, tuned per deployment (CPU-only nodes prefer smaller batches)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+# Token limit per chunk; 0 keeps the model default (256 for all-MiniLM-L6-v2)
+EMBEDDING_MAX_SEQ_LENGTH = int(os.getenv("EMBEDDING_MAX_SEQ_LENGTH", "0"))
+# "torch" (sentence-transformers) or "onnx" (ONNX Runtime, int8-quantized)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+DEFAULT_FAISS_INDEX_PATH = "./faiss_index"
+# Index factory: exact search up to this many vectors, then HNSW, then IVF-PQ
+INDEX_FLAT_MAX_VECTORS = int(os.getenv("INDEX_FLAT_MAX_VECTORS", "50000"))
+# Memory the vector index may use; HNSW is only chosen if its graph fits
+INDEX_MEMORY_BUDGET_MB = int(os.getenv("INDEX_MEMORY_BUDGET_MB", "1024"))
+HNSW_M = 32
+# Default recall/latency knobs (overridable per search)
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+# Upper bound on vectors used to train IVF-PQ quantizers
+IVF_TRAINING_SAMPLE = int(os.getenv("IVF_TRAINING_SAMPLE", "100000"))
+# Worker threads for embedding and FAISS calls made from async code
+RETRIEVAL_MAX_WORKERS = int(os.getenv("RETRIEVAL_MAX_WORKERS", "4"))
+# "dense" (vectors only), "hybrid" (vectors + BM25, fused with reciprocal rank fusion)
+# or "mmr" (vectors, diversified with maximal marginal relevance)
+SEARCH_MODES = ("dense", "hybrid", "mmr")
+SEARCH_MODE = os.getenv("SEARCH_MODE", "dense").lower()
+# Candidates taken from each retriever before fusion, and the RRF damping constant
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# MMR: candidates fetched by vector similarity, and relevance vs. diversity (1 = relevance only)
+MMR_FETCH_K = int(os.getenv("MMR_FETCH_K", "20"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.5"))
+
+# Process-wide registry of loaded embedding models, shared by all sessions
+_embedding_models: Dict[str, Embeddings] = {}
+_embedding_model_stats: Dict[str, Dict[str, Any]] = {}
+_embedding_model_locks: Dict[str, threading.Lock] = {}
+_warming_models: Set[str] = set()
+_registry_lock = threading.Lock()
+# Cumulative embedding throughput across all calls to embed_texts
+_throughput_stats = {"chunks": 0, "seconds": 0.0, "last_chunks_per_sec": None}
+_throughput_lock = threading.Lock()
+
+_retrieval_executor: Optional[ThreadPoolExecutor] = None
+_retrieval_executor_lock = threading.Lock()
+
+def _get_model_lock(model_name: str) -> threading.Lock:
+    with _registry_lock:
+        return _embedding_model_locks.setdefault(model_name, threading.Lock())
+
+def _current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux only), used to measure model footprint."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def _model_parameter_bytes(embeddings: Embeddings) -> Optional[int]:
+    """Size of the model weights, if the backend exposes a torch module."""
+    client = getattr(embeddings, "client", None)
+    try:
+        return sum(p.numel() * p.element_size() for p in client.parameters())
+    except Exception:
+        return None
+
+def _configure_embedding_model(embeddings: Embeddings) -> None:
+    """Applies the configured batch size and max sequence length to a loaded model."""
+    encode_kwargs = getattr(embeddings, "encode_kwargs", None)
+    if isinstance(encode_kwargs, dict):
+        # embed_texts already hands over one bucket at a time; keep the model from re-batching it
+        encode_kwargs["batch_size"] = EMBEDDING_BATCH_SIZE
+    client = getattr(embeddings, "client", None)
+    if EMBEDDING_MAX_SEQ_LENGTH > 0 and client is not None:
+        client.max_seq_length = EMBEDDING_MAX_SEQ_LENGTH
+        logger.info(f"Embedding max sequence length set to {EMBEDDING_MAX_SEQ_LENGTH} tokens.")
+
+def _load_embedding_model(model_name: str) -> Tuple[Embeddings, str]:
+    """Loads a model with the configured backend, falling back to PyTorch if ONNX fails.
+
+    Returns:
+        The embeddings and the name of the backend that loaded them.
+    """
+    if EMBEDDING_BACKEND == "onnx":
+        try:
+            logger.info(f"Initializing ONNX (int8) embedding model: {model_name}")
+            embeddings = OnnxEmbeddings(
+                model_name,
+                max_seq_length=EMBEDDING_MAX_SEQ_LENGTH or DEFAULT_MAX_SEQ_LENGTH,
+                batch_size=EMBEDDING_BATCH_SIZE,
+            )
+            return embeddings, "onnx"
+        except Exception:
+            logger.exception(f"Failed to initialize ONNX backend for '{model_name}'; falling back to PyTorch.")
+    logger.info(f"Initializing HuggingFace embedding model: {model_name}")
+    embeddings = HuggingFaceEmbeddings(model_name=model_name)
+    _configure_embedding_model(embeddings)
+    return embeddings, "torch"
 
 def get_embedding_function(model_name: str = DEFAULT_EMBEDDING_MODEL) -> Optional[Embeddings]:
-    """Initializes and returns HuggingFace embeddings.
+    """Returns the shared embeddings for a model, loading it on first use.
+
+    Each model is loaded once per process and reused by every session and index
+    build. Loading is serialized per model, so concurrent callers wait for the
+    first load instead of loading their own copy. EMBEDDING_BACKEND selects
+    sentence-transformers ("torch", default) or ONNX Runtime ("onnx").
 
     Args:
         model_name: The name of the sentence-transformer model to use.
@@ -25,20 +138,96 @@ def get_embedding_function(model_name: str = DEFAULT_EMBEDDING_MODEL) -> Optiona
     Returns:
         An Embeddings object or None if an error occurs.
     """
-    try:
-        logger.info(f"Initializing HuggingFace embedding model: {model_name}")
-        embeddings = HuggingFaceEmbeddings(model_name=model_name)
-        logger.info("Initialized HuggingFace embeddings successfully.")
+    embeddings = _embedding_models.get(model_name)
+    if embeddings is not None:
         return embeddings
-    except Exception:
-        logger.exception(f"Failed to initialize embedding model '{model_name}'")
-        return None
 
-def build_faiss_index(documents: List[Document]) -> Optional[FAISS]:
+    with _get_model_lock(model_name):
+        embeddings = _embedding_models.get(model_name)
+        if embeddings is not None: # Loaded by another thread while we waited
+            return embeddings
+        try:
+            rss_before = _current_rss_bytes()
+            start_time = time.perf_counter()
+            embeddings, backend = _load_embedding_model(model_name)
+            load_seconds = time.perf_counter() - start_time
+            rss_after = _current_rss_bytes()
+
+            stats = {
+                "backend": backend,
+                "load_seconds": round(load_seconds, 3),
+                "parameter_bytes": _model_parameter_bytes(embeddings),
+                "rss_delta_bytes": rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+            }
+            _embedding_model_stats[model_name] = stats
+            _embedding_models[model_name] = embeddings
+            logger.info(f"Initialized embeddings successfully in {load_seconds:.2f}s ({stats}).")
+            return embeddings
+        except Exception:
+            logger.exception(f"Failed to initialize embedding model '{model_name}'")
+            return None
+
+def embedding_model_id(embeddings: Embeddings) -> str:
+    """Identifies the vectors an embedding function produces (model, backend and token limit).
+
+    ONNX models carry the backend and quantization in their name (e.g.
+    'all-MiniLM-L6-v2-onnx-int8'); the token limit is appended because chunks
+    truncated at another length get other vectors. Used to key caches and
+    persisted indexes, so vectors from different settings are never mixed.
+    """
+    model_id = getattr(embeddings, "model_name", None)
+    if not isinstance(model_id, str):
+        return DEFAULT_EMBEDDING_MODEL
+    # OnnxEmbeddings exposes the limit directly, sentence-transformers on its client
+    max_seq_length = getattr(embeddings, "max_seq_length", None)
+    if max_seq_length is None:
+        max_seq_length = getattr(getattr(embeddings, "client", None), "max_seq_length", None)
+    return f"{model_id}-seq{max_seq_length}" if isinstance(max_seq_length, int) else model_id
+
+def warm_up_embedding_model(model_name: str = DEFAULT_EMBEDDING_MODEL) -> Optional[threading.Thread]:
+    """Starts loading an embedding model in a background thread.
+
+    Safe to call on every script run: does nothing if the model is already
+    loaded or being loaded.
+
+    Returns:
+        The loader thread, or None if no load was started.
+    """
+    with _registry_lock:
+        if model_name in _embedding_models or model_name in _warming_models:
+            return None
+        _warming_models.add(model_name)
+
+    def _load():
+        try:
+            get_embedding_function(model_name)
+        finally:
+            with _registry_lock:
+                _warming_models.discard(model_name)
+
+    thread = threading.Thread(target=_load, name=f"embedding-warmup-{model_name}", daemon=True)
+    thread.start()
+    logger.info(f"Started background warm-up of embedding model '{model_name}'.")
+    return thread
+
+def get_embedding_model_stats() -> Dict[str, Dict[str, Any]]:
+    """Returns load time and memory footprint for every loaded embedding model."""
+    return {name: dict(stats) for name, stats in _embedding_model_stats.items()}
+
+def clear_embedding_model_registry() -> None:
+    """Drops all loaded embedding models (mainly for tests)."""
+    with _registry_lock:
+        _embedding_models.clear()
+        _embedding_model_stats.clear()
+
+@timed("build_index")
+def build_faiss_index(documents: List[Document], index_type: Optional[str] = None) -> Optional[FAISS]:
     """Builds a FAISS index from documents in memory.
 
     Args:
         documents: A list of LangChain Document objects.
+        index_type: "flat", "hnsw" or "ivfpq"; by default chosen from the
+            number of vectors and INDEX_MEMORY_BUDGET_MB (see choose_index_type).
 
     Returns:
         A FAISS index object if successful, None otherwise.
@@ -55,24 +244,781 @@ def build_faiss_index(documents: List[Document]) -> Optional[FAISS]:
 
     try:
         logger.info(f"Building FAISS index from {len(documents)} documents...")
-        faiss_index = FAISS.from_documents(documents, embeddings)
+        vectors = embed_documents(documents, embeddings)
+        faiss_index = add_embeddings_to_index(documents, vectors, embeddings)
+        faiss_index = optimize_index(faiss_index, index_type=index_type)
         logger.info("FAISS index built successfully in memory.")
         return faiss_index # Return the index object directly
     except Exception:
         logger.exception("Failed to build FAISS index from documents.")
         return None # Return None on failure
 
-# Removed the try-except block for saving to disk and related logic/logging
+def _token_lengths(texts: List[str], embeddings: Embeddings) -> List[int]:
+    """Token count per text using the model's tokenizer, or a word count if it has none."""
+    tokenizer = getattr(embeddings, "tokenizer", None) or getattr(getattr(embeddings, "client", None), "tokenizer", None)
+    if tokenizer is not None:
+        try:
+            lengths = [len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"]]
+            if len(lengths) == len(texts):
+                return lengths
+        except Exception:
+            logger.debug("Tokenizer length lookup failed; falling back to word counts.")
+    return [len(text.split()) for text in texts]
+
+def _embed_bucketed(texts: List[str], embeddings: Embeddings, batch_size: int) -> List[List[float]]:
+    """Embeds texts shortest-first in batches of similar length, returning input order."""
+    lengths = _token_lengths(texts, embeddings)
+    order = sorted(range(len(texts)), key=lambda i: lengths[i])
+    vectors: List[Optional[List[float]]] = [None] * len(texts)
+    for start in range(0, len(order), batch_size):
+        bucket = order[start:start + batch_size]
+        bucket_vectors = embeddings.embed_documents([texts[i] for i in bucket])
+        for i, vector in zip(bucket, bucket_vectors):
+            vectors[i] = vector
+    return vectors
+
+@timed("embed")
+def embed_texts(texts: List[str], embeddings: Embeddings, batch_size: Optional[int] = None) -> List[List[float]]:
+    """Embeds texts in length-bucketed batches, going through the embedding cache.
+
+    Vectors already in the persistent embedding cache for this model and token
+    limit (see embedding_model_id) are reused;
+    only the misses are sorted by token length and sent to the model in batches
+    of similar length, so little compute is spent on padding. The vectors are
+    returned in the original order, and the throughput is logged and recorded.
+
+    Args:
+        texts: The texts to embed.
+        embeddings: The embedding function to use.
+        batch_size: Texts per model call. Defaults to EMBEDDING_BATCH_SIZE.
+
+    Returns:
+        One vector per text, in the same order as the input.
+    """
+    if not texts:
+        return []
+    batch_size = max(1, batch_size or EMBEDDING_BATCH_SIZE)
+    start_time = time.perf_counter()
+
+    # Only real models have a name to key the cache on
+    model_name = getattr(embeddings, "model_name", None)
+    cache = get_embedding_cache(embedding_model_id(embeddings)) if isinstance(model_name, str) else None
+    vectors: List[Optional[List[float]]] = [None] * len(texts)
+    if cache is not None:
+        try:
+            for i, cached in enumerate(cache.get_many(texts)):
+                if cached is not None:
+                    vectors[i] = cached.tolist()
+        except Exception:
+            logger.exception("Embedding cache lookup failed; embedding all texts.")
+
+    # Identical texts (after normalization) are embedded once
+    miss_positions: Dict[str, List[int]] = {}
+    for i, vector in enumerate(vectors):
+        if vector is None:
+            miss_positions.setdefault(normalize_text(texts[i]), []).append(i)
+    miss_texts = [texts[positions[0]] for positions in miss_positions.values()]
+    if miss_texts:
+        miss_vectors = _embed_bucketed(miss_texts, embeddings, batch_size)
+        for positions, vector in zip(miss_positions.values(), miss_vectors):
+            for i in positions:
+                vectors[i] = vector
+        if cache is not None:
+            try:
+                cache.put_many(miss_texts, miss_vectors)
+            except Exception:
+                logger.exception("Failed to store embeddings in the embedding cache.")
+
+    elapsed = time.perf_counter() - start_time
+    chunks_per_sec = len(texts) / elapsed if elapsed > 0 else None
+    with _throughput_lock:
+        _throughput_stats["chunks"] += len(texts)
+        _throughput_stats["seconds"] += elapsed
+        _throughput_stats["last_chunks_per_sec"] = chunks_per_sec
+    count("items_total", len(miss_texts), kind="chunks_embedded")
+    count("items_total", len(texts) - len(miss_texts), kind="embeddings_reused")
+    logger.info(
+        f"Embedded {len(texts)} chunks ({len(miss_texts)} sent to the model) in {elapsed:.2f}s "
+        f"({chunks_per_sec or 0:.1f} chunks/sec, batch_size={batch_size})."
+    )
+    return vectors
+
+def get_embedding_throughput() -> Dict[str, Any]:
+    """Returns cumulative embedding throughput (chunks, seconds, chunks/sec)."""
+    with _throughput_lock:
+        stats = dict(_throughput_stats)
+    stats["chunks_per_sec"] = stats["chunks"] / stats["seconds"] if stats["seconds"] > 0 else None
+    return stats
+
+def embed_documents(documents: List[Document], embeddings: Embeddings) -> List[List[float]]:
+    """Embeds the page content of a batch of documents.
+
+    Args:
+        documents: The Document chunks to embed.
+        embeddings: The embedding function to use.
+
+    Returns:
+        One vector per document, in the same order.
+    """
+    logger.debug(f"Embedding batch of {len(documents)} documents...")
+    return embed_texts([doc.page_content for doc in documents], embeddings)
+
+@timed("index_add")
+def add_embeddings_to_index(
+    documents: List[Document],
+    vectors: List[List[float]],
+    embeddings: Embeddings,
+    index: Optional[FAISS] = None
+) -> FAISS:
+    """Inserts pre-computed document vectors into a FAISS index.
+
+    Creates the index on the first call, so an index can be grown batch by batch
+    while it is already being queried. The chunks are also added to the BM25
+    index kept next to the FAISS index (see get_lexical_index), under the same
+    docstore IDs.
+
+    Args:
+        documents: The Document chunks the vectors belong to.
+        vectors: One embedding per document, in the same order.
+        embeddings: The embedding function used for queries against the index.
+        index: An existing index to extend, or None to create a new one.
+
+    Returns:
+        The (new or extended) FAISS index.
+    """
+    texts = [doc.page_content for doc in documents]
+    text_embeddings = list(zip(texts, vectors))
+    metadatas = [doc.metadata for doc in documents]
+    if index is None:
+        logger.debug(f"Creating FAISS index from first batch of {len(documents)} vectors.")
+        index = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas)
+        index.lexical_index = BM25Index()
+        index.lexical_index.add([index.index_to_docstore_id[i] for i in range(index.index.ntotal)], texts)
+        return index
+    lexical_index = get_lexical_index(index) # Before adding, or a lazy build would already include the batch
+    ids = index.add_embeddings(text_embeddings, metadatas=metadatas)
+    index.filter_arrays = None # Rebuilt on the next filtered search
+    if lexical_index is not None:
+        lexical_index.add(ids, texts)
+    logger.debug(f"Added {len(documents)} vectors to FAISS index (total {index.index.ntotal}).")
+    return index
+
+def _index_memory_bytes(index_type: str, n_vectors: int, dim: int) -> int:
+    """Rough memory estimate of a FAISS index of the given type."""
+    if index_type == "flat":
+        return n_vectors * dim * 4
+    if index_type == "hnsw":
+        # Full vectors plus ~2*M neighbour ids per vector on the base layer
+        return n_vectors * (dim * 4 + HNSW_M * 2 * 4)
+    code_size, _ = _pq_params(dim)
+    return n_vectors * (code_size + 8) # PQ code plus stored id
+
+def _pq_params(dim: int) -> Tuple[int, int]:
+    """Sub-quantizer count (about 8 dimensions each, dividing dim) and bits per code."""
+    m = max(1, dim // 8)
+    while dim % m:
+        m -= 1
+    return m, 8
+
+def choose_index_type(n_vectors: int, dim: int, memory_budget_mb: Optional[int] = None) -> str:
+    """Picks the FAISS index type for a corpus.
+
+    Flat (exact) search is used while the corpus is small. Larger corpora get an
+    HNSW graph if it fits in the memory budget, otherwise IVF-PQ, which
+    compresses every vector to a short product-quantization code.
+
+    Args:
+        n_vectors: Number of vectors to index.
+        dim: Vector dimension.
+        memory_budget_mb: Memory budget for the index; defaults to INDEX_MEMORY_BUDGET_MB.
+
+    Returns:
+        "flat", "hnsw" or "ivfpq".
+    """
+    budget = (memory_budget_mb if memory_budget_mb is not None else INDEX_MEMORY_BUDGET_MB) * 1024 * 1024
+    if n_vectors <= INDEX_FLAT_MAX_VECTORS and _index_memory_bytes("flat", n_vectors, dim) <= budget:
+        return "flat"
+    if _index_memory_bytes("hnsw", n_vectors, dim) <= budget:
+        return "hnsw"
+    return "ivfpq"
+
+def index_type_of(vector_index: Any) -> str:
+    """Returns "flat", "hnsw" or "ivfpq" (or "other") for a raw faiss index."""
+    vector_index = faiss.downcast_index(vector_index)
+    if isinstance(vector_index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(vector_index, faiss.IndexIVF):
+        return "ivfpq"
+    if isinstance(vector_index, faiss.IndexFlat):
+        return "flat"
+    return "other"
+
+def create_faiss_index(vectors: np.ndarray, index_type: str) -> Any:
+    """Creates a raw faiss index of the given type holding the vectors.
+
+    IVF-PQ quantizers are trained on a random sample of at most
+    IVF_TRAINING_SAMPLE vectors. Corpora too small to train PQ codebooks
+    get a flat index instead.
+
+    Args:
+        vectors: Float32 array of shape (n, dim).
+        index_type: "flat", "hnsw" or "ivfpq".
+
+    Returns:
+        The populated faiss index.
+    """
+    n_vectors, dim = vectors.shape
+    m, nbits = _pq_params(dim)
+    if index_type == "ivfpq" and n_vectors < 2 ** nbits:
+        logger.warning(f"Too few vectors ({n_vectors}) to train IVF-PQ; using a flat index.")
+        index_type = "flat"
+
+    if index_type == "flat":
+        vector_index = faiss.IndexFlatL2(dim)
+    elif index_type == "hnsw":
+        vector_index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        vector_index.hnsw.efSearch = HNSW_EF_SEARCH
+    elif index_type == "ivfpq":
+        # ~4*sqrt(n) lists, with enough training points per centroid
+        nlist = max(1, min(int(4 * np.sqrt(n_vectors)), n_vectors // 39))
+        vector_index = faiss.index_factory(dim, f"IVF{nlist},PQ{m}x{nbits}")
+        sample_size = min(n_vectors, IVF_TRAINING_SAMPLE)
+        sample = vectors[np.random.default_rng(0).choice(n_vectors, sample_size, replace=False)]
+        start_time = time.perf_counter()
+        vector_index.train(sample)
+        logger.info(f"Trained IVF{nlist},PQ{m}x{nbits} on {sample_size} vectors in {time.perf_counter() - start_time:.2f}s.")
+        faiss.extract_index_ivf(vector_index).nprobe = min(IVF_NPROBE, nlist)
+    else:
+        raise ValueError(f"Unknown index type '{index_type}'. Use 'flat', 'hnsw' or 'ivfpq'.")
+    vector_index.add(vectors)
+    return vector_index
+
+def optimize_index(index: FAISS, index_type: Optional[str] = None, memory_budget_mb: Optional[int] = None) -> FAISS:
+    """Rebuilds a flat FAISS index as HNSW or IVF-PQ when the corpus calls for it.
+
+    Indexes are grown incrementally as flat indexes (exact and trainless); once
+    complete, this moves the vectors into the index type chosen by
+    choose_index_type. The docstore is reused as is.
+
+    Args:
+        index: A LangChain FAISS store backed by a flat index.
+        index_type: Force a type instead of choosing one.
+        memory_budget_mb: Memory budget for the choice; defaults to INDEX_MEMORY_BUDGET_MB.
+
+    Returns:
+        The rebuilt index, or the given one if it is already of the right type.
+    """
+    vector_index = index.index
+    if not isinstance(vector_index, faiss.IndexFlat):
+        return index # Already optimized (or not reconstructable)
+    target = index_type or choose_index_type(vector_index.ntotal, vector_index.d, memory_budget_mb)
+    if target == "flat":
+        return index
+
+    start_time = time.perf_counter()
+    with stage_timer("optimize_index"):
+        vectors = vector_index.reconstruct_n(0, vector_index.ntotal)
+        new_index = create_faiss_index(vectors, target)
+    logger.info(
+        f"Rebuilt FAISS index with {vector_index.ntotal} vectors as {index_type_of(new_index)} "
+        f"in {time.perf_counter() - start_time:.2f}s."
+    )
+    optimized = FAISS(index.embedding_function, new_index, index.docstore, index.index_to_docstore_id)
+    lexical_index = getattr(index, "lexical_index", None)
+    if isinstance(lexical_index, BM25Index):
+        optimized.lexical_index = lexical_index
+    return optimized
+
+def copy_index(index: FAISS) -> FAISS:
+    """Returns an independent copy of an index (vectors, docstore, ID mapping and BM25 index).
+
+    Used to extend an index while other threads keep searching the original;
+    the copy is swapped in once complete. Memory-mapped indexes are copied
+    into memory.
+    """
+    copied = FAISS(
+        index.embedding_function,
+        faiss.clone_index(index.index),
+        InMemoryDocstore(dict(index.docstore._dict)),
+        dict(index.index_to_docstore_id),
+        normalize_L2=getattr(index, "_normalize_L2", False),
+    )
+    lexical_index = getattr(index, "lexical_index", None)
+    if isinstance(lexical_index, BM25Index):
+        copied.lexical_index = lexical_index.copy()
+    return copied
+
+def get_lexical_index(index: FAISS) -> Optional[BM25Index]:
+    """Returns the BM25 index kept next to a FAISS index.
+
+    Indexes grown with add_embeddings_to_index carry one from the start; for
+    others (e.g. loaded from files without a saved lexical index) it is built
+    from the docstore on first use.
+
+    Returns:
+        The BM25 index, or None if the object is not a FAISS store.
+    """
+    lexical_index = getattr(index, "lexical_index", None)
+    if isinstance(lexical_index, BM25Index):
+        return lexical_index
+    if not isinstance(index, FAISS):
+        return None
+    start_time = time.perf_counter()
+    doc_ids = [index.index_to_docstore_id[i] for i in range(index.index.ntotal)]
+    lexical_index = BM25Index()
+    lexical_index.add(doc_ids, [index.docstore.search(doc_id).page_content for doc_id in doc_ids])
+    index.lexical_index = lexical_index
+    logger.info(f"Built BM25 index for {len(doc_ids)} chunks in {time.perf_counter() - start_time:.2f}s.")
+    return lexical_index
+
+def source_document_ids(index: FAISS, content_hashes: Dict[str, str]) -> List[str]:
+    """Returns the docstore IDs of all chunks of the given source files.
+
+    Chunks are matched by their 'content_hash' metadata. Chunks indexed before
+    they were tagged with it (e.g. in older saved collections) are matched by
+    their 'source' file name instead.
+
+    Args:
+        index: The index to look in.
+        content_hashes: The files, as file name -> content hash.
+    """
+    hashes = set(content_hashes.values())
+    names = set(content_hashes)
+    doc_ids = []
+    for doc_id in index.index_to_docstore_id.values():
+        metadata = index.docstore.search(doc_id).metadata
+        content_hash = metadata.get("content_hash")
+        if content_hash in hashes or (content_hash is None and metadata.get("source") in names):
+            doc_ids.append(doc_id)
+    return doc_ids
+
+def _renumber_ivf_ids(vector_index: Any, new_ids: np.ndarray) -> None:
+    """Rewrites the labels stored in an IVF index's inverted lists in place (old label -> new_ids[old label])."""
+    invlists = faiss.extract_index_ivf(vector_index).invlists
+    for list_no in range(invlists.nlist):
+        list_size = invlists.list_size(list_no)
+        if not list_size:
+            continue
+        ids = faiss.rev_swig_ptr(invlists.get_ids(list_no), list_size).copy()
+        codes = faiss.rev_swig_ptr(invlists.get_codes(list_no), list_size * invlists.code_size).copy()
+        invlists.update_entries(list_no, 0, list_size, faiss.swig_ptr(new_ids[ids]), faiss.swig_ptr(codes))
 
-# Removed load_faiss_index function entirely
+def delete_documents(index: FAISS, doc_ids: List[str]) -> Optional[FAISS]:
+    """Returns a copy of an index without the given chunks (vectors, docstore entries and BM25 postings).
 
-def search_index(query: str, index: FAISS, top_k: int = 3) -> List[Document]:
+    The original index is left untouched, so it can keep serving searches
+    until the copy is swapped in. Flat and IVF indexes are edited with
+    remove_ids, so IVF-PQ codes are kept as they are and nothing is retrained;
+    IVF keeps the old labels of the remaining vectors, so they are renumbered
+    to match the compacted docstore mapping and BM25 positions. HNSW cannot
+    remove vectors and is rebuilt from the remaining (exact) ones.
+
+    Args:
+        index: The index to delete from.
+        doc_ids: Docstore IDs of the chunks to delete. Duplicates and IDs not
+            in the index are ignored.
+
+    Returns:
+        The updated copy, or None if no chunks are left.
+    """
+    indexed_ids = set(index.index_to_docstore_id.values())
+    doc_ids = [doc_id for doc_id in dict.fromkeys(doc_ids) if doc_id in indexed_ids]
+    if doc_ids and len(doc_ids) >= len(indexed_ids):
+        return None
+    updated = copy_index(index)
+    lexical_index = get_lexical_index(updated)
+    if not doc_ids:
+        return updated
+    removed = set(doc_ids)
+    positions = sorted(updated.index_to_docstore_id.items())
+    keep = np.array([doc_id not in removed for _, doc_id in positions], dtype=bool)
+    kept_ids = [doc_id for _, doc_id in positions if doc_id not in removed]
+    vector_index = faiss.downcast_index(updated.index)
+    if isinstance(vector_index, faiss.IndexHNSW):
+        kept_positions = np.array([position for position, _ in positions], dtype=np.int64)[keep]
+        updated.index = create_faiss_index(vector_index.reconstruct_batch(kept_positions), "hnsw")
+    else:
+        if isinstance(vector_index, faiss.IndexIVF):
+            vector_index.make_direct_map(False) # remove_ids does not support the array direct map
+        vector_index.remove_ids(faiss.IDSelectorBatch(np.flatnonzero(~keep).astype(np.int64)))
+        if isinstance(vector_index, faiss.IndexIVF):
+            _renumber_ivf_ids(vector_index, (np.cumsum(keep) - 1).astype(np.int64))
+    updated.docstore.delete(doc_ids)
+    updated.index_to_docstore_id = dict(enumerate(kept_ids))
+    lexical_index.remove(doc_ids)
+    logger.info(f"Deleted {len(doc_ids)} chunks from the index ({updated.index.ntotal} left).")
+    return updated
+
+def save_faiss_index(index: FAISS, index_path: str = DEFAULT_FAISS_INDEX_PATH) -> bool:
+    """Saves a FAISS index, its docstore and its BM25 index to disk (index.faiss + index.pkl + lexical.npz).
+
+    Args:
+        index: The index to save.
+        index_path: Directory to write the index files to.
+
+    Returns:
+        True if the index was saved, False otherwise.
+    """
+    try:
+        index.save_local(index_path)
+        lexical_index = get_lexical_index(index)
+        if lexical_index is not None:
+            lexical_index.save(os.path.join(index_path, LEXICAL_INDEX_FILE))
+        logger.info(f"FAISS index saved to '{index_path}' ({index.index.ntotal} vectors).")
+        return True
+    except Exception:
+        logger.exception(f"Failed to save FAISS index to '{index_path}'.")
+        return False
+
+def load_faiss_index(index_path: str = DEFAULT_FAISS_INDEX_PATH, mmap: bool = False) -> Optional[FAISS]:
+    """Loads a FAISS index saved with save_faiss_index.
+
+    With mmap=True the vectors are memory-mapped instead of read into memory,
+    so opening even a large index costs little more than opening the file;
+    pages are loaded by the OS as searches touch them.
+
+    Args:
+        index_path: Directory containing index.faiss and index.pkl.
+        mmap: Whether to memory-map the vector index.
+
+    Returns:
+        The loaded FAISS index, or None if it is missing or cannot be loaded.
+    """
+    faiss_file = os.path.join(index_path, "index.faiss")
+    docstore_file = os.path.join(index_path, "index.pkl")
+    if not (os.path.exists(faiss_file) and os.path.exists(docstore_file)):
+        logger.warning(f"No FAISS index found at '{index_path}'.")
+        return None
+
+    embeddings = get_embedding_function()
+    if not embeddings:
+        logger.error("Cannot load FAISS index: Failed to get embedding function.")
+        return None
+
+    try:
+        start_time = time.perf_counter()
+        if mmap:
+            vector_index = faiss.read_index(faiss_file, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            with open(docstore_file, "rb") as f:
+                # Written by our own save_faiss_index; same trust model as FAISS.load_local below
+                docstore, index_to_docstore_id = pickle.load(f)
+            index = FAISS(embeddings, vector_index, docstore, index_to_docstore_id)
+        else:
+            index = FAISS.load_local(index_path, embeddings, allow_dangerous_deserialization=True)
+        _load_lexical_index(index, index_path)
+        logger.info(f"Loaded FAISS index from '{index_path}' in {time.perf_counter() - start_time:.3f}s (mmap={mmap}).")
+        return index
+    except Exception:
+        logger.exception(f"Failed to load FAISS index from '{index_path}'.")
+        return None
+
+def _load_lexical_index(index: FAISS, index_path: str) -> None:
+    """Attaches the saved BM25 index, if any; otherwise it is rebuilt on first use."""
+    lexical_file = os.path.join(index_path, LEXICAL_INDEX_FILE)
+    if not os.path.exists(lexical_file):
+        return
+    try:
+        lexical_index = BM25Index.load(lexical_file)
+    except Exception:
+        logger.exception(f"Failed to load BM25 index from '{lexical_file}'; it will be rebuilt.")
+        return
+    if len(lexical_index) == index.index.ntotal:
+        index.lexical_index = lexical_index
+    else:
+        logger.warning(f"BM25 index in '{index_path}' does not match the FAISS index; it will be rebuilt.")
+
+@timed("embed_query")
+def embed_query(query: str, embeddings: Optional[Embeddings] = None) -> Optional[List[float]]:
+    """Embeds a query once, so the vector can be reused (search, answer cache).
+
+    Args:
+        query: The query string.
+        embeddings: The embedding function; defaults to the shared model.
+
+    Returns:
+        The query vector, or None if it could not be computed.
+    """
+    embeddings = embeddings or get_embedding_function()
+    if not embeddings:
+        logger.error("Cannot embed query: Failed to get embedding function.")
+        return None
+    try:
+        return embeddings.embed_query(query)
+    except Exception:
+        logger.exception(f"Failed to embed query: '{query[:100]}...'")
+        return None
+
+def _chunk_filter_arrays(index: FAISS) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Returns the source names plus per-vector source codes and pages (-1 if unknown) of an index.
+
+    Built from the docstore on first use and cached on the index until it changes.
+    """
+    n_vectors = index.index.ntotal
+    cached = getattr(index, "filter_arrays", None)
+    if cached is not None and cached[0] == n_vectors:
+        return cached[1:]
+    source_codes: Dict[str, int] = {}
+    codes = np.empty(n_vectors, dtype=np.int32)
+    pages = np.full(n_vectors, -1, dtype=np.int32)
+    for position in range(n_vectors):
+        metadata = index.docstore.search(index.index_to_docstore_id[position]).metadata
+        codes[position] = source_codes.setdefault(metadata.get("source"), len(source_codes))
+        if isinstance(metadata.get("page"), int):
+            pages[position] = metadata["page"]
+    index.filter_arrays = (n_vectors, list(source_codes), codes, pages)
+    return index.filter_arrays[1:]
+
+def index_sources(index: FAISS) -> List[str]:
+    """Returns the names of the source files with chunks in an index, sorted."""
+    sources, codes, _ = _chunk_filter_arrays(index)
+    return sorted(sources[code] for code in np.unique(codes) if sources[code] is not None)
+
+def _filter_mask(
+    index: FAISS,
+    sources: Optional[Sequence[str]],
+    page_range: Optional[Tuple[int, int]]
+) -> Optional[np.ndarray]:
+    """Returns a boolean mask over the index's vectors for the filters, or None if there are none."""
+    if not sources and page_range is None:
+        return None
+    source_names, codes, pages = _chunk_filter_arrays(index)
+    mask = np.ones(len(codes), dtype=bool)
+    if sources:
+        wanted = [code for code, name in enumerate(source_names) if name in set(sources)]
+        mask &= np.isin(codes, wanted)
+    if page_range is not None:
+        first_page, last_page = page_range
+        mask &= (pages >= first_page) & (pages <= last_page)
+    return mask
+
+def _search_params(
+    vector_index: Any,
+    k: int,
+    selector: Any = None,
+    ef_search: Optional[int] = None,
+    nprobe: Optional[int] = None
+) -> Any:
+    """Per-call FAISS search parameters (ID selector and recall/latency knobs), or None for the index defaults.
+
+    Knobs are passed with each search instead of being set on the index,
+    which is shared by concurrent sessions and requests.
+    """
+    if isinstance(vector_index, faiss.IndexHNSW) and (selector is not None or ef_search is not None):
+        ef = vector_index.hnsw.efSearch if ef_search is None else ef_search
+        # A selective filter needs a longer candidate list to still find k vectors
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=max(ef, k) if selector is not None else ef)
+    if isinstance(vector_index, faiss.IndexIVF) and (selector is not None or nprobe is not None):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=vector_index.nprobe if nprobe is None else nprobe)
+    return faiss.SearchParameters(sel=selector) if selector is not None else None
+
+def _exact_search_subset(vector_index: Any, vectors: np.ndarray, positions: np.ndarray, k: int) -> np.ndarray:
+    """Brute-force k-NN over the given vector positions; returns positions like index.search."""
+    if isinstance(vector_index, faiss.IndexIVF):
+        vector_index.make_direct_map() # Needed to reconstruct IVF vectors (no-op once built)
+    subset = vector_index.reconstruct_batch(positions.astype(np.int64))
+    _, local_ids = faiss.knn(vectors, subset, k, metric=vector_index.metric_type)
+    return np.where(local_ids >= 0, positions[np.maximum(local_ids, 0)], -1)
+
+def _dense_search_positions(
+    index: FAISS,
+    query_vectors: Any,
+    k: int,
+    mask: Optional[np.ndarray] = None,
+    ef_search: Optional[int] = None,
+    nprobe: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Searches query vectors with one FAISS call; returns the (normalized) query vectors and the vector positions found per query, best first (-1 padded).
+
+    With a mask, only the selected vectors are searched: an ID selector is
+    passed to FAISS, so the filter is applied inside the search rather than to
+    its results. Approximate indexes may find fewer than k selected vectors
+    when the filter is very selective; those queries fall back to an exact
+    search over the selected vectors, so k results are returned whenever k
+    vectors match. ef_search / nprobe apply to this search only.
+    """
+    vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+    if getattr(index, "_normalize_L2", False):
+        faiss.normalize_L2(vectors)
+    vector_index = faiss.downcast_index(index.index)
+    if mask is None:
+        params = _search_params(vector_index, k, ef_search=ef_search, nprobe=nprobe)
+        _, ids = index.index.search(vectors, k, params=params) if params is not None else index.index.search(vectors, k)
+    else:
+        positions = np.flatnonzero(mask)
+        k = min(k, len(positions))
+        if not k:
+            return vectors, np.full((len(vectors), 0), -1, dtype=np.int64)
+        bitmap = np.packbits(mask, bitorder="little") # Must stay alive during the search
+        selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+        params = _search_params(vector_index, k, selector, ef_search, nprobe)
+        _, ids = index.index.search(vectors, k, params=params)
+        short = np.flatnonzero((ids == -1).any(axis=1))
+        if len(short):
+            ids[short] = _exact_search_subset(vector_index, vectors[short], positions, k)
+    return vectors, ids
+
+def _dense_search_ids(
+    index: FAISS,
+    query_vectors: Any,
+    k: int,
+    mask: Optional[np.ndarray] = None,
+    ef_search: Optional[int] = None,
+    nprobe: Optional[int] = None
+) -> List[List[str]]:
+    """Searches query vectors with one FAISS call; returns docstore IDs per query, best first (see _dense_search_positions)."""
+    _, ids = _dense_search_positions(index, query_vectors, k, mask, ef_search, nprobe)
+    # -1: fewer than k vectors in the index
+    return [[index.index_to_docstore_id[int(vector_id)] for vector_id in row if vector_id != -1] for row in ids]
+
+def maximal_marginal_relevance(
+    query_vector: np.ndarray,
+    candidate_vectors: np.ndarray,
+    k: int,
+    lambda_mult: float = MMR_LAMBDA
+) -> List[int]:
+    """Picks k candidates that are relevant to the query but not redundant with each other.
+
+    Greedily selects the candidate maximizing
+    lambda * sim(query, c) - (1 - lambda) * max(sim(c, selected)), with cosine
+    similarities. The candidate-candidate similarities are one matrix product,
+    and each step only updates a running maximum, so selection costs
+    O(n^2 * dim + k * n) NumPy work for n candidates.
+
+    Args:
+        query_vector: Array of shape (dim,).
+        candidate_vectors: Array of shape (n, dim).
+        k: Number of candidates to pick.
+        lambda_mult: 1 ranks by relevance only; 0 by diversity only.
+
+    Returns:
+        Indices into candidate_vectors, in selection order.
+    """
+    k = min(k, len(candidate_vectors))
+    if k <= 0:
+        return []
+    candidates = np.asarray(candidate_vectors, dtype=np.float32)
+    candidates = candidates / np.clip(np.linalg.norm(candidates, axis=1, keepdims=True), 1e-12, None)
+    query = np.asarray(query_vector, dtype=np.float32).ravel()
+    relevance = candidates @ (query / max(float(np.linalg.norm(query)), 1e-12))
+    similarity = candidates @ candidates.T
+    selected = [int(np.argmax(relevance))]
+    redundancy = similarity[selected[0]].copy() # Max similarity to the selected candidates
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return selected
+
+def _mmr_search_ids(
+    index: FAISS,
+    query_vectors: Any,
+    top_k: int,
+    fetch_k: Optional[int] = None,
+    lambda_mult: Optional[float] = None,
+    mask: Optional[np.ndarray] = None,
+    ef_search: Optional[int] = None,
+    nprobe: Optional[int] = None
+) -> List[List[str]]:
+    """Fetches fetch_k candidates per query by vector similarity and picks top_k of them with MMR.
+
+    Candidate vectors are read back from the FAISS index (reconstruct), so
+    nothing is embedded again.
+    """
+    fetch_k = MMR_FETCH_K if fetch_k is None else fetch_k
+    lambda_mult = MMR_LAMBDA if lambda_mult is None else lambda_mult
+    if not 0.0 <= lambda_mult <= 1.0:
+        raise ValueError(f"MMR lambda must be between 0 and 1, got {lambda_mult}.")
+    vectors, ids = _dense_search_positions(index, query_vectors, max(top_k, fetch_k), mask, ef_search, nprobe)
+    vector_index = faiss.downcast_index(index.index)
+    if isinstance(vector_index, faiss.IndexIVF):
+        vector_index.make_direct_map() # Needed to reconstruct IVF vectors (no-op once built)
+    ranked_ids = []
+    for query_vector, row in zip(vectors, ids):
+        positions = row[row != -1]
+        if not len(positions):
+            ranked_ids.append([])
+            continue
+        candidate_vectors = vector_index.reconstruct_batch(positions.astype(np.int64))
+        picked = maximal_marginal_relevance(query_vector, candidate_vectors, top_k, lambda_mult)
+        ranked_ids.append([index.index_to_docstore_id[int(positions[i])] for i in picked])
+    return ranked_ids
+
+def _documents_for_ids(index: FAISS, doc_ids: List[str]) -> List[Document]:
+    documents = []
+    for doc_id in doc_ids:
+        doc = index.docstore.search(doc_id)
+        if isinstance(doc, Document):
+            documents.append(doc)
+    return documents
+
+def _hybrid_search_ids(
+    query: str,
+    dense_ids: List[str],
+    lexical_index: BM25Index,
+    top_k: int,
+    candidates: int,
+    mask: Optional[np.ndarray] = None
+) -> List[str]:
+    """Fuses the dense ranking with the BM25 ranking of the same query (reciprocal rank fusion).
+
+    BM25 positions follow insertion order, like FAISS positions, so the
+    dense filter mask applies to both.
+    """
+    with stage_timer("search_lexical"):
+        lexical_ids = [doc_id for doc_id, _ in lexical_index.search(query, candidates, allowed=mask)]
+    return reciprocal_rank_fusion([dense_ids, lexical_ids], k=RRF_K, top_k=top_k)
+
+def _check_search_mode(mode: str) -> None:
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}'. Use one of: {', '.join(SEARCH_MODES)}.")
+
+@timed("search")
+def search_index(
+    query: str,
+    index: FAISS,
+    top_k: int = 3,
+    ef_search: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    query_vector: Optional[List[float]] = None,
+    mode: str = "dense",
+    sources: Optional[Sequence[str]] = None,
+    page_range: Optional[Tuple[int, int]] = None,
+    fetch_k: Optional[int] = None,
+    mmr_lambda: Optional[float] = None
+) -> List[Document]:
     """Performs a similarity search on the provided FAISS index.
 
+    In "hybrid" mode the HYBRID_CANDIDATES best chunks by vector similarity
+    and by BM25 (see get_lexical_index) are fused with reciprocal rank fusion,
+    so exact identifiers, part numbers and clause references are found even
+    when their embeddings are not close to the query's. In "mmr" mode the
+    fetch_k best chunks by vector similarity are narrowed down to top_k with
+    maximal marginal relevance, so overlapping neighbouring chunks do not
+    take all the slots.
+
+    Source and page filters restrict both searches to the matching chunks
+    inside FAISS and BM25 (not by filtering their results), so top_k results
+    are returned as long as top_k chunks match.
+
     Args:
         query: The query string.
         index: The in-memory FAISS index object.
         top_k: The number of top relevant documents to retrieve.
+        ef_search: HNSW candidate list size (higher = better recall, slower).
+            Ignored for other index types.
+        nprobe: IVF lists probed per query (higher = better recall, slower).
+            Ignored for other index types. Both knobs apply to this call
+            only; the (shared) index keeps its defaults.
+        query_vector: The query's embedding, if already computed; skips
+            embedding the query again.
+        mode: "dense" (vectors only), "hybrid" (vectors + BM25) or "mmr"
+            (vectors, diversified).
+        sources: Only search chunks from these files (metadata 'source').
+        page_range: Only search chunks on pages first..last (inclusive, metadata 'page').
+        fetch_k: MMR candidates per query; defaults to MMR_FETCH_K.
+        mmr_lambda: MMR relevance weight in [0, 1] (1 = no diversity); defaults to MMR_LAMBDA.
 
     Returns:
         A list of relevant Document objects, or an empty list on failure.
@@ -82,10 +1028,153 @@ def search_index(query: str, index: FAISS, top_k: int = 3) -> List[Document]:
         return []
 
     try:
-        logger.info(f"Performing similarity search with top_k={top_k} for query: '{query[:100]}...'")
-        results = index.similarity_search(query, k=top_k)
+        _check_search_mode(mode)
+        logger.info(f"Performing {mode} search with top_k={top_k} for query: '{query[:100]}...'")
+        mask = _filter_mask(index, sources, page_range)
+        lexical_index = get_lexical_index(index) if mode == "hybrid" else None
+        if mask is not None and not mask.any():
+            logger.info(f"No chunks match the search filters (sources={sources}, pages={page_range}).")
+            results = []
+        elif lexical_index is not None or mask is not None or mode == "mmr" or ef_search is not None or nprobe is not None:
+            if query_vector is None:
+                query_vector = embed_query(query, index.embedding_function)
+                if query_vector is None:
+                    raise RuntimeError("Failed to embed the query.")
+            if lexical_index is not None:
+                candidates = max(top_k, HYBRID_CANDIDATES)
+                dense_ids = _dense_search_ids(index, [query_vector], candidates, mask, ef_search, nprobe)[0]
+                doc_ids = _hybrid_search_ids(query, dense_ids, lexical_index, top_k, candidates, mask)
+            elif mode == "mmr":
+                doc_ids = _mmr_search_ids(index, [query_vector], top_k, fetch_k, mmr_lambda, mask, ef_search, nprobe)[0]
+            else:
+                doc_ids = _dense_search_ids(index, [query_vector], top_k, mask, ef_search, nprobe)[0]
+            results = _documents_for_ids(index, doc_ids)
+        elif query_vector is not None:
+            results = index.similarity_search_by_vector(query_vector, k=top_k)
+        else:
+            results = index.similarity_search(query, k=top_k)
         logger.info(f"Similarity search completed. Found {len(results)} results.")
         return results
     except Exception:
         logger.exception("Error during similarity search execution.")
-        return [] 
\ No newline at end of file
+        return [] 
+
+@timed("search_batch")
+def search_index_batch(
+    index: FAISS,
+    query_vectors: List[List[float]],
+    top_k: int = 3,
+    ef_search: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    queries: Optional[List[str]] = None,
+    mode: str = "dense",
+    sources: Optional[Sequence[str]] = None,
+    page_range: Optional[Tuple[int, int]] = None,
+    fetch_k: Optional[int] = None,
+    mmr_lambda: Optional[float] = None
+) -> List[List[Document]]:
+    """Searches many query vectors with a single FAISS call.
+
+    FAISS parallelizes a multi-row search internally, which is much faster than
+    one similarity_search per query for question sets.
+
+    Args:
+        index: The FAISS index object.
+        query_vectors: One embedding per query.
+        top_k: The number of documents retrieved per query.
+        ef_search: HNSW candidate list size (see search_index).
+        nprobe: IVF lists probed per query (see search_index).
+        queries: The query texts; required for "hybrid" mode.
+        mode: "dense", "hybrid" or "mmr" (see search_index).
+        sources: Source filter applied to every query (see search_index).
+        page_range: Page filter applied to every query (see search_index).
+        fetch_k: MMR candidates per query (see search_index).
+        mmr_lambda: MMR relevance weight (see search_index).
+
+    Returns:
+        The retrieved documents per query, in query order; empty lists on failure.
+    """
+    if not index:
+        logger.error("Cannot search: Invalid or null FAISS index provided.")
+        return [[] for _ in query_vectors]
+    if not len(query_vectors):
+        return []
+
+    try:
+        _check_search_mode(mode)
+        if mode == "hybrid" and (queries is None or len(queries) != len(query_vectors)):
+            raise ValueError("Hybrid search needs one query text per query vector.")
+        start_time = time.perf_counter()
+        mask = _filter_mask(index, sources, page_range)
+        lexical_index = get_lexical_index(index) if mode == "hybrid" else None
+        if lexical_index is not None:
+            candidates = max(top_k, HYBRID_CANDIDATES)
+            ranked_ids = [
+                _hybrid_search_ids(query, dense_ids, lexical_index, top_k, candidates, mask)
+                for query, dense_ids in zip(queries, _dense_search_ids(index, query_vectors, candidates, mask, ef_search, nprobe))
+            ]
+        elif mode == "mmr":
+            ranked_ids = _mmr_search_ids(index, query_vectors, top_k, fetch_k, mmr_lambda, mask, ef_search, nprobe)
+        else:
+            ranked_ids = _dense_search_ids(index, query_vectors, top_k, mask, ef_search, nprobe)
+        results = [_documents_for_ids(index, doc_ids) for doc_ids in ranked_ids]
+        logger.info(
+            f"Batch {mode} search for {len(results)} queries (top_k={top_k}) "
+            f"took {time.perf_counter() - start_time:.3f}s."
+        )
+        return results
+    except Exception:
+        logger.exception("Error during batch similarity search execution.")
+        return [[] for _ in query_vectors]
+
+def get_retrieval_executor() -> ThreadPoolExecutor:
+    """Returns the process-wide thread pool used by the async retrieval functions.
+
+    Embedding models and FAISS release the GIL while computing, so running
+    them on RETRIEVAL_MAX_WORKERS threads keeps the event loop responsive.
+    """
+    global _retrieval_executor
+    with _retrieval_executor_lock:
+        if _retrieval_executor is None:
+            _retrieval_executor = ThreadPoolExecutor(
+                max_workers=max(1, RETRIEVAL_MAX_WORKERS), thread_name_prefix="retrieval"
+            )
+        return _retrieval_executor
+
+def shutdown_retrieval_executor() -> None:
+    """Shuts down the retrieval thread pool; it is recreated on next use."""
+    global _retrieval_executor
+    with _retrieval_executor_lock:
+        if _retrieval_executor is not None:
+            _retrieval_executor.shutdown(wait=True)
+            _retrieval_executor = None
+
+async def _run_in_retrieval_executor(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_retrieval_executor(), functools.partial(func, *args, **kwargs))
+
+async def aembed_query(query: str, embeddings: Optional[Embeddings] = None) -> Optional[List[float]]:
+    """Async variant of embed_query; the model runs on the retrieval thread pool."""
+    return await _run_in_retrieval_executor(embed_query, query, embeddings)
+
+async def asearch_index(
+    query: str,
+    index: FAISS,
+    top_k: int = 3,
+    ef_search: Optional[int] = None,
+    nprobe: Optional[int] = None,
+    query_vector: Optional[List[float]] = None,
+    mode: str = "dense",
+    sources: Optional[Sequence[str]] = None,
+    page_range: Optional[Tuple[int, int]] = None,
+    fetch_k: Optional[int] = None,
+    mmr_lambda: Optional[float] = None
+) -> List[Document]:
+    """Async variant of search_index; embedding and search run on the retrieval thread pool.
+
+    Args and return value are those of search_index.
+    """
+    return await _run_in_retrieval_executor(
+        search_index, query, index, top_k=top_k, ef_search=ef_search, nprobe=nprobe, query_vector=query_vector,
+        mode=mode, sources=sources, page_range=page_range, fetch_k=fetch_k, mmr_lambda=mmr_lambda
+    )
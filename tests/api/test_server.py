@@ -0,0 +1,162 @@
+# tests/api/test_server.py
+
+import os
+import time
+import pytest
+
+from fastapi.testclient import TestClient
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from src.api import server
+from src.generation.answer_cache import SemanticAnswerCache
+from src.retrieval.index_registry import clear_index_registry, get_index_registry
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fixtures")
+
+@pytest.fixture
+def client(mocker, monkeypatch, tmp_path):
+    """API client with fake embeddings and LLM, no chunk cache and a temporary collections directory."""
+    monkeypatch.setenv("INDEX_COLLECTIONS_DIR", str(tmp_path))
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    fake = DeterministicFakeEmbedding(size=16)
+    for target in ("src.processing.ingest_pipeline", "src.retrieval.vector_store", "src.retrieval.index_collections", "src.api.server"):
+        mocker.patch(f"{target}.get_embedding_function", return_value=fake)
+    mocker.patch("src.processing.ingest_pipeline.get_chunk_cache", return_value=None)
+    mocker.patch("src.api.server.get_answer_cache", return_value=SemanticAnswerCache())
+    mocker.patch("src.api.server.warm_up_embedding_model")
+    llm_calls = []
+    def fake_llm(prompt_value):
+        llm_calls.append(prompt_value.to_string())
+        return AIMessage(content="Bay 3.")
+    mocker.patch("src.generation.answer_generator.ChatOpenAI", return_value=RunnableLambda(fake_llm))
+    clear_index_registry()
+    with TestClient(server.app) as test_client:
+        test_client.llm_calls = llm_calls
+        yield test_client
+    clear_index_registry()
+
+def upload(name="multipage.pdf"):
+    with open(os.path.join(FIXTURES_DIR, "multipage.pdf"), "rb") as f:
+        return ("files", (name, f.read(), "application/pdf"))
+
+def test_ingest_search_and_answer(client):
+    """Test a PDF can be ingested, searched and answered from over HTTP."""
+    response = client.post("/indexes/manuals/documents", files=[upload()])
+    assert response.status_code == 200
+    status = response.json()
+    assert status["added"] == ["multipage.pdf"] and status["vector_count"] > 0
+
+    assert client.get("/indexes/manuals").json()["sources"] == ["multipage.pdf"]
+
+    results = client.post("/indexes/manuals/search", json={"query": "PX-1003", "top_k": 2}).json()["results"]
+    assert len(results) == 2 and results[0]["source"] == "multipage.pdf"
+
+    first = client.post("/indexes/manuals/answer", json={"query": "Where is PX-1003?"}).json()
+    second = client.post("/indexes/manuals/answer", json={"query": "Where is PX-1003?"}).json()
+    assert first["answer"] == "Bay 3." and first["sources"] and not first["cached"]
+    assert second["cached"] and second["answer"] == "Bay 3."
+    assert len(client.llm_calls) == 1
+
+def test_ingest_skips_known_content_and_keeps_index_searchable(client):
+    """Test re-uploading the same bytes adds nothing and the previous index stays registered until swap."""
+    client.post("/indexes/manuals/documents", files=[upload()])
+    before = get_index_registry().get("manuals")
+
+    status = client.post("/indexes/manuals/documents", files=[upload("copy.pdf")]).json()
+
+    assert status["added"] == [] and status["skipped"] == ["copy.pdf"]
+    assert get_index_registry().get("manuals") is before
+
+def test_ingest_saves_collection_for_other_processes(client, tmp_path):
+    """Test save=true persists the index so a fresh registry loads it from disk."""
+    client.post("/indexes/manuals/documents", params={"save": "true"}, files=[upload()])
+    clear_index_registry()
+
+    assert client.get("/indexes").json()["indexes"] == [{"name": "manuals", "loaded": False}]
+    assert client.get("/indexes/manuals").json()["vector_count"] > 0
+
+def test_request_errors(client):
+    """Test invalid names, unknown indexes, empty queries and non-PDFs are rejected."""
+    assert client.get("/indexes/missing").status_code == 404
+    assert client.get("/indexes/..bad").status_code == 400
+    assert client.post("/indexes/manuals/documents", files=[("files", ("a.txt", b"text", "text/plain"))]).status_code == 415
+    client.post("/indexes/manuals/documents", files=[upload()])
+    assert client.post("/indexes/manuals/search", json={"query": "   "}).status_code == 422
+    assert client.post("/indexes/manuals/search", json={"query": "x", "top_k": 0}).status_code == 422
+
+def test_search_filters_by_source_and_page_range(client):
+    """Test search and answer requests only retrieve chunks from the requested files and pages."""
+    client.post("/indexes/manuals/documents", files=[upload()])
+
+    results = client.post("/indexes/manuals/search", json={"query": "PX-1003", "top_k": 5, "page_range": [1, 2]}).json()["results"]
+    assert results and all(1 <= result["page"] <= 2 for result in results)
+    assert client.post("/indexes/manuals/search", json={"query": "PX-1003", "sources": ["other.pdf"]}).json()["results"] == []
+    answer = client.post("/indexes/manuals/answer", json={"query": "Where is PX-1003?", "page_range": [4, 4]}).json()
+    assert answer["documents"] and all(document["page"] == 4 for document in answer["documents"])
+    assert client.post("/indexes/manuals/search", json={"query": "x", "page_range": [3, 1]}).status_code == 422
+
+def test_search_reranks_over_fetched_candidates(client, mocker):
+    """Test with reranking on, more candidates are retrieved and the cross-encoder picks the top_k."""
+    client.post("/indexes/manuals/documents", files=[upload()])
+    mocker.patch("src.retrieval.reranker.RERANK_ENABLED", True)
+    mocker.patch("src.retrieval.reranker.RERANK_CANDIDATES", 6)
+    scored = []
+    def predict(pairs, **kwargs):
+        scored.extend(pairs)
+        return [float(text.count("PX-1003")) for _, text in pairs]
+    mocker.patch("src.retrieval.reranker.get_cross_encoder", return_value=mocker.Mock(predict=predict))
+
+    # Keyword matches make sure the PX-1003 chunk is among the fake-embedding candidates
+    results = client.post("/indexes/manuals/search", json={"query": "PX-1003", "top_k": 1, "mode": "hybrid"}).json()["results"]
+
+    assert len(scored) > 1 and len(results) == 1
+    assert "PX-1003" in results[0]["content"]
+
+def test_request_timeout(client, mocker):
+    """Test a request exceeding its time limit returns 504."""
+    import asyncio
+    client.post("/indexes/manuals/documents", files=[upload()])
+    async def slow_search(*args, **kwargs):
+        await asyncio.sleep(1)
+    mocker.patch("src.api.server.asearch_index", side_effect=slow_search)
+    mocker.patch("src.api.server.API_REQUEST_TIMEOUT_SECONDS", 0.05)
+
+    assert client.post("/indexes/manuals/search", json={"query": "PX-1003"}).status_code == 504
+
+def test_ingest_timeout_leaves_index_unchanged(client, mocker):
+    """Test an ingest that times out stops on its worker instead of committing after the 504."""
+    import threading
+    from src.processing import ingest_pipeline
+    embed_documents = ingest_pipeline.embed_documents
+    def slow_embed(*args, **kwargs):
+        time.sleep(0.2)
+        return embed_documents(*args, **kwargs)
+    mocker.patch("src.processing.ingest_pipeline.embed_documents", side_effect=slow_embed)
+    mocker.patch("src.api.server.API_INGEST_TIMEOUT_SECONDS", 0.05)
+    ingest_files, results, finished = server.ingest_files, [], threading.Event()
+    def tracked_ingest(*args):
+        try:
+            results.append(ingest_files(*args))
+        finally:
+            finished.set()
+    mocker.patch("src.api.server.ingest_files", side_effect=tracked_ingest)
+
+    assert client.post("/indexes/manuals/documents", files=[upload()]).status_code == 504
+    assert finished.wait(10)
+    assert results == [None]
+    assert get_index_registry().get("manuals") is None
+
+def test_metrics_report_stage_latencies(client):
+    """Test the metrics endpoints expose stage latencies after an ingest and a search."""
+    client.post("/indexes/manuals/documents", files=[upload()])
+    client.post("/indexes/manuals/search", json={"query": "PX-1003"})
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'rag_stage_duration_seconds_count{stage="search"}' in response.text
+
+    stages = {series["labels"]["stage"] for series in client.get("/metrics.json").json()["histograms"]["stage_duration_seconds"]}
+    assert {"extract_window", "embed", "search"} <= stages
@@ -0,0 +1,76 @@
+# tests/config/test_metrics.py
+
+import asyncio
+import pytest
+
+from src.config import metrics
+from src.config.metrics import MetricsRegistry, stage_timer, timed
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.get_metrics().reset()
+    yield
+    metrics.get_metrics().reset()
+
+def stage_series(stage):
+    series = metrics.get_metrics().snapshot()["histograms"]["stage_duration_seconds"]
+    return next(s for s in series if s["labels"] == {"stage": stage})
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    """Test p50/p95 estimates fall in the bucket that holds them."""
+    registry = MetricsRegistry(buckets=(0.1, 1.0, 10.0))
+    for value in [0.05] * 90 + [5.0] * 10:
+        registry.observe("stage_duration_seconds", value, stage="search")
+    series = registry.snapshot()["histograms"]["stage_duration_seconds"][0]
+    assert series["count"] == 100
+    assert series["p50"] <= 0.1
+    assert 1.0 < series["p95"] <= 10.0
+    assert series["buckets"] == {"0.1": 90, "1.0": 0, "10.0": 10, "+Inf": 0}
+
+def test_prometheus_text_has_cumulative_buckets_and_counters():
+    """Test the Prometheus output lists cumulative buckets, sum, count and counters."""
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.observe("stage_duration_seconds", 0.05, stage="embed")
+    registry.observe("stage_duration_seconds", 0.5, stage="embed")
+    registry.increment("answer_cache_lookups_total", result="hit")
+    text = registry.prometheus_text()
+    assert "# TYPE rag_stage_duration_seconds histogram" in text
+    assert 'rag_stage_duration_seconds_bucket{stage="embed",le="0.1"} 1' in text
+    assert 'rag_stage_duration_seconds_bucket{stage="embed",le="1.0"} 2' in text
+    assert 'rag_stage_duration_seconds_bucket{stage="embed",le="+Inf"} 2' in text
+    assert 'rag_stage_duration_seconds_count{stage="embed"} 2' in text
+    assert 'rag_answer_cache_lookups_total{result="hit"} 1' in text
+
+def test_stage_timer_records_duration_and_counts_errors():
+    """Test a failing stage is timed, counted as an error and re-raised."""
+    with pytest.raises(ValueError):
+        with stage_timer("extract"):
+            raise ValueError("broken page")
+    assert stage_series("extract")["count"] == 1
+    errors = metrics.get_metrics().snapshot()["counters"]["stage_errors_total"]
+    assert errors == [{"labels": {"stage": "extract"}, "value": 1}]
+
+def test_timed_decorates_sync_and_async_functions():
+    """Test the decorator times both plain and coroutine functions."""
+    @timed("context_build")
+    def build():
+        return "context"
+
+    @timed("generate_answer")
+    async def generate():
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    assert build() == "context"
+    assert asyncio.run(generate()) == "answer"
+    assert stage_series("context_build")["count"] == 1
+    assert stage_series("generate_answer")["sum"] >= 0.01
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    """Test METRICS_ENABLED=false turns observations into no-ops."""
+    monkeypatch.setattr(metrics, "METRICS_ENABLED", False)
+    with stage_timer("search"):
+        pass
+    metrics.count("items_total", 3, kind="chunks_embedded")
+    assert metrics.get_metrics().snapshot()["histograms"] == {}
+    assert metrics.get_metrics().snapshot()["counters"] == {}
@@ -0,0 +1,21 @@
+# tests/conftest.py
+
+import pytest
+
+from src.generation.answer_generator import clear_llm_registry
+from src.retrieval.index_registry import clear_index_registry
+from src.retrieval.reranker import clear_reranker_registry
+from src.retrieval.vector_store import clear_embedding_model_registry
+
+@pytest.fixture(autouse=True)
+def reset_shared_registries():
+    """Process-wide model registries must not leak (mocked) models between tests."""
+    clear_embedding_model_registry()
+    clear_llm_registry()
+    clear_index_registry()
+    clear_reranker_registry()
+    yield
+    clear_embedding_model_registry()
+    clear_llm_registry()
+    clear_index_registry()
+    clear_reranker_registry()
@@ -0,0 +1,58 @@
+# tests/generation/test_answer_cache.py
+
+import pytest
+
+from src.generation import answer_cache
+from src.generation.answer_cache import SemanticAnswerCache, document_set_fingerprint
+
+RESULT = {"answer": "RAG combines retrieval and generation.", "sources": ["Source: doc1.pdf, Page 1"]}
+
+@pytest.fixture
+def cache():
+    return SemanticAnswerCache(threshold=0.9, ttl_seconds=60, max_entries=2)
+
+def test_document_set_fingerprint_ignores_order():
+    """Test the fingerprint depends on file contents and settings, not their order."""
+    assert document_set_fingerprint(["a", "b"], "model", 3) == document_set_fingerprint(["b", "a"], "model", 3)
+    assert document_set_fingerprint(["a", "b"], "model", 3) != document_set_fingerprint(["a", "b"], "model", 5)
+    assert document_set_fingerprint(["a"], "model", 3) != document_set_fingerprint(["a", "b"], "model", 3)
+
+def test_similar_query_hits_and_dissimilar_misses(cache):
+    """Test a paraphrase above the threshold gets the cached answer; others miss."""
+    cache.put("docs", "What is RAG?", [1.0, 0.0, 0.0], RESULT, documents=["chunk"])
+
+    hit = cache.get("docs", [0.95, 0.1, 0.0]) # cosine ~0.99
+    assert hit["result"] == RESULT
+    assert hit["documents"] == ["chunk"]
+    assert hit["query"] == "What is RAG?"
+    assert cache.get("docs", [0.5, 0.8, 0.0]) is None # cosine ~0.53
+    assert cache.get("other-docs", [1.0, 0.0, 0.0]) is None # Different document set
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+def test_entries_expire_after_ttl(cache, mocker):
+    """Test entries older than the TTL are no longer served."""
+    clock = mocker.patch.object(answer_cache.time, "time", return_value=1000.0)
+    cache.put("docs", "What is RAG?", [1.0, 0.0], RESULT)
+    clock.return_value = 1061.0
+    assert cache.get("docs", [1.0, 0.0]) is None
+    assert cache.stats()["expirations"] == 1
+
+def test_least_recently_used_entry_is_evicted(cache):
+    """Test the size cap evicts the least recently used entry."""
+    cache.put("docs", "q1", [1.0, 0.0, 0.0], {"answer": "a1", "sources": []})
+    cache.put("docs", "q2", [0.0, 1.0, 0.0], {"answer": "a2", "sources": []})
+    cache.get("docs", [1.0, 0.0, 0.0]) # q1 becomes most recently used
+    cache.put("docs", "q3", [0.0, 0.0, 1.0], {"answer": "a3", "sources": []})
+
+    assert cache.get("docs", [0.0, 1.0, 0.0]) is None
+    assert cache.get("docs", [1.0, 0.0, 0.0])["result"]["answer"] == "a1"
+    assert cache.stats()["evictions"] == 1
+
+def test_cached_result_is_a_copy(cache):
+    """Test callers cannot modify the cached answer through a returned entry."""
+    cache.put("docs", "q", [1.0], dict(RESULT))
+    cache.get("docs", [1.0])["result"]["answer"] = "changed"
+    assert cache.get("docs", [1.0])["result"]["answer"] == RESULT["answer"]
@@ -7,6 +7,7 @@ from langchain_core.messages import AIMessage
 import os # For basename
 
 # Import the function to test
+from src.generation import answer_generator
 from src.generation.answer_generator import generate_answer, format_docs
 
 
@@ -178,4 +179,220 @@ def test_generate_answer_source_no_page(mock_create_chain, mock_retriever):
     assert "Source: doc3.pdf" in result["sources"] # Check formatting without page
 
     mock_create_chain.assert_called_once()
-    mock_chain_instance.invoke.assert_called_once_with(query) 
\ No newline at end of file
+    mock_chain_instance.invoke.assert_called_once_with(query) 
+# --- Test generate_answer with pre-retrieved documents ---
+
+def test_generate_answer_with_documents_skips_retrieval(mocker, monkeypatch):
+    """Test the LLM answers from exactly the given documents without retrieving again."""
+    from langchain_core.runnables import RunnableLambda
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    prompts = []
+    def fake_llm(prompt_value):
+        prompts.append(prompt_value.to_string())
+        return AIMessage(content="RAG uses LangChain tools.")
+    mocker.patch("src.generation.answer_generator.ChatOpenAI", return_value=RunnableLambda(fake_llm))
+    mock_create_chain = mocker.patch("src.generation.answer_generator.create_rag_chain")
+    retriever = MagicMock()
+
+    result = generate_answer("What is RAG?", retriever, documents=[MOCK_DOC_1, MOCK_DOC_NO_PAGE])
+
+    assert result == {
+        "answer": "RAG uses LangChain tools.",
+        "sources": ["Source: doc1.pdf, Page 1", "Source: doc3.pdf"],
+        "tokens_saved": 0,
+    }
+    mock_create_chain.assert_not_called()
+    retriever.invoke.assert_not_called()
+    assert len(prompts) == 1
+    assert MOCK_DOC_1.page_content in prompts[0] and MOCK_DOC_NO_PAGE.page_content in prompts[0]
+    assert MOCK_DOC_2.page_content not in prompts[0]
+
+def test_sources_only_cite_passages_in_the_context(mocker, monkeypatch):
+    """Test chunks dropped by the token budget are not cited, and the saved tokens are reported."""
+    from langchain_core.runnables import RunnableLambda
+    from src.generation.answer_generator import stream_answer
+    from src.generation.context_builder import count_tokens
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    mocker.patch("src.generation.context_builder.CONTEXT_TOKEN_BUDGET", count_tokens(MOCK_DOC_1.page_content))
+    prompts = []
+    def fake_llm(prompt_value):
+        prompts.append(prompt_value.to_string())
+        return AIMessage(content="RAG uses LangChain tools.")
+    mocker.patch("src.generation.answer_generator.ChatOpenAI", return_value=RunnableLambda(fake_llm))
+    build = mocker.spy(answer_generator, "build_context")
+
+    result = generate_answer("What is RAG?", documents=[MOCK_DOC_1, MOCK_DOC_2])
+    streamed = stream_answer("What is RAG?", documents=[MOCK_DOC_1, MOCK_DOC_2])
+    "".join(streamed["tokens"])
+
+    assert result["sources"] == streamed["sources"] == ["Source: doc1.pdf, Page 1"]
+    assert result["tokens_saved"] == streamed["tokens_saved"] > 0
+    assert all(MOCK_DOC_2.page_content not in prompt for prompt in prompts)
+    assert build.call_count == 2 # Once per answer, shared by the prompt and the sources
+
+def test_generate_answer_needs_retriever_or_documents(monkeypatch):
+    """Test calling without a retriever or documents reports an error answer."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    result = generate_answer("What is RAG?")
+    assert result["sources"] == []
+    assert "error" in result["answer"]
+
+# --- Test stream_answer ---
+
+def test_stream_answer_sources_before_tokens(mocker, monkeypatch, caplog):
+    """Test sources are available before any token and the tokens form the full answer."""
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from src.generation.answer_generator import stream_answer
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content="RAG uses LangChain tools.")]))
+    mock_chat_cls = mocker.patch("src.generation.answer_generator.ChatOpenAI", return_value=llm)
+    retriever = MagicMock()
+    retriever.invoke.return_value = [MOCK_DOC_1, MOCK_DOC_2]
+
+    result = stream_answer("What is RAG?", retriever)
+
+    retriever.invoke.assert_called_once_with("What is RAG?")
+    assert result["sources"] == ["Source: doc1.pdf, Page 1", "Source: doc2.pdf, Page 5"]
+    assert result["documents"] == [MOCK_DOC_1, MOCK_DOC_2]
+    mock_chat_cls.assert_called_once()
+    with caplog.at_level("INFO", logger="src.generation.answer_generator"):
+        tokens = list(result["tokens"])
+    assert len(tokens) > 1 # Streamed in pieces
+    assert "".join(tokens) == "RAG uses LangChain tools."
+    assert any("Time to first token" in message for message in caplog.messages)
+
+def test_stream_answer_llm_error_yields_error_message(mocker, monkeypatch):
+    """Test an LLM failure during streaming ends the stream with the error answer."""
+    from src.generation.answer_generator import GENERATION_ERROR_ANSWER, stream_answer
+    from langchain_core.runnables import RunnableLambda
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    def failing_llm(_):
+        raise RuntimeError("connection reset")
+    mocker.patch("src.generation.answer_generator.ChatOpenAI", return_value=RunnableLambda(failing_llm))
+
+    result = stream_answer("What is RAG?", documents=[MOCK_DOC_1])
+
+    assert result["sources"] == ["Source: doc1.pdf, Page 1"]
+    assert list(result["tokens"]) == [GENERATION_ERROR_ANSWER]
+
+def test_stream_answer_missing_api_key(monkeypatch):
+    """Test a missing API key returns no sources and the error answer."""
+    from src.generation.answer_generator import GENERATION_ERROR_ANSWER, stream_answer
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    result = stream_answer("What is RAG?", documents=[MOCK_DOC_1])
+    assert result["sources"] == []
+    assert list(result["tokens"]) == [GENERATION_ERROR_ANSWER]
+
+# --- Test the shared LLM client registry ---
+
+def test_llm_client_is_shared_across_calls(mocker, monkeypatch):
+    """Test repeated questions reuse one LLM client and compiled chain."""
+    from langchain_core.runnables import RunnableLambda
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    mock_chat_cls = mocker.patch(
+        "src.generation.answer_generator.ChatOpenAI",
+        return_value=RunnableLambda(lambda _: AIMessage(content="answer")),
+    )
+
+    for _ in range(3):
+        assert generate_answer("What is RAG?", documents=[MOCK_DOC_1])["answer"] == "answer"
+
+    mock_chat_cls.assert_called_once()
+    kwargs = mock_chat_cls.call_args.kwargs
+    assert kwargs["api_key"] == "test-key"
+    assert kwargs["http_client"] is not None # Pooled keep-alive transport
+    assert kwargs["timeout"] is not None
+
+def test_llm_client_pools_sync_and_async_connections(mocker, monkeypatch):
+    """Test both the sync and the async HTTP transports are pooled, so async callers share the pool too."""
+    import httpx
+    from src.generation.answer_generator import get_llm
+    mock_chat_cls = mocker.patch("src.generation.answer_generator.ChatOpenAI")
+
+    get_llm("test-key")
+
+    kwargs = mock_chat_cls.call_args.kwargs
+    assert isinstance(kwargs["http_client"], httpx.Client)
+    assert isinstance(kwargs["http_async_client"], httpx.AsyncClient)
+
+def test_generate_answer_against_standin_server(monkeypatch):
+    """Test the real ChatOpenAI client talks to an OpenAI-compatible server at OPENAI_BASE_URL."""
+    from openai_standin_server import start_server
+    from src.generation.answer_generator import stream_answer
+    server = start_server()
+    try:
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+
+        result = generate_answer("What is RAG?", documents=[MOCK_DOC_1])
+        streamed = "".join(stream_answer("What is RAG?", documents=[MOCK_DOC_1])["tokens"])
+
+        assert result["answer"].startswith("Stand-in answer")
+        assert result["sources"] == ["Source: doc1.pdf, Page 1"]
+        assert streamed == result["answer"]
+    finally:
+        server.shutdown()
+
+# --- Test the async API ---
+
+def test_agenerate_answer_with_documents(mocker, monkeypatch):
+    """Test the async variant answers from the given documents via the chain's ainvoke."""
+    import asyncio
+    from langchain_core.runnables import RunnableLambda
+    from src.generation.answer_generator import agenerate_answer
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    async def fake_llm(prompt_value):
+        await asyncio.sleep(0)
+        return AIMessage(content="RAG uses LangChain tools.")
+    mocker.patch("src.generation.answer_generator.ChatOpenAI", return_value=RunnableLambda(fake_llm))
+
+    result = asyncio.run(agenerate_answer("What is RAG?", documents=[MOCK_DOC_1]))
+
+    assert result == {"answer": "RAG uses LangChain tools.", "sources": ["Source: doc1.pdf, Page 1"], "tokens_saved": 0}
+
+def test_agenerate_answers_bounds_concurrency(mocker, monkeypatch):
+    """Test many questions are answered in order with at most max_concurrency in flight."""
+    import asyncio
+    from langchain_core.runnables import RunnableLambda
+    from src.generation.answer_generator import GENERATION_ERROR_ANSWER, agenerate_answers
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    in_flight = {"now": 0, "max": 0}
+    async def fake_llm(prompt_value):
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(0.01)
+        in_flight["now"] -= 1
+        question = prompt_value.to_string().split("QUESTION:")[1].split("\n")[1]
+        if question == "q3":
+            raise RuntimeError("rate limited")
+        return AIMessage(content=f"answer to {question}")
+    mocker.patch("src.generation.answer_generator.ChatOpenAI", return_value=RunnableLambda(fake_llm))
+    async def fake_search(query, index, top_k=3, **kwargs):
+        return [MOCK_DOC_1]
+    mock_search = mocker.patch("src.generation.answer_generator.asearch_index", side_effect=fake_search)
+    queries = [f"q{i}" for i in range(6)]
+
+    results = asyncio.run(agenerate_answers(queries, MagicMock(), top_k=2, max_concurrency=2))
+
+    assert [r["answer"] for r in results] == [
+        "answer to q0", "answer to q1", "answer to q2", GENERATION_ERROR_ANSWER, "answer to q4", "answer to q5"
+    ]
+    assert results[0]["sources"] == ["Source: doc1.pdf, Page 1"]
+    assert in_flight["max"] == 2
+    assert mock_search.call_count == 6
+
+def test_agenerate_answer_against_standin_server(monkeypatch):
+    """Test the async path works with the real ChatOpenAI client."""
+    import asyncio
+    from openai_standin_server import start_server
+    from src.generation.answer_generator import agenerate_answer
+    server = start_server()
+    try:
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+
+        result = asyncio.run(agenerate_answer("What is RAG?", documents=[MOCK_DOC_1]))
+
+        assert result["answer"].startswith("Stand-in answer")
+    finally:
+        server.shutdown()
@@ -0,0 +1,102 @@
+# tests/generation/test_batch_answers.py
+
+import asyncio
+import json
+import time
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from src.config.metrics import get_metrics
+from src.generation.answer_generator import GENERATION_ERROR_ANSWER
+from src.generation.batch_answers import RateLimiter, load_questions, retrieve_batch, run_batch, write_results_jsonl
+from src.retrieval.vector_store import add_embeddings_to_index, get_embedding_throughput, search_index, search_index_batch
+
+@pytest.fixture
+def embeddings(mocker):
+    fake = DeterministicFakeEmbedding(size=16)
+    mocker.patch("src.generation.batch_answers.get_embedding_function", return_value=fake)
+    return fake
+
+@pytest.fixture
+def index(embeddings):
+    docs = [
+        Document(page_content=f"Part PX-{1000 + i} is stored in bay {i}.", metadata={"source": "parts.pdf", "page": i})
+        for i in range(6)
+    ]
+    return add_embeddings_to_index(docs, embeddings.embed_documents([d.page_content for d in docs]), embeddings)
+
+def test_search_index_batch_matches_single_searches(index, embeddings):
+    """Test one multi-query FAISS search returns what per-query searches return."""
+    queries = ["Part PX-1002 is stored in bay 2.", "Part PX-1005 is stored in bay 5.", "unrelated"]
+
+    results = search_index_batch(index, embeddings.embed_documents(queries), top_k=2)
+
+    assert results == [search_index(query, index, top_k=2) for query in queries]
+    assert results[0][0].metadata["page"] == 2
+
+def test_search_index_batch_more_results_than_vectors(index, embeddings):
+    """Test asking for more results than vectors returns only the existing ones."""
+    results = search_index_batch(index, embeddings.embed_documents(["q"]), top_k=10)
+    assert len(results[0]) == 6
+
+def test_retrieve_batch_keeps_questions_out_of_chunk_embedding(index, mocker):
+    """Test questions bypass embed_texts, so the chunk embedding cache and throughput stats are untouched."""
+    spy = mocker.patch("src.retrieval.vector_store.get_embedding_cache")
+    chunks_before = get_embedding_throughput()["chunks"]
+
+    documents, _ = retrieve_batch(["Part PX-1002 is stored in bay 2."], index, top_k=1)
+
+    assert documents[0][0].metadata["page"] == 2
+    spy.assert_not_called()
+    assert get_embedding_throughput()["chunks"] == chunks_before
+    assert 'kind="queries_embedded"' in get_metrics().prometheus_text()
+
+def test_run_batch_answers_in_order(index, mocker, monkeypatch):
+    """Test each question is answered from its own retrieved chunks, with latency recorded."""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    def fake_llm(prompt_value):
+        prompt = prompt_value.to_string()
+        if "bay 4" in prompt.split("QUESTION:")[1]:
+            raise RuntimeError("rate limited")
+        return AIMessage(content=prompt.split("CONTEXT:")[1].strip().split(".")[0])
+    mocker.patch("src.generation.answer_generator.ChatOpenAI", return_value=RunnableLambda(fake_llm))
+    questions = [f"Part PX-{1000 + i} is stored in bay {i}." for i in (3, 1, 4)]
+
+    results = run_batch(questions, index, top_k=1, max_concurrency=2)
+
+    assert [r["question"] for r in results] == questions
+    assert [r["answer"] for r in results] == ["Part PX-1003 is stored in bay 3", "Part PX-1001 is stored in bay 1", GENERATION_ERROR_ANSWER]
+    assert [r["error"] for r in results] == [False, False, True]
+    assert results[0]["sources"] == ["Source: parts.pdf, Page 3"]
+    assert all(r["latency_seconds"] >= 0 and r["wait_seconds"] >= 0 for r in results)
+
+def test_rate_limiter_spaces_requests():
+    """Test the limiter starts at most requests_per_minute requests per minute."""
+    async def start_times():
+        limiter = RateLimiter(requests_per_minute=1200) # One every 50 ms
+        starts = []
+        async def request():
+            await limiter.acquire()
+            starts.append(time.monotonic())
+        await asyncio.gather(*(request() for _ in range(4)))
+        return starts
+
+    starts = asyncio.run(start_times())
+
+    assert starts[-1] - starts[0] >= 0.14
+    assert asyncio.run(asyncio.wait_for(RateLimiter(None).acquire(), 0.1)) is None
+
+def test_questions_and_results_files(tmp_path):
+    """Test questions load from text or JSONL and results are written as JSONL."""
+    (tmp_path / "questions.txt").write_text("First?\n\n Second? \n")
+    (tmp_path / "questions.jsonl").write_text('{"question": "First?"}\n{"question": "Second?", "id": 2}\n')
+    results = [{"question": "First?", "answer": "Yes.", "sources": [], "latency_seconds": 0.1, "wait_seconds": 0.0, "error": False}]
+
+    assert load_questions(str(tmp_path / "questions.txt")) == ["First?", "Second?"]
+    assert load_questions(str(tmp_path / "questions.jsonl")) == ["First?", "Second?"]
+    assert write_results_jsonl(results, str(tmp_path / "out" / "results.jsonl"))
+    assert [json.loads(line) for line in (tmp_path / "out" / "results.jsonl").read_text().splitlines()] == results
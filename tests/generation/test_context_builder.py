@@ -0,0 +1,82 @@
+# tests/generation/test_context_builder.py
+
+import pytest
+from langchain_core.documents import Document
+
+from src.generation import context_builder
+from src.generation.context_builder import build_context, merge_chunks
+from src.processing.pdf_processor import split_documents
+
+class WordEncoding:
+    """Deterministic stand-in for a tiktoken encoding: one token per word."""
+    def encode(self, text):
+        return text.split()
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+@pytest.fixture(autouse=True)
+def word_tokenizer(mocker):
+    mocker.patch.object(context_builder, "_get_encoding", return_value=WordEncoding())
+
+def page(text, page_number=0, source="manual.pdf"):
+    return Document(page_content=text, metadata={"source": source, "page": page_number})
+
+def test_merge_chunks_by_start_index_restores_page_text():
+    """Test neighbouring chunks from the splitter merge back into the original text."""
+    text = " ".join(f"Part PX-{1000 + i} is stored in bay {i}." for i in range(150))
+    chunks = split_documents([page(text)])
+    assert len(chunks) > 2
+
+    merged = merge_chunks([chunks[1], chunks[0], chunks[2]]) # Retrieval order
+
+    assert len(merged) == 1
+    assert merged[0].page_content == text[:chunks[2].metadata["start_index"] + len(chunks[2].page_content)]
+    assert merged[0].metadata["merged_chunks"] == 3
+
+def test_merge_chunks_keeps_separate_passages_and_rank_order():
+    """Test chunks with a gap, or from other pages, are not merged and keep relevance order."""
+    a = Document(page_content="alpha " * 10, metadata={"source": "m.pdf", "page": 0, "start_index": 0})
+    far = Document(page_content="omega " * 10, metadata={"source": "m.pdf", "page": 0, "start_index": 5000})
+    other_page = Document(page_content="alpha " * 10, metadata={"source": "m.pdf", "page": 1, "start_index": 0})
+
+    assert merge_chunks([far, other_page, a]) == [far, other_page, a]
+
+def test_merge_chunks_without_offsets_uses_text_overlap():
+    """Test chunks without start_index merge when one's tail repeats the other's head."""
+    first = page("The torque for part PX-1001 is 40 Nm. Use the calibrated wrench.")
+    second = page("Use the calibrated wrench. Replace the washer after removal.")
+
+    merged = merge_chunks([second, first])
+
+    assert [doc.page_content for doc in merged] == [
+        "The torque for part PX-1001 is 40 Nm. Use the calibrated wrench. Replace the washer after removal."
+    ]
+
+def test_build_context_reports_tokens_saved():
+    """Test packing overlapping chunks saves the duplicated tokens."""
+    text = " ".join(f"word{i}" for i in range(600))
+    chunks = split_documents([page(text)])
+
+    result = build_context(chunks, token_budget=10_000)
+
+    assert result["context"] == text
+    assert result["tokens_used"] == 600
+    assert result["tokens_naive"] > result["tokens_used"]
+    assert result["tokens_saved"] == result["tokens_naive"] - result["tokens_used"]
+    assert result["dropped"] == 0
+
+def test_build_context_respects_budget():
+    """Test passages beyond the budget are truncated or dropped, most relevant first."""
+    docs = [page("a " * 80, 0), page("b " * 80, 1), page("c " * 80, 2)]
+
+    result = build_context(docs, token_budget=140)
+
+    assert result["tokens_used"] <= 140
+    assert [doc.page_content.split()[0] for doc in result["documents"]] == ["a", "b"]
+    assert result["documents"][1].metadata["truncated"] is True
+    assert result["dropped"] == 1
+
+def test_count_tokens_without_tokenizer(mocker):
+    """Test token counting falls back to a character estimate when no tokenizer loads."""
+    mocker.patch.object(context_builder, "_get_encoding", return_value=None)
+    assert context_builder.count_tokens("x" * 40) == 10
@@ -0,0 +1,87 @@
+# tests/processing/test_chunk_cache.py
+
+import builtins
+import os
+import time
+import numpy as np
+from langchain_core.documents import Document
+
+from src.processing.chunk_cache import ChunkCache
+
+CHUNKS = [
+    Document(page_content="first chunk", metadata={"source": "a.pdf", "page": 0}),
+    Document(page_content="second chunk", metadata={"source": "a.pdf", "page": 1}),
+]
+VECTORS = [[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]]
+
+def test_chunk_cache_round_trip(tmp_path):
+    """Test stored chunks and vectors are returned unchanged."""
+    cache = ChunkCache(str(tmp_path))
+    key = ChunkCache.make_key("abc", "model")
+    assert cache.get(key) is None
+
+    cache.put(key, CHUNKS, VECTORS)
+    chunks, vectors = cache.get(key)
+
+    assert [c.page_content for c in chunks] == ["first chunk", "second chunk"]
+    assert chunks[1].metadata == {"source": "a.pdf", "page": 1}
+    assert vectors.dtype == np.float32
+    np.testing.assert_allclose(vectors, VECTORS, rtol=1e-6)
+
+def test_chunk_cache_entry_written_in_windows(tmp_path):
+    """Test an entry appended window by window reads back whole, and a discarded one leaves no files."""
+    cache = ChunkCache(str(tmp_path))
+    writer = cache.open_entry("windowed")
+    writer.append(CHUNKS[:1], VECTORS[:1])
+    writer.append(CHUNKS[1:], VECTORS[1:])
+    assert cache.get("windowed") is None # Not visible until committed
+    writer.commit()
+
+    chunks, vectors = cache.get("windowed")
+    assert [c.page_content for c in chunks] == ["first chunk", "second chunk"]
+    np.testing.assert_allclose(vectors, VECTORS, rtol=1e-6)
+
+    abandoned = cache.open_entry("abandoned")
+    abandoned.append(CHUNKS, VECTORS)
+    abandoned.discard()
+    assert cache.get("abandoned") is None
+    assert sorted(os.listdir(tmp_path)) == ["windowed.npz"]
+
+def test_chunk_cache_key_depends_on_settings():
+    """Test the key changes with file content and embedding model."""
+    assert ChunkCache.make_key("abc", "model") == ChunkCache.make_key("abc", "model")
+    assert ChunkCache.make_key("abc", "model") != ChunkCache.make_key("abd", "model")
+    assert ChunkCache.make_key("abc", "model") != ChunkCache.make_key("abc", "other-model")
+
+def test_chunk_cache_evicts_least_recently_used(tmp_path):
+    """Test the size cap evicts the entry that was used longest ago."""
+    cache = ChunkCache(str(tmp_path))
+    cache.put("old", CHUNKS, VECTORS)
+    cache.put("recent", CHUNKS, VECTORS)
+    entry_size = os.path.getsize(tmp_path / "old.npz")
+
+    # Make 'old' the least recently used, then touch 'recent' via a hit
+    past = time.time() - 100
+    os.utime(tmp_path / "old.npz", (past, past))
+    os.utime(tmp_path / "recent.npz", (past + 1, past + 1))
+    assert cache.get("recent") is not None
+
+    cache.max_bytes = entry_size * 2
+    cache.put("new", CHUNKS, VECTORS)
+
+    assert cache.get("old") is None
+    assert cache.get("recent") is not None
+    assert cache.get("new") is not None
+
+def test_chunk_cache_entry_cleans_up_when_it_cannot_start(tmp_path, mocker):
+    """Test a writer that fails to open its second temp file leaves nothing behind."""
+    cache = ChunkCache(str(tmp_path))
+    real_open = builtins.open
+    def failing_open(path, *args, **kwargs):
+        if str(path).endswith(".vectors.tmp"):
+            raise OSError("disk full")
+        return real_open(path, *args, **kwargs)
+    mocker.patch("builtins.open", side_effect=failing_open)
+
+    assert cache.open_entry("key") is None
+    assert os.listdir(tmp_path) == []
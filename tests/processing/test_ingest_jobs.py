@@ -0,0 +1,150 @@
+# tests/processing/test_ingest_jobs.py
+
+import io
+import os
+import threading
+import time
+import pytest
+from functools import partial
+
+from langchain_core.embeddings import DeterministicFakeEmbedding, Embeddings
+
+from src.processing.ingest_jobs import CANCELLED, COMPLETED, FAILED, QUEUED, RUNNING, IngestJobManager
+from src.processing import ingest_pipeline
+from src.retrieval.vector_store import copy_index
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fixtures")
+
+class GatedEmbedding(Embeddings):
+    """Fake embeddings that block each batch until the test releases it."""
+    def __init__(self, gate):
+        self.gate = gate
+        self.fake = DeterministicFakeEmbedding(size=16)
+    def embed_documents(self, texts):
+        self.gate.wait(5)
+        return self.fake.embed_documents(texts)
+    def embed_query(self, text):
+        return self.fake.embed_query(text)
+
+@pytest.fixture
+def pdf():
+    with open(os.path.join(FIXTURES_DIR, "multipage.pdf"), "rb") as f:
+        upload = io.BytesIO(f.read())
+    upload.name = "multipage.pdf"
+    return upload
+
+@pytest.fixture
+def gate(mocker):
+    event = threading.Event()
+    embeddings = GatedEmbedding(event)
+    mocker.patch("src.processing.ingest_pipeline.get_embedding_function", return_value=embeddings)
+    mocker.patch("src.processing.ingest_pipeline.get_chunk_cache", return_value=None)
+    return event
+
+@pytest.fixture
+def manager():
+    manager = IngestJobManager(max_workers=1, max_pending=3)
+    yield manager
+    manager.shutdown()
+
+def wait_for(manager, job_id, statuses, timeout=10):
+    deadline = time.time() + timeout
+    while manager.get(job_id)["status"] not in statuses:
+        assert time.time() < deadline, manager.get(job_id)
+        time.sleep(0.01)
+    return manager.get(job_id)
+
+def test_job_completes_with_progress_and_index(manager, gate, pdf):
+    """Test a job reports page and chunk progress and hands over its index when done."""
+    gate.set()
+    job_id = manager.submit([pdf], description="manual")
+
+    job = wait_for(manager, job_id, [COMPLETED])
+
+    assert job["pages_extracted"] == job["pages_total"] == 6
+    assert job["chunks_indexed"] > 0 and job["stage"] == COMPLETED
+    assert job["files"] == ["multipage.pdf"] and job["description"] == "manual"
+    index = manager.result(job_id)
+    assert index.index.ntotal == job["chunks_indexed"]
+    manager.forget(job_id)
+    assert manager.get(job_id) is None
+
+def test_jobs_queue_behind_busy_workers(manager, gate, pdf):
+    """Test jobs wait for a free worker, with their queue position, and refuse beyond max_pending."""
+    first = manager.submit([pdf])
+    wait_for(manager, first, [RUNNING])
+    second = manager.submit([pdf])
+    third = manager.submit([pdf])
+
+    assert manager.get(second)["status"] == QUEUED and manager.get(second)["queue_position"] == 0
+    assert manager.get(third)["queue_position"] == 1
+    assert manager.submit([pdf]) is None # max_pending reached
+
+    gate.set()
+    for job_id in (first, second, third):
+        wait_for(manager, job_id, [COMPLETED])
+
+def test_partial_index_while_running(manager, gate, pdf):
+    """Test a running job's partial index can be searched while the job continues."""
+    job_id = manager.submit([pdf])
+    gate.set()
+    wait_for(manager, job_id, [RUNNING])
+    while not manager.get(job_id)["has_index"] and manager.get(job_id)["status"] == RUNNING:
+        time.sleep(0.01)
+
+    partial = manager.partial_index(job_id)
+
+    assert partial is not None and partial.similarity_search("PX-1001", k=1)
+    wait_for(manager, job_id, [COMPLETED])
+    assert manager.partial_index(job_id) is manager.result(job_id)
+
+def test_partial_index_is_copied_once_per_batch(manager, gate, pdf, mocker):
+    """Test partial_index does not wait for the batch being embedded, and repeated calls share one copy."""
+    mocker.patch("src.processing.ingest_jobs.stream_ingest", partial(ingest_pipeline.stream_ingest, page_window=2))
+    copies = mocker.patch("src.processing.ingest_jobs.copy_index", wraps=copy_index)
+    embeddings = ingest_pipeline.get_embedding_function() # The gate fixture's GatedEmbedding
+    batches = []
+    def embed_first_batch_only(texts):
+        batches.append(texts)
+        if len(batches) > 1:
+            gate.wait(5) # Hold every later batch
+        return embeddings.fake.embed_documents(texts)
+    mocker.patch.object(embeddings, "embed_documents", side_effect=embed_first_batch_only)
+    job_id = manager.submit([pdf])
+    while not manager.get(job_id)["has_index"] or len(batches) < 2:
+        time.sleep(0.01)
+
+    # The job is busy embedding its second batch; that must not hold up searches
+    start_time = time.perf_counter()
+    first = manager.partial_index(job_id)
+    assert time.perf_counter() - start_time < 1
+    assert all(manager.partial_index(job_id) is first for _ in range(5))
+    assert copies.call_count == 1
+
+    gate.set()
+    wait_for(manager, job_id, [COMPLETED])
+    assert manager.partial_index(job_id) is manager.result(job_id)
+
+def test_cancel_running_and_queued_jobs(manager, gate, pdf):
+    """Test cancellation stops a running job after its window and a queued job before it starts."""
+    running = manager.submit([pdf, pdf]) # Two files: at least two page windows
+    wait_for(manager, running, [RUNNING])
+    queued = manager.submit([pdf])
+
+    assert manager.cancel(queued)
+    assert manager.get(queued)["status"] == CANCELLED
+    assert manager.cancel(running)
+    gate.set()
+
+    job = wait_for(manager, running, [CANCELLED])
+    assert job["pages_extracted"] < job["pages_total"]
+    assert manager.result(running) is None
+    assert not manager.cancel(running) # Already finished
+
+def test_failed_job_reports_error(manager, mocker, pdf):
+    """Test an ingest error marks the job failed with the error message."""
+    mocker.patch("src.processing.ingest_pipeline.get_embedding_function", return_value=None)
+
+    job = wait_for(manager, manager.submit([pdf]), [FAILED])
+
+    assert "embedding function" in job["error"]
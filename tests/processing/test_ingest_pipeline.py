@@ -0,0 +1,121 @@
+# tests/processing/test_ingest_pipeline.py
+
+import hashlib
+import io
+import os
+import pytest
+from unittest.mock import MagicMock
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from pypdf import PdfReader, PdfWriter
+
+from src.processing.chunk_cache import ChunkCache
+from src.processing.ingest_pipeline import stream_ingest
+from src.processing.pdf_processor import process_pdfs_to_documents
+from src.retrieval.vector_store import delete_documents, source_document_ids
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fixtures")
+
+def create_uploaded_file(name, content):
+    mock = MagicMock()
+    mock.name = name
+    mock.getvalue.return_value = content
+    return mock
+
+@pytest.fixture
+def uploaded_files():
+    with open(os.path.join(FIXTURES_DIR, "multipage.pdf"), "rb") as f:
+        content = f.read()
+    return [create_uploaded_file("a.pdf", content), create_uploaded_file("b.pdf", content)]
+
+@pytest.fixture
+def fake_embeddings(mocker):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    mocker.patch("src.processing.ingest_pipeline.get_embedding_function", return_value=embeddings)
+    return embeddings
+
+@pytest.fixture(autouse=True)
+def chunk_cache(mocker):
+    """Disable the on-disk chunk cache unless a test opts in."""
+    return mocker.patch("src.processing.ingest_pipeline.get_chunk_cache", return_value=None)
+
+def test_stream_ingest_reports_progress_per_window(uploaded_files, fake_embeddings):
+    """Test the pipeline yields after each page window with a growing, queryable index."""
+    steps = list(stream_ingest(uploaded_files, page_window=4))
+
+    # Two 6-page files, each in windows of 4
+    assert [step["pages_extracted"] for step in steps] == [4, 6, 10, 12]
+    assert all(step["pages_total"] == 12 for step in steps)
+    chunk_counts = [step["chunks_indexed"] for step in steps]
+    assert chunk_counts == sorted(chunk_counts)
+    assert steps[-1]["current_source"] == "b.pdf"
+
+    # The first partial index is already searchable
+    assert steps[0]["index"].similarity_search("PX-1001", k=1)
+    assert steps[-1]["index"].index.ntotal == steps[-1]["chunks_indexed"]
+
+def test_stream_ingest_matches_batch_processing(uploaded_files, fake_embeddings):
+    """Test the streamed index holds the same chunks as the batch processor produces."""
+    final = list(stream_ingest(uploaded_files, page_window=3))[-1]
+    expected = process_pdfs_to_documents(uploaded_files, max_workers=1)
+
+    index = final["index"]
+    stored = [index.docstore.search(index.index_to_docstore_id[i]) for i in range(index.index.ntotal)]
+    assert [doc.page_content for doc in stored] == [doc.page_content for doc in expected]
+    assert [doc.metadata for doc in stored] == [doc.metadata for doc in expected]
+
+def test_stream_ingest_no_embeddings(uploaded_files, mocker):
+    """Test the pipeline fails fast when the embedding model cannot be loaded."""
+    mocker.patch("src.processing.ingest_pipeline.get_embedding_function", return_value=None)
+    with pytest.raises(RuntimeError):
+        next(stream_ingest(uploaded_files))
+
+def test_stream_ingest_uses_chunk_cache(uploaded_files, fake_embeddings, chunk_cache, tmp_path, mocker):
+    """Test a repeat upload is served from the chunk cache without re-embedding."""
+    chunk_cache.return_value = ChunkCache(str(tmp_path))
+    first = list(stream_ingest(uploaded_files, page_window=4))[-1]
+
+    mock_embed = mocker.patch("src.processing.ingest_pipeline.embed_documents")
+    renamed = [create_uploaded_file("renamed.pdf", uploaded_files[0].getvalue())]
+    steps = list(stream_ingest(renamed, page_window=4))
+
+    mock_embed.assert_not_called()
+    assert len(steps) == 1 # Whole file assembled in one step
+    assert steps[0]["pages_extracted"] == 6
+    assert steps[0]["chunks_indexed"] == first["chunks_indexed"] // 2
+    index = steps[0]["index"]
+    stored = [index.docstore.search(index.index_to_docstore_id[i]) for i in range(index.index.ntotal)]
+    assert {doc.metadata["source"] for doc in stored} == {"renamed.pdf"}
+
+def test_stream_ingest_caches_only_complete_files(uploaded_files, fake_embeddings, chunk_cache, tmp_path):
+    """Test a file abandoned mid-way leaves no cache entry or temporary files behind."""
+    chunk_cache.return_value = ChunkCache(str(tmp_path))
+    steps = stream_ingest(uploaded_files[:1], page_window=2)
+    next(steps)
+    steps.close() # Cancelled after the first window
+
+    assert os.listdir(tmp_path) == []
+    list(stream_ingest(uploaded_files[:1], page_window=2))
+    assert len(os.listdir(tmp_path)) == 1
+
+def test_chunks_are_tagged_with_file_content_hash(fake_embeddings):
+    """Test every chunk carries its file's content hash, so one file's chunks can be found and deleted."""
+    reader = PdfReader(os.path.join(FIXTURES_DIR, "multipage.pdf"))
+    files = {}
+    for name, pages in (("manual.pdf", range(0, 4)), ("sample.pdf", range(4, 6))):
+        writer = PdfWriter()
+        for page in pages:
+            writer.add_page(reader.pages[page])
+        buffer = io.BytesIO()
+        writer.write(buffer)
+        files[name] = create_uploaded_file(name, buffer.getvalue())
+    hashes = {name: hashlib.sha256(f.getvalue()).hexdigest() for name, f in files.items()}
+
+    index = list(stream_ingest(list(files.values())))[-1]["index"]
+    stored = list(index.docstore._dict.values())
+    assert all(doc.metadata["content_hash"] == hashes[doc.metadata["source"]] for doc in stored)
+
+    sample_ids = source_document_ids(index, {"sample.pdf": hashes["sample.pdf"]})
+    assert sample_ids and len(sample_ids) == sum(doc.metadata["source"] == "sample.pdf" for doc in stored)
+    remaining = delete_documents(index, sample_ids)
+    assert {doc.metadata["source"] for doc in remaining.docstore._dict.values()} == {"manual.pdf"}
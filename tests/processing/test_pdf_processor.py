@@ -0,0 +1,139 @@
+# tests/processing/test_pdf_processor.py
+
+import io
+import os
+import pytest
+from unittest.mock import MagicMock
+
+from src.processing import pdf_processor
+from pypdf import PdfReader
+
+from src.processing.pdf_processor import count_pdf_pages, iter_pdf_pages, process_pdfs_to_documents
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fixtures")
+MULTIPAGE_PDF = os.path.join(FIXTURES_DIR, "multipage.pdf") # 6 pages of text
+
+def create_uploaded_file(name, content):
+    """Create a mock Streamlit UploadedFile."""
+    mock = MagicMock()
+    mock.name = name
+    mock.getvalue.return_value = content
+    return mock
+
+class BytesUpload(io.BytesIO):
+    """Minimal stand-in for Streamlit's UploadedFile, which is a BytesIO subclass."""
+    def __init__(self, name, content):
+        super().__init__(content)
+        self.name = name
+
+@pytest.fixture
+def pdf_bytes():
+    with open(MULTIPAGE_PDF, "rb") as f:
+        return f.read()
+
+def test_process_pdfs_no_files():
+    """Test that no input yields no documents."""
+    assert process_pdfs_to_documents([]) == []
+
+def test_process_pdfs_sequential(pdf_bytes):
+    """Test sequential extraction produces chunks with source/page metadata."""
+    docs = process_pdfs_to_documents([create_uploaded_file("manual.pdf", pdf_bytes)], max_workers=1)
+
+    assert len(docs) > 6 # Pages are long enough to be split
+    pages = [doc.metadata["page"] for doc in docs]
+    assert pages == sorted(pages)
+    assert set(pages) == set(range(6))
+    assert all(doc.metadata["total_pages"] == 6 for doc in docs)
+    assert "PX-1001" in docs[0].page_content
+    assert all(doc.metadata["source"] == "manual.pdf" for doc in docs)
+
+def test_process_pdfs_in_memory_without_temp_file(pdf_bytes, mocker):
+    """Test the single-worker path reads the upload buffer and never writes a temp file."""
+    mock_tempfile = mocker.patch("src.processing.pdf_processor.tempfile.NamedTemporaryFile")
+    upload = BytesUpload("uploads/manual.pdf", pdf_bytes)
+    upload.read(10) # Position should not matter
+
+    docs = process_pdfs_to_documents([upload], max_workers=1)
+
+    assert {doc.metadata["page"] for doc in docs} == set(range(6))
+    # Source is the file name, as shown by generate_answer
+    assert {doc.metadata["source"] for doc in docs} == {"manual.pdf"}
+    mock_tempfile.assert_not_called()
+
+def test_process_pdfs_skips_invalid_file(pdf_bytes):
+    """Test that a broken file is skipped and the other files are still processed."""
+    files = [
+        create_uploaded_file("broken.pdf", b"not a pdf"),
+        create_uploaded_file("manual.pdf", pdf_bytes),
+    ]
+    docs = process_pdfs_to_documents(files, max_workers=1)
+    assert docs
+    assert {doc.metadata["page"] for doc in docs} == set(range(6))
+
+def test_page_ranges():
+    """Test page range partitioning for large files."""
+    assert pdf_processor._page_ranges(5, 2) == [(0, 2), (2, 4), (4, 5)]
+    assert pdf_processor._page_ranges(0, 2) == []
+
+def test_process_pdfs_single_task_stays_in_process(pdf_bytes, mocker):
+    """Test one file that fits in a single page range skips the process pool even with several workers."""
+    mock_pool = mocker.patch.object(pdf_processor, "_get_process_pool")
+
+    docs = process_pdfs_to_documents([BytesUpload("manual.pdf", pdf_bytes)], max_workers=4)
+
+    assert {doc.metadata["page"] for doc in docs} == set(range(6))
+    mock_pool.assert_not_called()
+
+def test_process_pdfs_parallel_matches_sequential(pdf_bytes, mocker):
+    """Test the process pool returns the same ordered chunks as the sequential path."""
+    # Split each file into several page ranges so ranges are processed in parallel too
+    mocker.patch.object(pdf_processor, "PAGES_PER_TASK", 2)
+    files = [
+        BytesUpload("a.pdf", pdf_bytes),
+        create_uploaded_file("broken.pdf", b"not a pdf"),
+        create_uploaded_file("b.pdf", pdf_bytes),
+    ]
+
+    sequential = process_pdfs_to_documents(files, max_workers=1)
+    try:
+        parallel = process_pdfs_to_documents(files, max_workers=2)
+    finally:
+        pdf_processor._reset_process_pool()
+
+    assert [d.page_content for d in parallel] == [d.page_content for d in sequential]
+    assert [d.metadata for d in parallel] == [d.metadata for d in sequential]
+
+def test_iter_pdf_pages_reads_page_labels_once(pdf_bytes, mocker):
+    """Test page labels are computed once per file, not once per page."""
+    calls = []
+    labels = PdfReader.page_labels
+    mocker.patch.object(PdfReader, "page_labels", property(lambda reader: calls.append(1) or labels.fget(reader)))
+
+    pages = list(iter_pdf_pages([BytesUpload("manual.pdf", pdf_bytes)]))
+
+    assert [page.metadata["page_label"] for page in pages] == ["1", "2", "3", "4", "5", "6"]
+    assert len(calls) == 1
+
+def test_count_pdf_pages_reads_page_tree_count(pdf_bytes, mocker):
+    """Test the page count comes from the page tree without loading every page."""
+    spy = mocker.spy(pdf_processor, "_open_pdf")
+
+    assert count_pdf_pages(BytesUpload("manual.pdf", pdf_bytes)) == 6
+    assert spy.spy_return.flattened_pages is None
+    assert count_pdf_pages(create_uploaded_file("broken.pdf", b"not a pdf")) == 0
+
+def test_pool_computes_page_labels_once_per_file(pdf_bytes, mocker):
+    """Test the pool parent computes each file's labels once and hands every task its slice."""
+    mocker.patch.object(pdf_processor, "PAGES_PER_TASK", 4)
+    pool = mocker.Mock()
+    pool.submit.side_effect = lambda fn, *args: mocker.Mock(result=lambda: fn(*args))
+    mocker.patch.object(pdf_processor, "_get_process_pool", return_value=pool)
+    calls = []
+    labels = PdfReader.page_labels
+    mocker.patch.object(PdfReader, "page_labels", property(lambda reader: calls.append(1) or labels.fget(reader)))
+
+    docs = process_pdfs_to_documents([BytesUpload("manual.pdf", pdf_bytes)], max_workers=2)
+
+    assert [call.args[3:] for call in pool.submit.call_args_list] == [(0, ["1", "2", "3", "4"]), (4, ["5", "6"])]
+    assert {(doc.metadata["page"], doc.metadata["page_label"]) for doc in docs} == {(i, str(i + 1)) for i in range(6)}
+    assert len(calls) == 1
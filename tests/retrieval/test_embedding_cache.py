@@ -0,0 +1,67 @@
+# tests/retrieval/test_embedding_cache.py
+
+import numpy as np
+import pytest
+
+from src.retrieval.embedding_cache import EmbeddingCache, text_key
+from src.retrieval.vector_store import embed_texts
+
+@pytest.fixture
+def cache(tmp_path):
+    return EmbeddingCache(str(tmp_path), "test-model", max_entries=100)
+
+def test_text_key_normalizes_whitespace():
+    """Test chunks differing only in whitespace share a key."""
+    assert text_key("part  number\nPX-1") == text_key(" part number PX-1 ")
+    assert text_key("part number PX-1") != text_key("part number PX-2")
+
+def test_embedding_cache_round_trip(cache):
+    """Test stored vectors are returned for hits and None for misses."""
+    cache.put_many(["alpha", "beta"], [[1.0, 2.0], [3.0, 4.0]])
+
+    results = cache.get_many(["beta", "gamma", "alpha"])
+
+    np.testing.assert_array_equal(results[0], [3.0, 4.0])
+    assert results[1] is None
+    np.testing.assert_array_equal(results[2], [1.0, 2.0])
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 2)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+def test_embedding_cache_persists_across_instances(cache, tmp_path):
+    """Test a new process (instance) reads vectors written by another."""
+    cache.put_many(["alpha"], [[1.0, 2.0]])
+    reopened = EmbeddingCache(str(tmp_path), "test-model")
+    np.testing.assert_array_equal(reopened.get_many(["alpha"])[0], [1.0, 2.0])
+
+def test_embedding_cache_evicts_least_recently_used(tmp_path):
+    """Test the entry limit evicts the least recently used vector and reuses its row."""
+    cache = EmbeddingCache(str(tmp_path), "test-model", max_entries=2)
+    cache.put_many(["a"], [[1.0]])
+    cache.put_many(["b"], [[2.0]])
+    cache.get_many(["a"]) # 'b' is now least recently used
+    cache.put_many(["c"], [[3.0]])
+
+    a, b, c = cache.get_many(["a", "b", "c"])
+    assert b is None
+    np.testing.assert_array_equal(a, [1.0])
+    np.testing.assert_array_equal(c, [3.0])
+    assert cache.stats()["evictions"] == 1
+
+def test_embed_texts_only_embeds_misses(cache, mocker):
+    """Test embed_texts serves hits from the cache and sends only misses to the model."""
+    mocker.patch("src.retrieval.vector_store.get_embedding_cache", return_value=cache)
+    cache.put_many(["cached chunk"], [[9.0, 9.0]])
+    sent = []
+
+    class NamedEmbeddings:
+        model_name = "test-model"
+        def embed_documents(self, batch):
+            sent.extend(batch)
+            return [[float(len(text)), 0.0] for text in batch]
+
+    vectors = embed_texts(["new chunk", "cached  chunk", "new chunk"], NamedEmbeddings())
+
+    assert sent == ["new chunk"] # Duplicate embedded once, cached one not at all
+    assert vectors == [[9.0, 0.0], [9.0, 9.0], [9.0, 0.0]]
+    np.testing.assert_array_equal(cache.get_many(["new chunk"])[0], [9.0, 0.0])
@@ -0,0 +1,82 @@
+# tests/retrieval/test_index_collections.py
+
+import json
+import os
+import pytest
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.retrieval import index_collections
+from src.retrieval.index_collections import (
+    list_collections, load_collection, read_manifest, save_collection
+)
+from src.retrieval.vector_store import add_embeddings_to_index
+
+@pytest.fixture
+def embeddings(mocker, tmp_path, monkeypatch):
+    """Fake embeddings everywhere and a temporary collections directory."""
+    monkeypatch.setenv("INDEX_COLLECTIONS_DIR", str(tmp_path))
+    fake = DeterministicFakeEmbedding(size=16)
+    mocker.patch("src.retrieval.index_collections.get_embedding_function", return_value=fake)
+    mocker.patch("src.retrieval.vector_store.get_embedding_function", return_value=fake)
+    return fake
+
+@pytest.fixture
+def index(embeddings):
+    docs = [
+        Document(page_content=f"Part PX-{1000 + i} is stored in bay {i}.", metadata={"source": "parts.pdf", "page": i})
+        for i in range(5)
+    ]
+    return add_embeddings_to_index(docs, embeddings.embed_documents([d.page_content for d in docs]), embeddings)
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_collection_round_trip(index, tmp_path, mmap):
+    """Test a saved collection loads (memory-mapped or not) with identical search results."""
+    assert save_collection("library", index, {"parts.pdf": "abc"})
+
+    loaded = load_collection("library", mmap=mmap)
+
+    assert loaded is not None
+    assert loaded.index.ntotal == 5
+    query = "Part PX-1003 is stored in bay 3."
+    assert loaded.similarity_search(query, k=2) == index.similarity_search(query, k=2)
+    assert sorted(os.listdir(tmp_path / "library")) == ["index.faiss", "index.pkl", "lexical.npz", "manifest.json"]
+    manifest = read_manifest("library")
+    assert manifest["vector_count"] == 5
+    assert manifest["content_hashes"] == {"parts.pdf": "abc"}
+    assert list_collections() == ["library"]
+
+def test_collection_with_other_chunk_settings_is_stale(index, mocker):
+    """Test a manifest built with different chunking settings forces a rebuild."""
+    save_collection("library", index, {"parts.pdf": "abc"})
+    mocker.patch.object(index_collections, "CHUNK_SIZE", 500)
+    assert load_collection("library") is None
+
+def test_collection_with_other_model_is_stale(index, tmp_path):
+    """Test a manifest built with another embedding model forces a rebuild."""
+    save_collection("library", index, {"parts.pdf": "abc"})
+    manifest_path = tmp_path / "library" / "manifest.json"
+    manifest = json.loads(manifest_path.read_text())
+    manifest["model_name"] = "all-MiniLM-L6-v2-onnx-int8"
+    manifest_path.write_text(json.dumps(manifest))
+    assert load_collection("library") is None
+
+def test_collection_content_hash_check(index):
+    """Test the expected documents are matched by content, not by file name."""
+    save_collection("library", index, {"parts.pdf": "abc"})
+    assert load_collection("library", content_hashes={"renamed.pdf": "abc"}) is not None
+    assert load_collection("library", content_hashes={"parts.pdf": "changed"}) is None
+
+def test_save_collection_replaces_existing(index, embeddings):
+    """Test saving under an existing name replaces the previous collection."""
+    save_collection("library", index, {"parts.pdf": "abc"})
+    smaller = add_embeddings_to_index([Document(page_content="only one")], [embeddings.embed_query("only one")], embeddings)
+    assert save_collection("library", smaller, {"one.pdf": "def"})
+    assert load_collection("library").index.ntotal == 1
+
+def test_invalid_collection_name(index):
+    """Test names that could escape the collections directory are rejected."""
+    assert not save_collection("../outside", index, {})
+    assert load_collection("../outside") is None
+    assert load_collection("missing") is None
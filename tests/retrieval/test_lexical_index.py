@@ -0,0 +1,79 @@
+# tests/retrieval/test_lexical_index.py
+
+import numpy as np
+
+from src.retrieval.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+CHUNKS = {
+    "a": "Replace filter PX-1003 every six months.",
+    "b": "The pump housing is described in clause 4.2.1 of the manual.",
+    "c": "Filter maintenance: clean the filter and the filter cover.",
+    "d": "Safety instructions for the operator.",
+}
+
+def test_tokenize_keeps_identifiers_whole_and_split():
+    """Test part numbers and clause references yield the whole token plus their parts."""
+    terms = tokenize("See clause 4.2.1 for part PX-1003 of the pump.")
+    assert "4.2.1" in terms and "px-1003" in terms
+    assert {"px", "1003", "4", "2", "1"} <= set(terms)
+    assert "the" not in terms and "of" not in terms
+
+def test_bm25_ranks_exact_identifier_first():
+    """Test an exact identifier query ranks its chunk first, term frequency breaks ties between matches."""
+    index = BM25Index()
+    index.add(list(CHUNKS), list(CHUNKS.values()))
+    assert index.search("PX-1003", top_k=3)[0][0] == "a"
+    assert index.search("clause 4.2.1", top_k=1)[0][0] == "b"
+    assert [doc_id for doc_id, _ in index.search("filter", top_k=2)] == ["c", "a"]
+    assert index.search("turbine", top_k=3) == []
+
+def test_incremental_adds_match_bulk_build():
+    """Test adding chunks batch by batch gives the same postings and scores as one add."""
+    bulk = BM25Index()
+    bulk.add(list(CHUNKS), list(CHUNKS.values()))
+    incremental = BM25Index()
+    items = list(CHUNKS.items())
+    incremental.add([items[0][0]], [items[0][1]])
+    incremental.search("filter", top_k=1) # Compacts the first batch
+    incremental.add([key for key, _ in items[1:]], [text for _, text in items[1:]])
+    for query in ("filter", "PX-1003 pump", "clause operator"):
+        assert incremental.search(query, top_k=4) == bulk.search(query, top_k=4)
+
+def test_copy_is_independent():
+    """Test chunks added to a copy do not appear in the original."""
+    index = BM25Index()
+    index.add(["a"], [CHUNKS["a"]])
+    copied = index.copy()
+    copied.add(["d"], [CHUNKS["d"]])
+    assert len(index) == 1 and index.search("operator", top_k=1) == []
+    assert copied.search("operator", top_k=1)[0][0] == "d"
+
+def test_remove_drops_postings_and_renumbers():
+    """Test removed chunks no longer match and the rest score as if built without them."""
+    index = BM25Index()
+    index.add(list(CHUNKS), list(CHUNKS.values()))
+    assert index.remove(["a", "missing"]) == 1
+    rebuilt = BM25Index()
+    rebuilt.add(["b", "c", "d"], [CHUNKS[key] for key in "bcd"])
+    assert index.doc_ids == ["b", "c", "d"]
+    assert index.search("PX-1003", top_k=3) == []
+    for query in ("filter", "clause pump operator"):
+        assert index.search(query, top_k=3) == rebuilt.search(query, top_k=3)
+
+def test_save_and_load_round_trip(tmp_path):
+    """Test a saved index loads with identical results and compact array types."""
+    index = BM25Index()
+    index.add(list(CHUNKS), list(CHUNKS.values()))
+    path = str(tmp_path / "lexical.npz")
+    index.save(path)
+    loaded = BM25Index.load(path)
+    assert loaded.doc_ids == index.doc_ids
+    assert loaded.search("filter PX-1003", top_k=4) == index.search("filter PX-1003", top_k=4)
+    assert loaded._doc_positions.dtype == np.int32 and loaded._term_frequencies.dtype == np.uint16
+
+def test_reciprocal_rank_fusion():
+    """Test items ranked well by both lists win and top_k truncates."""
+    fused = reciprocal_rank_fusion([["x", "y", "z"], ["y", "w", "x"]], k=60)
+    assert fused[:2] == ["y", "x"]
+    assert set(fused) == {"x", "y", "z", "w"}
+    assert reciprocal_rank_fusion([["x", "y"], ["y"]], top_k=1) == ["y"]
@@ -0,0 +1,70 @@
+# tests/retrieval/test_onnx_embeddings.py
+
+import numpy as np
+import pytest
+from unittest.mock import MagicMock
+
+from src.retrieval import onnx_embeddings, vector_store
+from src.retrieval.onnx_embeddings import OnnxEmbeddings, mean_pool
+
+def test_mean_pool_ignores_padding_and_normalizes():
+    """Test pooling averages only real tokens and returns unit vectors."""
+    tokens = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+
+    np.testing.assert_allclose(mean_pool(tokens, mask, normalize=False), [[2.0, 0.0]])
+    np.testing.assert_allclose(mean_pool(tokens, mask), [[1.0, 0.0]])
+
+@pytest.fixture
+def onnx_model(mocker, tmp_path):
+    """OnnxEmbeddings wired to a fake tokenizer and session (no export or download)."""
+    mocker.patch.object(onnx_embeddings, "export_onnx_model", return_value=str(tmp_path / "model_int8.onnx"))
+    tokenizer = MagicMock(side_effect=lambda texts, **kwargs: {
+        "input_ids": np.ones((len(texts), 3), dtype=np.int64),
+        "attention_mask": np.array([[1, 1, 0]] * len(texts)),
+        "token_type_ids": np.zeros((len(texts), 3), dtype=np.int64),
+    })
+    mocker.patch.object(onnx_embeddings, "_load_tokenizer", return_value=tokenizer)
+    session = MagicMock()
+    session.get_inputs.return_value = [MagicMock(), MagicMock()]
+    session.get_inputs.return_value[0].name = "input_ids"
+    session.get_inputs.return_value[1].name = "attention_mask"
+    session.run.side_effect = lambda outputs, inputs: [
+        np.tile(np.array([[3.0, 4.0]], dtype=np.float32), (inputs["input_ids"].shape[0], 3, 1))
+    ]
+    mocker.patch.object(onnx_embeddings.ort, "InferenceSession", return_value=session)
+    return OnnxEmbeddings("all-MiniLM-L6-v2", model_dir=str(tmp_path), batch_size=2)
+
+def test_onnx_embeddings_batches_and_feeds_model_inputs(onnx_model):
+    """Test documents are embedded in batches and only inputs the graph declares are fed."""
+    vectors = onnx_model.embed_documents(["a", "b", "c"])
+
+    assert len(vectors) == 3
+    np.testing.assert_allclose(vectors[0], [0.6, 0.8], rtol=1e-6)
+    assert onnx_model.session.run.call_count == 2 # Batches of 2 + 1
+    fed = onnx_model.session.run.call_args[0][1]
+    assert set(fed) == {"input_ids", "attention_mask"}
+    np.testing.assert_allclose(onnx_model.embed_query("q"), [0.6, 0.8], rtol=1e-6)
+    assert onnx_model.model_name == "all-MiniLM-L6-v2-onnx-int8"
+
+def test_get_embedding_function_onnx_backend(mocker):
+    """Test EMBEDDING_BACKEND=onnx loads the ONNX model instead of sentence-transformers."""
+    mocker.patch.object(vector_store, "EMBEDDING_BACKEND", "onnx")
+    mock_onnx = mocker.patch("src.retrieval.vector_store.OnnxEmbeddings")
+    mock_hf = mocker.patch("src.retrieval.vector_store.HuggingFaceEmbeddings")
+
+    result = vector_store.get_embedding_function("all-MiniLM-L6-v2")
+
+    assert result is mock_onnx.return_value
+    mock_hf.assert_not_called()
+
+def test_get_embedding_function_onnx_falls_back_to_torch(mocker):
+    """Test a failing ONNX export/load falls back to the PyTorch backend."""
+    mocker.patch.object(vector_store, "EMBEDDING_BACKEND", "onnx")
+    mocker.patch("src.retrieval.vector_store.OnnxEmbeddings", side_effect=ImportError("no optimum"))
+    mock_hf = mocker.patch("src.retrieval.vector_store.HuggingFaceEmbeddings")
+
+    result = vector_store.get_embedding_function("all-MiniLM-L6-v2")
+
+    assert result is mock_hf.return_value
+    assert vector_store.get_embedding_model_stats()["all-MiniLM-L6-v2"]["backend"] == "torch"
@@ -0,0 +1,93 @@
+# tests/retrieval/test_reranker.py
+
+import asyncio
+import time
+
+import pytest
+from langchain_core.documents import Document
+
+from src.retrieval import reranker
+from src.retrieval.reranker import RerankScoreCache, arerank_documents, get_cross_encoder, rerank_documents
+
+class FakeCrossEncoder:
+    """Scores a pair by how often the chunk mentions the query's last word; records each call."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=None):
+        self.batches.append(len(pairs))
+        time.sleep(self.delay * len(pairs))
+        return [float(text.split().count(query.split()[-1])) for query, text in pairs]
+
+@pytest.fixture
+def fake_model(mocker):
+    model = FakeCrossEncoder()
+    mocker.patch.object(reranker, "get_cross_encoder", return_value=model)
+    return model
+
+def _candidates():
+    # Retrieval order puts the most relevant chunk (most "pump" mentions) last
+    return [Document(page_content=f"chunk {i} " + "pump " * i) for i in range(6)]
+
+def test_rerank_orders_by_score_in_batches(fake_model):
+    """Test candidates are scored in batches and the best top_k are kept, most relevant first."""
+    results = rerank_documents("which pump", _candidates(), top_k=3, model_name="fake", batch_size=4)
+
+    assert [doc.page_content.split()[1] for doc in results] == ["5", "4", "3"]
+    assert fake_model.batches == [4, 2]
+
+def test_rerank_scores_are_cached_per_query_and_chunk(fake_model):
+    """Test a repeated query is not scored again, while a new query is."""
+    rerank_documents("which pump", _candidates(), top_k=3, model_name="fake")
+    again = rerank_documents(" which pump ", _candidates(), top_k=3, model_name="fake")
+    assert len(fake_model.batches) == 1
+    assert [doc.page_content.split()[1] for doc in again] == ["5", "4", "3"]
+
+    rerank_documents("which chunk", _candidates(), top_k=3, model_name="fake")
+    assert len(fake_model.batches) == 2
+    assert reranker.get_rerank_cache().stats()["hits"] == 6
+
+def test_rerank_stops_at_the_budget(mocker):
+    """Test scoring stops when the budget runs out and unscored chunks keep their retrieval order."""
+    model = FakeCrossEncoder(delay=0.02)
+    mocker.patch.object(reranker, "get_cross_encoder", return_value=model)
+
+    results = rerank_documents("which pump", _candidates(), top_k=6, model_name="fake", batch_size=2, budget_ms=30)
+
+    assert model.batches == [2] # 40ms used; no pair fits in what is left
+    assert [doc.page_content.split()[1] for doc in results] == ["1", "0", "2", "3", "4", "5"]
+
+def test_rerank_disabled_or_unavailable_keeps_retrieval_order(mocker):
+    """Test the first top_k chunks are returned when reranking is off or the model cannot load."""
+    load = mocker.patch.object(reranker, "get_cross_encoder", return_value=None)
+
+    assert rerank_documents("which pump", _candidates(), top_k=2) == _candidates()[:2]
+    load.assert_not_called() # RERANK_ENABLED is unset
+    assert rerank_documents("which pump", _candidates(), top_k=2, model_name="fake") == _candidates()[:2]
+    assert asyncio.run(arerank_documents("which pump", _candidates(), top_k=2)) == _candidates()[:2]
+
+def test_arerank_documents(fake_model):
+    """Test the async variant reranks on the retrieval thread pool."""
+    results = asyncio.run(arerank_documents("which pump", _candidates(), top_k=1, model_name="fake"))
+    assert results[0].page_content.startswith("chunk 5")
+
+def test_get_cross_encoder_loads_once(mocker):
+    """Test the cross-encoder is loaded once per process and failed loads are not cached."""
+    mock_cls = mocker.patch.object(reranker, "CrossEncoder", side_effect=[Exception("download failed"), object()])
+
+    assert get_cross_encoder("some/model") is None
+    model = get_cross_encoder("some/model")
+    assert model is not None and get_cross_encoder("some/model") is model
+    assert mock_cls.call_count == 2
+
+def test_score_cache_evicts_least_recently_used():
+    """Test the score cache keeps at most max_entries scores."""
+    cache = RerankScoreCache(max_entries=2)
+    cache.put_many("m", "q", ["a", "b"], [1.0, 2.0])
+    assert cache.get_many("m", "q", ["a"]) == [1.0]
+    cache.put_many("m", "q", ["c"], [3.0])
+
+    assert cache.get_many("m", "q", ["a", "b", "c"]) == [1.0, None, 3.0]
+    assert cache.get_many("other-model", "q", ["a"]) == [None]
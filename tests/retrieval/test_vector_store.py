@@ -1,17 +1,39 @@
 # tests/retrieval/test_vector_store.py
 
+import faiss
 import pytest
 import os
+import numpy as np
 from unittest.mock import patch, MagicMock
 
 from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
 from langchain_community.vectorstores import FAISS # Import needed for spec
 # Import functions being tested
 from src.retrieval.vector_store import ( 
     get_embedding_function,
+    get_embedding_model_stats,
+    warm_up_embedding_model,
+    embed_texts,
+    embedding_model_id,
+    get_embedding_throughput,
     build_faiss_index, 
+    choose_index_type,
+    create_faiss_index,
+    index_type_of,
+    optimize_index,
+    add_embeddings_to_index,
+    copy_index,
+    delete_documents,
+    get_lexical_index,
+    index_sources,
+    maximal_marginal_relevance,
     load_faiss_index,
+    save_faiss_index,
     search_index,
+    source_document_ids,
+    search_index_batch,
+    asearch_index,
     DEFAULT_EMBEDDING_MODEL
 )
 
@@ -68,27 +90,113 @@ def test_get_embedding_function_failure(mocker):
 
     assert embeddings is None
 
-def test_build_faiss_index_success(mocker):
-    """Test successful index building and saving using mocker."""
-    mock_get_embeddings = mocker.patch('src.retrieval.vector_store.get_embedding_function')
-    MockFAISSCls = mocker.patch('src.retrieval.vector_store.FAISS')
-    # from src.retrieval.vector_store import build_faiss_index # Already imported at top
+def test_get_embedding_function_loads_model_once(mocker):
+    """Test the embedding model is loaded once and shared by later callers."""
+    MockEmbeddingsCls = mocker.patch('src.retrieval.vector_store.HuggingFaceEmbeddings')
 
-    mock_embed_func = MagicMock()
-    mock_get_embeddings.return_value = mock_embed_func
+    first = get_embedding_function()
+    second = get_embedding_function()
 
-    mock_faiss_instance = MagicMock()
-    MockFAISSCls.from_documents.return_value = mock_faiss_instance
+    assert first is second
+    MockEmbeddingsCls.assert_called_once_with(model_name=DEFAULT_EMBEDDING_MODEL)
+    stats = get_embedding_model_stats()[DEFAULT_EMBEDDING_MODEL]
+    assert stats["load_seconds"] >= 0
 
-    docs = [Document(page_content="doc1"), Document(page_content="doc2")]
-    index_path = "./test_build_index"
+def test_get_embedding_function_failure_not_cached(mocker):
+    """Test a failed load is retried on the next call."""
+    MockEmbeddingsCls = mocker.patch('src.retrieval.vector_store.HuggingFaceEmbeddings')
+    MockEmbeddingsCls.side_effect = [Exception("Model load error"), MagicMock()]
+
+    assert get_embedding_function() is None
+    assert get_embedding_function() is not None
+    assert MockEmbeddingsCls.call_count == 2
+
+def test_get_embedding_function_concurrent_callers_share_load(mocker):
+    """Test concurrent sessions wait for a single model load."""
+    import threading
+    import time
+
+    def slow_load(model_name):
+        time.sleep(0.05)
+        return MagicMock()
+
+    MockEmbeddingsCls = mocker.patch('src.retrieval.vector_store.HuggingFaceEmbeddings', side_effect=slow_load)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_embedding_function())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert MockEmbeddingsCls.call_count == 1
+    assert all(result is results[0] for result in results)
+
+def test_warm_up_embedding_model(mocker):
+    """Test background warm-up loads the model and is a no-op afterwards."""
+    MockEmbeddingsCls = mocker.patch('src.retrieval.vector_store.HuggingFaceEmbeddings')
+
+    thread = warm_up_embedding_model()
+    thread.join(timeout=5)
 
-    result = build_faiss_index(docs, index_path=index_path)
+    assert get_embedding_function() is MockEmbeddingsCls.return_value
+    assert warm_up_embedding_model() is None
+    MockEmbeddingsCls.assert_called_once()
 
-    assert result is True
+def test_embed_texts_buckets_by_length_and_restores_order():
+    """Test texts are batched shortest-first and vectors come back in input order."""
+    texts = ["a b c d e f", "a", "a b c", "a b", "a b c d"]
+    batches = []
+
+    class RecordingEmbeddings:
+        def embed_documents(self, batch):
+            batches.append(list(batch))
+            return [[float(len(text.split()))] for text in batch]
+
+    vectors = embed_texts(texts, RecordingEmbeddings(), batch_size=2)
+
+    assert batches == [["a", "a b"], ["a b c", "a b c d"], ["a b c d e f"]]
+    assert vectors == [[6.0], [1.0], [3.0], [2.0], [4.0]]
+    assert get_embedding_throughput()["chunks"] >= len(texts)
+
+def test_embed_texts_empty():
+    """Test embedding nothing does not call the model."""
+    mock_embeddings = MagicMock()
+    assert embed_texts([], mock_embeddings) == []
+    mock_embeddings.embed_documents.assert_not_called()
+
+def test_embedding_model_id_includes_token_limit(mocker):
+    """Test the model id changes with the max sequence length, so caches and manifests notice it."""
+    torch_model = MagicMock(model_name="all-MiniLM-L6-v2", spec=["model_name", "client"])
+    torch_model.client.max_seq_length = 256
+    onnx_model = MagicMock(model_name="all-MiniLM-L6-v2-onnx-int8", max_seq_length=256)
+
+    assert embedding_model_id(torch_model) == "all-MiniLM-L6-v2-seq256"
+    assert embedding_model_id(onnx_model) == "all-MiniLM-L6-v2-onnx-int8-seq256"
+    torch_model.client.max_seq_length = 128
+    assert embedding_model_id(torch_model) == "all-MiniLM-L6-v2-seq128"
+
+    cache_for = mocker.patch("src.retrieval.vector_store.get_embedding_cache", return_value=None)
+    torch_model.embed_documents = lambda batch: [[0.0] for _ in batch]
+    embed_texts(["chunk"], torch_model)
+    cache_for.assert_called_once_with("all-MiniLM-L6-v2-seq128")
+
+def test_build_faiss_index_success(mocker, tmp_path):
+    """Test an index is built in memory and round-trips through save/load."""
+    fake = DeterministicFakeEmbedding(size=16)
+    mock_get_embeddings = mocker.patch('src.retrieval.vector_store.get_embedding_function', return_value=fake)
+
+    docs = [Document(page_content="doc1"), Document(page_content="doc2")]
+    result = build_faiss_index(docs)
+
+    assert isinstance(result, FAISS)
+    assert result.index.ntotal == 2
     mock_get_embeddings.assert_called_once()
-    MockFAISSCls.from_documents.assert_called_once_with(docs, mock_embed_func)
-    mock_faiss_instance.save_local.assert_called_once_with(index_path)
+
+    index_path = str(tmp_path / "index")
+    assert save_faiss_index(result, index_path) is True
+    loaded = load_faiss_index(index_path)
+    assert loaded.index.ntotal == 2
+    assert loaded.similarity_search("doc2", k=1)[0].page_content == "doc2"
 
 def test_build_faiss_index_no_embeddings(mocker):
     """Test index build failure when embeddings fail using mocker."""
@@ -97,7 +205,7 @@ def test_build_faiss_index_no_embeddings(mocker):
 
     mock_get_embeddings.return_value = None
     result = build_faiss_index([Document(page_content="test")])
-    assert result is False
+    assert result is None
 
 # Add explicit test for no documents
 def test_build_faiss_index_no_documents(mocker):
@@ -115,28 +223,21 @@ def test_build_faiss_index_no_documents(mocker):
 
 
 def test_build_faiss_index_build_error(mocker):
-    """Test index build failure during FAISS.from_documents using mocker."""
-    mock_get_embeddings = mocker.patch('src.retrieval.vector_store.get_embedding_function')
-    MockFAISSCls = mocker.patch('src.retrieval.vector_store.FAISS')
-    # from src.retrieval.vector_store import build_faiss_index
+    """Test index build failure while adding the vectors using mocker."""
+    mocker.patch('src.retrieval.vector_store.get_embedding_function', return_value=MagicMock())
+    mocker.patch('src.retrieval.vector_store.embed_documents', return_value=[[0.0]])
+    mocker.patch('src.retrieval.vector_store.add_embeddings_to_index', side_effect=Exception("Build failed"))
 
-    mock_get_embeddings.return_value = MagicMock()
-    MockFAISSCls.from_documents.side_effect = Exception("Build failed")
     result = build_faiss_index([Document(page_content="test")])
-    assert result is False
+    assert result is None
 
-def test_build_faiss_index_save_error(mocker):
-    """Test index build failure during save_local using mocker."""
-    mock_get_embeddings = mocker.patch('src.retrieval.vector_store.get_embedding_function')
-    MockFAISSCls = mocker.patch('src.retrieval.vector_store.FAISS')
-    # from src.retrieval.vector_store import build_faiss_index
+def test_save_faiss_index_save_error(mocker):
+    """Test saving reports failure when save_local raises."""
+    mock_index = MagicMock(spec=FAISS)
+    mock_index.save_local.side_effect = Exception("Save failed")
 
-    mock_get_embeddings.return_value = MagicMock()
-    mock_faiss_instance = MagicMock()
-    mock_faiss_instance.save_local.side_effect = Exception("Save failed")
-    MockFAISSCls.from_documents.return_value = mock_faiss_instance
-    result = build_faiss_index([Document(page_content="test")])
-    assert result is False
+    assert save_faiss_index(mock_index, "./test_save_index") is False
+    mock_index.save_local.assert_called_once_with("./test_save_index")
 
 def test_load_faiss_index_success(mocker):
     """Test successful index loading using mocker."""
@@ -230,3 +331,244 @@ def test_search_index_search_error(mocker): # Added mocker fixture just in case
 # Removed duplicated test
 # def test_build_faiss_index_no_documents(mocker):
 # ...
+
+# --- Tests for the index factory ---
+
+def _random_vectors(n, dim=16, seed=0):
+    import numpy as np
+    return np.random.default_rng(seed).random((n, dim)).astype("float32")
+
+def test_choose_index_type_by_size_and_budget():
+    """Test small corpora stay exact and large ones get HNSW or IVF-PQ by memory budget."""
+    assert choose_index_type(1_000, 384) == "flat"
+    assert choose_index_type(200_000, 384, memory_budget_mb=1024) == "hnsw"
+    assert choose_index_type(200_000, 384, memory_budget_mb=100) == "ivfpq"
+    assert choose_index_type(5_000_000, 384, memory_budget_mb=1024) == "ivfpq"
+
+@pytest.mark.parametrize("index_type", ["hnsw", "ivfpq"])
+def test_create_faiss_index_recall(index_type):
+    """Test approximate indexes find most of the exact nearest neighbours."""
+    vectors = _random_vectors(3000)
+    queries = vectors[:50]
+    exact = create_faiss_index(vectors, "flat")
+    approx = create_faiss_index(vectors, index_type)
+
+    assert index_type_of(approx) == index_type
+    _, expected = exact.search(queries, 5)
+    _, found = approx.search(queries, 5)
+    recall = sum(len(set(e) & set(f)) for e, f in zip(expected, found)) / expected.size
+    assert recall > 0.5
+
+def test_create_faiss_index_too_small_for_pq():
+    """Test IVF-PQ falls back to flat when there are too few vectors to train it."""
+    assert index_type_of(create_faiss_index(_random_vectors(100), "ivfpq")) == "flat"
+
+def test_optimize_index_keeps_docstore_and_results():
+    """Test rebuilding as HNSW keeps the documents and (for exact matches) the results."""
+    embeddings = DeterministicFakeEmbedding(size=16)
+    docs = [Document(page_content=f"chunk {i}", metadata={"page": i}) for i in range(200)]
+    flat = add_embeddings_to_index(docs, embeddings.embed_documents([d.page_content for d in docs]), embeddings)
+
+    assert optimize_index(flat) is flat # Small corpus stays flat
+    hnsw = optimize_index(flat, index_type="hnsw")
+
+    assert index_type_of(hnsw.index) == "hnsw"
+    assert hnsw.index.ntotal == 200
+    ef_search = hnsw.index.hnsw.efSearch
+    assert search_index("chunk 42", hnsw, top_k=1, ef_search=128)[0].metadata == {"page": 42}
+    assert hnsw.index.hnsw.efSearch == ef_search # Per-call knob; the shared index is untouched
+
+def _part_catalogue(n_parts=100):
+    embeddings = DeterministicFakeEmbedding(size=16)
+    docs = [
+        Document(page_content=f"Spare part {'PX' if i == 42 else 'QZ'}-{1000 + i} is stored in bay {i}.", metadata={"page": i})
+        for i in range(n_parts)
+    ]
+    return add_embeddings_to_index(docs, embeddings.embed_documents([d.page_content for d in docs]), embeddings), embeddings
+
+def test_hybrid_search_finds_exact_identifier():
+    """Test hybrid mode finds a part number that dense search over unrelated vectors misses."""
+    index, embeddings = _part_catalogue()
+    hybrid = search_index("Where is PX-1042?", index, top_k=3, mode="hybrid")
+    assert {"page": 42} in [doc.metadata for doc in hybrid]
+    assert len(hybrid) == 3
+    # The fake embeddings carry no meaning, so dense search alone misses it
+    assert {"page": 42} not in [doc.metadata for doc in search_index("Where is PX-1042?", index, top_k=3)]
+    assert search_index("Where is PX-1042?", index, top_k=3, mode="fuzzy") == []
+
+def test_lexical_index_follows_the_faiss_index(tmp_path):
+    """Test the BM25 index grows, is copied, survives optimization and is saved with the FAISS index."""
+    index, embeddings = _part_catalogue()
+    lexical = get_lexical_index(index)
+    assert len(lexical) == index.index.ntotal == 100
+    assert set(lexical.doc_ids) == set(index.index_to_docstore_id.values())
+
+    copied = copy_index(index)
+    extra = [Document(page_content="Gasket GX-700 is stored in bay 200.", metadata={"page": 200})]
+    add_embeddings_to_index(extra, embeddings.embed_documents([extra[0].page_content]), embeddings, copied)
+    assert len(get_lexical_index(copied)) == 101 and len(lexical) == 100
+    assert {"page": 200} in [doc.metadata for doc in search_index("GX-700", copied, top_k=2, mode="hybrid")]
+
+    assert get_lexical_index(optimize_index(copied, index_type="hnsw")) is get_lexical_index(copied)
+
+    assert save_faiss_index(copied, str(tmp_path))
+    with patch("src.retrieval.vector_store.get_embedding_function", return_value=embeddings):
+        loaded = load_faiss_index(str(tmp_path), mmap=True)
+    assert len(get_lexical_index(loaded)) == 101
+    assert {"page": 200} in [doc.metadata for doc in search_index("GX-700", loaded, top_k=2, mode="hybrid")]
+
+def test_hybrid_batch_search_matches_single_searches():
+    """Test hybrid batch search returns what hybrid single searches return."""
+    index, embeddings = _part_catalogue()
+    queries = ["PX-1042", "bay 55", "spare part stored"]
+    batch = search_index_batch(index, embeddings.embed_documents(queries), top_k=3, queries=queries, mode="hybrid")
+    assert batch == [search_index(query, index, top_k=3, mode="hybrid") for query in queries]
+    assert search_index_batch(index, embeddings.embed_documents(queries), mode="hybrid") == [[], [], []] # No query texts
+
+@pytest.mark.parametrize("index_type, n_parts", [("flat", 100), ("hnsw", 100), ("ivfpq", 600)])
+def test_delete_documents_removes_vectors_postings_and_docstore_entries(index_type, n_parts):
+    """Test deleting a file's chunks leaves the original index intact and the copy consistent."""
+    index, embeddings = _part_catalogue(n_parts)
+    for doc_id in list(index.index_to_docstore_id.values())[:10]:
+        index.docstore.search(doc_id).metadata["source"] = "old.pdf" # Untagged chunks match by name
+    if index_type != "flat":
+        index = optimize_index(index, index_type=index_type)
+        assert index_type_of(index.index) == index_type
+
+    doc_ids = source_document_ids(index, {"old.pdf": "hash-of-old"})
+    assert len(doc_ids) == 10
+    updated = delete_documents(index, doc_ids)
+
+    assert index.index.ntotal == n_parts and len(get_lexical_index(index)) == n_parts
+    assert updated.index.ntotal == len(get_lexical_index(updated)) == len(updated.docstore._dict) == n_parts - 10
+    # FAISS labels, the docstore mapping and BM25 positions still line up
+    assert get_lexical_index(updated).doc_ids == [updated.index_to_docstore_id[i] for i in range(n_parts - 10)]
+    assert not set(doc_ids) & set(updated.index_to_docstore_id.values())
+    kept_text = "Spare part QZ-1050 is stored in bay 50."
+    nearest = search_index(kept_text, updated, top_k=5, query_vector=embeddings.embed_query(kept_text))
+    assert kept_text in [doc.page_content for doc in nearest]
+    assert all(doc.metadata.get("source") != "old.pdf" for doc in search_index("PX-1042 bay", updated, top_k=90, mode="hybrid"))
+    assert {"page": 42} in [doc.metadata for doc in search_index("PX-1042", updated, top_k=3, mode="hybrid")]
+    assert index_type_of(updated.index) == index_type
+    if index_type == "ivfpq":
+        # Edited in place: same coarse centroids and PQ codes, nothing retrained
+        original_ivf, updated_ivf = faiss.extract_index_ivf(index.index), faiss.extract_index_ivf(updated.index)
+        np.testing.assert_array_equal(updated_ivf.quantizer.reconstruct_n(0, updated_ivf.nlist), original_ivf.quantizer.reconstruct_n(0, original_ivf.nlist))
+        original_ivf.make_direct_map()
+        updated_ivf.make_direct_map()
+        np.testing.assert_array_equal(updated_ivf.reconstruct(0), original_ivf.reconstruct(10))
+    # Duplicate and unknown IDs are ignored rather than counted towards "everything deleted"
+    assert delete_documents(index, doc_ids + doc_ids + ["missing"]).index.ntotal == n_parts - 10
+    assert delete_documents(index, ["missing"] * n_parts).index.ntotal == n_parts
+    assert delete_documents(index, list(index.index_to_docstore_id.values())) is None
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_filtered_search_returns_top_k_matching_chunks(index_type):
+    """Test source and page filters are applied inside the search, so top_k matching chunks come back."""
+    index, _ = _part_catalogue()
+    for i, doc_id in enumerate(index.index_to_docstore_id.values()):
+        index.docstore.search(doc_id).metadata["source"] = "manual.pdf" if i % 10 == 0 else "catalogue.pdf"
+    if index_type == "hnsw":
+        index = optimize_index(index, index_type="hnsw")
+    assert index_sources(index) == ["catalogue.pdf", "manual.pdf"]
+
+    results = search_index("spare part bay", index, top_k=3, sources=["manual.pdf"], page_range=(20, 60))
+    assert len(results) == 3
+    assert all(doc.metadata["source"] == "manual.pdf" and 20 <= doc.metadata["page"] <= 60 for doc in results)
+    if index_type == "flat":
+        # Exact index: the best matching chunks, as if the filter were applied to a full ranking
+        ranking = search_index("spare part bay", index, top_k=100)
+        expected = [doc for doc in ranking if doc.metadata["source"] == "manual.pdf" and 20 <= doc.metadata["page"] <= 60]
+        assert results == expected[:3]
+
+    # Fewer matching chunks than top_k (HNSW relies on the exact fallback here)
+    assert sorted(doc.metadata["page"] for doc in search_index("bay", index, top_k=5, page_range=(41, 42))) == [41, 42]
+    hybrid = search_index("Where is PX-1042?", index, top_k=3, mode="hybrid", sources=["catalogue.pdf"])
+    assert 42 in [doc.metadata["page"] for doc in hybrid] and all(doc.metadata["source"] == "catalogue.pdf" for doc in hybrid)
+    assert search_index("PX-1042", index, top_k=3, mode="hybrid", sources=["manual.pdf"], page_range=(42, 42)) == []
+    assert search_index("bay", index, top_k=3, sources=["missing.pdf"]) == []
+
+def _overlapping_chunks():
+    """Three near-identical chunks closest to the query, and two less similar but distinct ones."""
+    import numpy as np
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    rng = np.random.default_rng(0)
+    vectors = [[1.0, 0.0, 0.0, 0.0] + rng.normal(0, 0.01, 4) for _ in range(3)]
+    vectors += [[0.8, 0.6, 0.0, 0.0], [0.8, 0.0, 0.6, 0.0], [0.0, 0.0, 0.0, 1.0]]
+    docs = [Document(page_content=f"chunk {i}", metadata={"page": i}) for i in range(len(vectors))]
+    return add_embeddings_to_index(docs, [list(map(float, v)) for v in vectors], DeterministicFakeEmbedding(size=4))
+
+def test_maximal_marginal_relevance_skips_near_duplicates():
+    """Test MMR trades relevance for diversity according to lambda."""
+    import numpy as np
+    query = np.array([1.0, 0.2])
+    candidates = np.array([[1.0, 0.0], [0.99, 0.05], [0.8, 0.6], [0.0, 1.0]])
+
+    assert maximal_marginal_relevance(query, candidates, 3, lambda_mult=1.0) == [1, 0, 2]
+    assert maximal_marginal_relevance(query, candidates, 3, lambda_mult=0.5) == [1, 3, 2]
+    assert maximal_marginal_relevance(query, candidates, 9) == [1, 3, 2, 0]
+    assert maximal_marginal_relevance(query, candidates[:0], 2) == []
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_mmr_search_returns_diverse_chunks(index_type):
+    """Test "mmr" mode replaces overlapping chunks with distinct ones, using the stored vectors."""
+    index = _overlapping_chunks()
+    if index_type == "hnsw":
+        index = optimize_index(index, index_type="hnsw")
+    query_vector = [1.0, 0.2, 0.2, 0.0]
+
+    dense = search_index("q", index, top_k=3, query_vector=query_vector)
+    mmr = search_index("q", index, top_k=3, query_vector=query_vector, mode="mmr", fetch_k=5)
+    assert [doc.metadata["page"] for doc in dense] == [1, 0, 2]
+    assert [doc.metadata["page"] for doc in mmr] == [1, 3, 4]
+    assert search_index("q", index, top_k=3, query_vector=query_vector, mode="mmr", mmr_lambda=1.0) == dense
+    assert search_index("q", index, top_k=3, query_vector=query_vector, mode="mmr", mmr_lambda=2.0) == []
+    assert search_index_batch(index, [query_vector], top_k=3, mode="mmr", fetch_k=5) == [mmr]
+    # Filters restrict the candidates
+    filtered = search_index("q", index, top_k=2, query_vector=query_vector, mode="mmr", page_range=(2, 5))
+    assert [doc.metadata["page"] for doc in filtered] == [2, 3]
+
+def test_search_index_nprobe_applies_per_call():
+    """Test the nprobe knob changes the IVF search for that call only, leaving the shared index as is."""
+    embeddings = DeterministicFakeEmbedding(size=16)
+    vectors = _random_vectors(3000)
+    docs = [Document(page_content=f"chunk {i}") for i in range(len(vectors))]
+    index = optimize_index(add_embeddings_to_index(docs, vectors.tolist(), embeddings), index_type="ivfpq")
+    vector_index = faiss.downcast_index(index.index)
+    default_nprobe = vector_index.nprobe
+    queries = _random_vectors(20, seed=1)
+
+    narrow = search_index_batch(index, queries, top_k=10, nprobe=1, ef_search=99)
+    wide = search_index_batch(index, queries, top_k=10, nprobe=vector_index.nlist)
+
+    assert narrow != wide
+    assert wide == search_index_batch(index, queries, top_k=10, nprobe=vector_index.nlist)
+    assert search_index("q", index, top_k=10, query_vector=queries[0].tolist(), nprobe=1) == narrow[0]
+    assert vector_index.nprobe == default_nprobe
+
+def test_search_index_with_query_vector():
+    """Test a precomputed query vector is searched directly, without re-embedding the query."""
+    mock_index = MagicMock(spec=FAISS)
+    mock_index.similarity_search_by_vector.return_value = [Document(page_content="result1")]
+
+    results = search_index("test query", mock_index, top_k=2, query_vector=[0.1, 0.2])
+
+    assert results == [Document(page_content="result1")]
+    mock_index.similarity_search_by_vector.assert_called_once_with([0.1, 0.2], k=2)
+    mock_index.similarity_search.assert_not_called()
+
+def test_asearch_index_runs_on_retrieval_thread_pool():
+    """Test the async search gives the same results, computed off the event loop thread."""
+    import asyncio
+    import threading
+    threads = []
+    mock_index = MagicMock(spec=FAISS)
+    def fake_search(query, k):
+        threads.append(threading.current_thread().name)
+        return [Document(page_content="result1")]
+    mock_index.similarity_search.side_effect = fake_search
+
+    results = asyncio.run(asearch_index("test query", mock_index, top_k=2))
+
+    assert results == [Document(page_content="result1")]
+    assert threads[0].startswith("retrieval")